@@ -0,0 +1,183 @@
+"""Arbitragem do canal de entrada entre macros
+
+So existe uma tela: gestos de macros diferentes nao podem se misturar no
+meio de um lote. O arbitro concede o canal a um pedido por vez:
+
+- prioridade menor passa na frente (como no WorkerPool);
+- na mesma prioridade, passa quem usou menos o canal ate agora (fila
+  justa por tempo de uso), entao um macro com lotes longos nao monopoliza;
+- secoes exclusivas seguram o canal entre varios pedidos da mesma thread
+  (sequencias criticas que nao podem ser intercaladas).
+
+Cada pedido e uma fatia: os lotes ja chegam cortados em pedacos curtos.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class OwnerStats:
+    __slots__ = ('name', 'grants', 'wait', 'busy', 'max_wait')
+
+    def __init__(self, name):
+        self.name = name
+        self.grants = 0
+        self.wait = 0.0
+        self.busy = 0.0
+        self.max_wait = 0.0
+
+
+class InputArbiter:
+    """Concede o canal de entrada a um dono por vez"""
+
+    # Intervalo (seg) para reavaliar cancelamentos de quem esta esperando
+    POLL = 0.1
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._busy = False
+        self._holder = None
+        # Threads com o canal (pedido em andamento / secao exclusiva)
+        self._holder_thread = None
+        self._excl_thread = None
+        self._excl_depth = 0
+        self._waiting = []
+        self._seq = 0
+        self._vtime = {}
+        self._vclock = 0.0
+        self._stats = {}
+        self._start = clock()
+
+    # ---- FILA ----
+
+    def _best(self):
+        """Pedido que deve receber o canal agora (ou None)"""
+        if self._busy:
+            return None
+        best = None
+        for entry in self._waiting:
+            owner = entry[2]
+            if self._excl_thread is not None and entry[3] != self._excl_thread:
+                continue
+            key = (entry[0], self._vtime.get(owner, 0.0), entry[1])
+            if best is None or key < best[0]:
+                best = (key, entry)
+        return best[1] if best else None
+
+    def _wait_turn(self, owner, priority, cancel, name):
+        """Entra na fila e espera a vez; com o lock do _cond ja tomado"""
+        self._seq += 1
+        entry = (priority, self._seq, owner, threading.get_ident())
+        if owner not in self._vtime:
+            # Donos novos entram no tempo virtual atual: sem credito acumulado
+            self._vtime[owner] = self._vclock
+            self._stats[owner] = OwnerStats(name or str(owner))
+        queued = self.clock()
+        self._waiting.append(entry)
+        granted = False
+        try:
+            while self._best() is not entry:
+                if cancel is not None and cancel.is_set():
+                    return False
+                self._cond.wait(self.POLL if cancel is not None else None)
+            granted = True
+        finally:
+            self._waiting.remove(entry)
+            if not granted:
+                self._cond.notify_all()
+
+        waited = self.clock() - queued
+        st = self._stats[owner]
+        st.grants += 1
+        st.wait += waited
+        st.max_wait = max(st.max_wait, waited)
+        self._vclock = max(self._vclock, self._vtime[owner])
+        return True
+
+    # ---- USO ----
+
+    def run(self, fn, owner=None, priority=0, cancel=None, name=None):
+        """Executa fn() com o canal; retorna (True, resultado) ou (False, None)
+
+        Retorna sem executar se `cancel` for sinalizado durante a espera.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            reentrant = self._holder_thread == me
+            if not reentrant:
+                if not self._wait_turn(owner, priority, cancel, name):
+                    return False, None
+                self._busy = True
+                self._holder = owner
+                self._holder_thread = me
+        if reentrant:
+            # fn() chamado de dentro de outro pedido desta thread
+            return True, fn()
+
+        start = self.clock()
+        try:
+            return True, fn()
+        finally:
+            elapsed = self.clock() - start
+            with self._cond:
+                self._busy = False
+                self._holder = None
+                self._holder_thread = None
+                self._vtime[owner] = self._vtime.get(owner, 0.0) + elapsed
+                if owner in self._stats:
+                    self._stats[owner].busy += elapsed
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self, owner=None, priority=0, cancel=None, name=None):
+        """Secao exclusiva: so a thread que chamou usa o canal ate o fim do bloco"""
+        me = threading.get_ident()
+        with self._cond:
+            if self._excl_thread == me:
+                self._excl_depth += 1
+            else:
+                if not self._wait_turn(owner, priority, cancel, name):
+                    raise InterruptedError('cancelado esperando o canal')
+                self._excl_thread = me
+                self._excl_depth = 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._excl_depth -= 1
+                if not self._excl_depth:
+                    self._excl_thread = None
+                self._cond.notify_all()
+
+    def forget(self, owner):
+        """Descarta o historico (tempo virtual e metricas) de um dono que terminou"""
+        with self._cond:
+            self._vtime.pop(owner, None)
+            self._stats.pop(owner, None)
+
+    # ---- METRICAS ----
+
+    def stats(self):
+        """Uso por dono, vazao e justica (indice de Jain sobre o uso)"""
+        with self._cond:
+            owners = list(self._stats.values())
+            elapsed = max(self.clock() - self._start, 1e-9)
+        grants = sum(s.grants for s in owners)
+        busy = [s.busy for s in owners if s.grants]
+        fairness = (sum(busy) ** 2 / (len(busy) * sum(b * b for b in busy))) if busy and any(busy) else 1.0
+        return {
+            'grants': grants,
+            'per_sec': round(grants / elapsed, 1),
+            'fairness': round(fairness, 3),
+            'owners': {
+                s.name: {
+                    'grants': s.grants,
+                    'busy_ms': round(s.busy * 1000, 1),
+                    'avg_wait_ms': round(s.wait / s.grants * 1000, 3) if s.grants else 0.0,
+                    'max_wait_ms': round(s.max_wait * 1000, 3),
+                }
+                for s in owners
+            },
+        }
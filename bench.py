@@ -0,0 +1,655 @@
+"""Benchmarks do Macro Vision (rodam no PC, sem dispositivo)
+
+Uso: python bench.py <nome> [-n N]
+     python bench.py startup [--rev REVISAO]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+
+def bench_injector(n):
+    """os.system por gesto vs shell persistente vs TouchWriter
+
+    O `input` falso e um processo que so espera FAKE_STARTUP: o shell
+    persistente economiza so o fork do sh e continua pagando essa partida
+    em todo gesto. O TouchWriter nao abre processo nenhum: escreve os
+    eventos do toque (aqui num arquivo comum no lugar do touchscreen).
+    """
+    from injector import FAKE_STARTUP, fake_injector, fake_prelude, fake_writer
+
+    prelude = fake_prelude()
+    start = time.perf_counter()
+    for i in range(n):
+        os.system(f'{prelude}; input tap {i} {i}')
+    system_s = time.perf_counter() - start
+
+    inj = fake_injector()
+    inj.start()
+    start = time.perf_counter()
+    for i in range(n):
+        inj.send(('tap', i, i))
+    shell_s = time.perf_counter() - start
+    inj.close()
+
+    inj = fake_injector(writer=fake_writer())
+    inj.start()
+    start = time.perf_counter()
+    for i in range(n):
+        inj.send(('tap', i, i))
+    touch_s = time.perf_counter() - start
+    stats = inj.stats()
+    inj.close()
+    assert stats['touches'] == n
+
+    base = system_s * 1000 / n
+    print(f'input     : {FAKE_STARTUP * 1000:.0f} ms de partida por processo (simulado)')
+    for label, secs in (('os.system', system_s), ('shell', shell_s), ('touch', touch_s)):
+        ms = secs * 1000 / n
+        print(f'{label:10s}: {ms:8.3f} ms/gesto  {n / secs:10.1f} gestos/s  '
+              f'({(base - ms) / base * 100:5.1f}% menos)')
+    print(f'latencia  : touch media {stats["avg_ms"]} ms, max {stats["max_ms"]} ms')
+
+
+def bench_batch(n):
+    """Lotes de gestos pelo arbitro: um pedido por gesto vs fatias de lote
+
+    Cada pedido passa pelo arbitro, como Android.input/Android.batch.
+    Toques seguidos: no shell todos pagam a partida do `input`; no
+    TouchWriter so sobra o custo do pedido. Toques com pausa de 20 ms e
+    outro macro usando o canal em gestos de 5 ms: pausa dentro do lote
+    (segura o canal) vs fora dele (como compile_plan faz), medindo o
+    desvio do ritmo entre os toques.
+    """
+    import threading
+    from arbiter import InputArbiter
+    from engine import split_batch
+    from injector import fake_injector, fake_writer
+
+    gap = 0.02
+    taps = [('tap', i, i) for i in range(n)]
+    chunks = list(split_batch((tap, 0.1) for tap in taps))
+    paused = list(split_batch(e for tap in taps for e in ((tap, 0.1), (gap, gap))))
+
+    def single(arbiter, inj):
+        for tap in taps:
+            arbiter.run(lambda: inj.send(tap), 'bench')
+
+    def batched(arbiter, inj):
+        for chunk in chunks:
+            arbiter.run(lambda: inj.send_batch(chunk), 'bench')
+
+    def pause_inside(arbiter, inj):
+        for chunk in paused:
+            arbiter.run(lambda: inj.send_batch(chunk), 'bench')
+
+    def pause_outside(arbiter, inj):
+        for tap in taps:
+            arbiter.run(lambda: inj.send_batch((tap,)), 'bench')
+            time.sleep(gap)
+
+    def measure(inj, play, busy):
+        arbiter = InputArbiter()
+        stop = threading.Event()
+
+        def other():
+            while not stop.is_set():
+                arbiter.run(lambda: time.sleep(0.005), 'outro')
+
+        downs = []
+        if inj.writer is not None:
+            down = inj.writer._down
+            inj.writer._down = lambda x, y: (downs.append(time.perf_counter()), down(x, y))
+        thread = threading.Thread(target=other)
+        if busy:
+            thread.start()
+        start = time.perf_counter()
+        play(arbiter, inj)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if busy:
+            thread.join()
+        return elapsed, downs
+
+    print(f'{n} toques seguidos, {len(chunks)} fatias de lote')
+    for label, writer in (('shell', False), ('touch', True)):
+        for mode, play in (('um a um', single), ('lote', batched)):
+            inj = fake_injector(writer=fake_writer() if writer else None)
+            inj.start()
+            elapsed, _ = measure(inj, play, False)
+            inj.close()
+            print(f'{label:6s} {mode:13s}: {elapsed * 1000:8.1f} ms, {elapsed * 1000 / n:7.3f} ms/gesto')
+
+    print(f'{n} toques com pausa de {gap * 1000:.0f} ms, outro macro no canal')
+    for mode, play in (('pausa no lote', pause_inside), ('pausa fora', pause_outside)):
+        inj = fake_injector(writer=fake_writer())
+        inj.start()
+        elapsed, downs = measure(inj, play, True)
+        inj.close()
+        late = sorted(abs(b - a - gap) * 1000 for a, b in zip(downs, downs[1:]))
+        print(f'touch  {mode:13s}: {elapsed * 1000:8.1f} ms, ritmo +-{sum(late) / len(late):.2f} ms '
+              f'(max {late[-1]:.2f})')
+
+
+def _legacy_run_actions(macro, engine, Android):
+    """Loop antigo de run_actions (referencia)"""
+    for action in macro.actions:
+        if not macro.is_running:
+            break
+        if not action.enabled:
+            continue
+        for _ in range(action.repeats):
+            if not macro.is_running:
+                break
+            t = action.type
+            if t == 'tap':
+                Android.tap(action.x, action.y)
+            elif t == 'swipe':
+                Android.swipe(action.x, action.y, action.x2, action.y2, action.duration)
+            elif t == 'long_press':
+                Android.long_press(action.x, action.y, action.duration)
+            elif t == 'wait':
+                time.sleep(action.wait_sec)
+            elif t == 'script':
+                engine.run(action.script)
+            elif t == 'key':
+                Android.key(action.key_code)
+            elif t == 'text':
+                Android.type_text(action.text)
+            elif t == 'app':
+                Android.launch_app(action.app_pkg)
+            if action.repeats > 1:
+                time.sleep(action.delay)
+
+
+def bench_plan(n):
+    """Loop antigo vs ActionPlan.run(ctx), pelo caminho real ate o injetor
+
+    Os dois rodam como no aparelho (Android.is_android) com o injetor
+    falso: os toques vao pelo TouchWriter num arquivo. Gestos com duracao
+    0 e pausas de 0 s, sem teclas (um processo `input` por tecla esconde
+    o resto): so conta o custo de despachar as acoes.
+    """
+    from engine import Android, MacroAction, MacroData, RunContext, ScriptEngine
+    from injector import fake_injector, fake_writer
+
+    macro = MacroData('bench')
+    for i, t in enumerate(['tap', 'swipe', 'long_press', 'tap', 'wait'] * 4):
+        a = MacroAction()
+        a.type = t
+        a.duration = 0
+        a.wait_sec = 0
+        a.delay = 0
+        a.repeats = 5
+        a.enabled = i % 7 != 0
+        macro.actions.append(a)
+    macro.is_running = True
+    engine = ScriptEngine()
+
+    inj = fake_injector(0, writer=fake_writer())
+    inj.start()
+    saved = Android.is_android, Android._injector
+    Android.is_android, Android._injector = True, inj
+    ctx = RunContext(name='bench')
+    ctx.attach()
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            _legacy_run_actions(macro, engine, Android)
+        legacy_s = time.perf_counter() - start
+
+        plan = macro.get_plan(engine)
+        start = time.perf_counter()
+        for _ in range(n):
+            plan.run(ctx)
+        plan_s = time.perf_counter() - start
+    finally:
+        ctx.detach()
+        Android.is_android, Android._injector = saved
+        stats = inj.stats()
+        inj.close()
+
+    print(f'loop antigo : {legacy_s * 1e6 / n:8.1f} us/iteracao')
+    print(f'plano       : {plan_s * 1e6 / n:8.1f} us/iteracao ({len(plan)} passos)')
+    print(f'injetor     : {stats["touches"]} toques, {stats["count"]} envios')
+
+
+def synthetic_screen(seed=1, width=1080, height=2400):
+    """Tela sintetica em cinza: retangulos tipo UI + ruido"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    screen = np.full((height, width), 40, np.float32)
+    for _ in range(300):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        w, h = rng.integers(10, 300), rng.integers(10, 200)
+        screen[y:y + h, x:x + w] = rng.integers(0, 255)
+    screen += rng.normal(0, 4, (height, width)).astype(np.float32)
+    return screen
+
+
+def bench_vision(n):
+    """find_image em tela sintetica 1080x2400"""
+    import numpy as np
+    import vision
+
+    screen = synthetic_screen()
+    rng = np.random.default_rng(5)
+    times = []
+    found = 0
+    while len(times) < n:
+        w, h = int(rng.integers(20, 200)), int(rng.integers(20, 200))
+        x, y = int(rng.integers(0, 1080 - w)), int(rng.integers(0, 2400 - h))
+        tpl = screen[y:y + h, x:x + w].copy()
+        if tpl.std() < 10:
+            continue
+        start = time.perf_counter()
+        m = vision.match_template(screen, tpl, 0.8)
+        times.append((time.perf_counter() - start) * 1000)
+        found += bool(m and m.score > 0.95)
+
+    times.sort()
+    print(f'encontrados : {found}/{n}')
+    print(f'tempo       : mediana {times[n // 2]:.1f} ms, p95 {times[int(n * 0.95)]:.1f} ms, max {times[-1]:.1f} ms')
+
+
+def bench_multi(n):
+    """n templates um a um vs match_many (tela pre-processada uma vez)"""
+    import numpy as np
+    import vision
+
+    screen = synthetic_screen()
+    rng = np.random.default_rng(7)
+    tpls = []
+    while len(tpls) < n:
+        w, h = int(rng.integers(20, 200)), int(rng.integers(20, 200))
+        x, y = int(rng.integers(0, 1080 - w)), int(rng.integers(0, 2400 - h))
+        tpl = screen[y:y + h, x:x + w].copy()
+        if tpl.std() >= 10:
+            tpls.append(vision.Template(tpl))
+
+    start = time.perf_counter()
+    single = [vision.match_template(screen, t, 0.8) for t in tpls]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    many = vision.match_many(screen, tpls, 0.8)
+    many_s = time.perf_counter() - start
+
+    same = sum((a and a[:2]) == (b and b[:2]) for a, b in zip(single, many))
+    print(f'um a um     : {single_s * 1000:8.1f} ms para {n} templates')
+    print(f'match_many  : {many_s * 1000:8.1f} ms para {n} templates')
+    print(f'iguais      : {same}/{n}')
+
+
+def bench_ocr(n):
+    """read_text: leitura completa vs regiao sem mudancas (memo)"""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    import ocr
+
+    font = ImageFont.load_default(size=40)
+    screens = []
+    for i in range(n):
+        img = Image.new('RGB', (400, 80), (20, 20, 20))
+        ImageDraw.Draw(img).text((10, 10), f'{i * 37 % 10000}/{i}', fill=(255, 255, 255), font=font)
+        screens.append((f'{i * 37 % 10000}/{i}', np.asarray(img)))
+
+    ocr.glyph_sets.get()
+    start = time.perf_counter()
+    hits = sum(ocr.read_text(img, use_memo=False) == text for text, img in screens)
+    full_s = time.perf_counter() - start
+
+    text, img = screens[-1]
+    ocr.read_text(img, (0, 0, 400, 80))
+    start = time.perf_counter()
+    for _ in range(n):
+        ocr.read_text(img, (0, 0, 400, 80))
+    memo_s = time.perf_counter() - start
+
+    print(f'corretos    : {hits}/{n}')
+    print(f'leitura     : {full_s * 1000 / n:8.3f} ms/regiao')
+    print(f'sem mudanca : {memo_s * 1000 / n:8.3f} ms/regiao')
+    assert hits == n, f'{n - hits} leituras erradas'
+
+
+def bench_pixel(n):
+    """n pontos lidos um a um vs numa unica amostragem vetorizada"""
+    import numpy as np
+    import vision
+    from capture import fake_capture
+
+    rgba = fake_capture().grab().rgba
+    rng = np.random.default_rng(3)
+    points = list(zip(rng.integers(0, 1080, n).tolist(), rng.integers(0, 2400, n).tolist()))
+
+    start = time.perf_counter()
+    loop = [tuple(int(v) for v in rgba[y, x, :3]) for x, y in points]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vec = [tuple(c) for c in vision.sample(rgba, points).tolist()]
+    vec_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ratio = vision.color_ratio(rgba, (0, 1, 2), 10)
+    ratio_s = time.perf_counter() - start
+
+    assert loop == vec
+    print(f'um a um      : {loop_s * 1000:8.3f} ms para {n} pontos')
+    print(f'vetorizado   : {vec_s * 1000:8.3f} ms para {n} pontos')
+    print(f'cor na tela  : {ratio_s * 1000:8.3f} ms (1080x2400, fracao {ratio:.3f})')
+
+
+def synthetic_events(gestures, seed=1, device='/dev/input/event2'):
+    """Log sintetico do `getevent -lt`: toques, toques longos e arrastos"""
+    import random
+
+    rng = random.Random(seed)
+    t = 1000.0
+    tracking = 0
+
+    def line(etype, code, value):
+        return f'[{t:14.6f}] {device}: {etype:<12} {code:<20} {value}\n'
+
+    for _ in range(gestures):
+        t += rng.uniform(0.1, 1.5)
+        kind = rng.choice(('tap', 'long_press', 'swipe'))
+        x, y = rng.randrange(1080), rng.randrange(2400)
+        tracking += 1
+        yield line('EV_ABS', 'ABS_MT_TRACKING_ID', f'{tracking:08x}')
+        yield line('EV_KEY', 'BTN_TOUCH', 'DOWN')
+        yield line('EV_ABS', 'ABS_MT_POSITION_X', f'{x:08x}')
+        yield line('EV_ABS', 'ABS_MT_POSITION_Y', f'{y:08x}')
+        yield line('EV_SYN', 'SYN_REPORT', '00000000')
+
+        steps = rng.randrange(20, 200) if kind == 'swipe' else 5
+        dx, dy = (rng.uniform(-8, 8), rng.uniform(-8, 8)) if kind == 'swipe' else (0, 0)
+        hold = 0.8 if kind == 'long_press' else 0.05
+        for _ in range(steps):
+            t += hold / steps if kind != 'swipe' else 0.008
+            x = min(max(int(x + dx), 0), 1079)
+            y = min(max(int(y + dy), 0), 2399)
+            yield line('EV_ABS', 'ABS_MT_POSITION_X', f'{x:08x}')
+            yield line('EV_ABS', 'ABS_MT_POSITION_Y', f'{y:08x}')
+            yield line('EV_SYN', 'SYN_REPORT', '00000000')
+
+        yield line('EV_ABS', 'ABS_MT_TRACKING_ID', 'ffffffff')
+        yield line('EV_KEY', 'BTN_TOUCH', 'UP')
+        yield line('EV_SYN', 'SYN_REPORT', '00000000')
+
+
+def bench_recorder(n):
+    """Parser do getevent sobre um log sintetico de n gestos (em arquivo)"""
+    import tempfile
+    import tracemalloc
+    import recorder
+
+    path = os.path.join(tempfile.gettempdir(), 'macro_events.log')
+    with open(path, 'w') as f:
+        f.writelines(synthetic_events(n))
+    size = os.path.getsize(path)
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    counts = {}
+    with open(path) as f:
+        for action in recorder.parse(f):
+            counts[action['type']] = counts.get(action['type'], 0) + 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'log         : {lines} linhas, {size / 1e6:.1f} MB')
+    print(f'acoes       : {counts}')
+    print(f'throughput  : {lines / elapsed:10.0f} linhas/s  {size / 1e6 / elapsed:6.1f} MB/s')
+    print(f'memoria     : pico {peak / 1024:.0f} KB')
+
+
+def bench_scheduler(n):
+    """Deriva de n iteracoes: pausa apos a execucao vs prazos absolutos"""
+    from scheduler import FixedRate, Loop
+
+    interval, work = 0.02, 0.005
+
+    start = time.monotonic()
+    for _ in range(n):
+        time.sleep(work)
+        time.sleep(interval)
+    chained_s = time.monotonic() - start
+
+    loop = Loop(lambda: time.sleep(work), FixedRate(interval), count=n)
+    start = time.monotonic()
+    loop.run()
+    rate_s = time.monotonic() - start
+
+    ideal = (n - 1) * interval + work
+    st = loop.stats.summary()
+    print(f'ideal       : {ideal * 1000:8.1f} ms para {n} iteracoes de {interval * 1000:.0f} ms')
+    print(f'encadeado   : {chained_s * 1000:8.1f} ms (deriva {(chained_s - ideal) / (n * interval) * 60:.1f} s/min)')
+    print(f'prazos      : {rate_s * 1000:8.1f} ms (deriva {(rate_s - ideal) / (n * interval) * 60:.1f} s/min)')
+    print(f'atraso      : media {st["avg_ms"]} ms, p95 {st["p95_ms"]} ms, max {st["max_ms"]} ms')
+
+
+def bench_arbiter(n):
+    """Macros concorrentes disputando o canal de entrada (gestos de 1 ms)"""
+    import threading
+    from arbiter import InputArbiter
+
+    arbiter = InputArbiter()
+    macros, gesture = 8, 0.001
+    done = threading.Event()
+
+    def macro(i):
+        # Macro 0 tem prioridade; os pares mandam lotes 3x maiores
+        priority = -1 if i == 0 else 0
+        size = 3 if i % 2 == 0 else 1
+        for _ in range(n):
+            if done.is_set():
+                break
+            arbiter.run(lambda: time.sleep(gesture * size), i, priority, name=f'macro{i}')
+
+    threads = [threading.Thread(target=macro, args=(i,)) for i in range(macros)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(min(n * gesture * macros, 5.0))
+    done.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    st = arbiter.stats()
+    print(f'{macros} macros : {st["grants"]} lotes em {elapsed:.2f} s ({st["per_sec"]} lotes/s)')
+    busy = [o['busy_ms'] for name, o in st['owners'].items() if name != 'macro0']
+    equal = sum(busy) ** 2 / (len(busy) * sum(b * b for b in busy))
+    print(f'justica    : {st["fairness"]} geral, {equal:.3f} entre os de mesma prioridade (Jain)')
+    for name, o in sorted(st['owners'].items()):
+        print(f'{name:10s} : {o["grants"]:5d} lotes, uso {o["busy_ms"]:8.1f} ms, '
+              f'espera media {o["avg_wait_ms"]:6.2f} ms, max {o["max_wait_ms"]:7.2f} ms')
+
+
+# Substituto do `screencap -p arquivo`: gera o quadro e grava PNG
+FAKE_SCREENCAP_PNG = '''
+import sys
+import numpy as np
+from PIL import Image
+w, h, path = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+row = np.arange(w * 4, dtype=np.uint32).astype(np.uint8).reshape(w, 4)
+Image.fromarray(np.broadcast_to(row, (h, w, 4)).copy()).save(path)
+'''
+
+
+def bench_capture(n):
+    """screencap -p para arquivo + decodificacao vs quadro cru por pipe"""
+    import tempfile
+    import subprocess
+    import vision
+    from capture import fake_capture
+
+    path = os.path.join(tempfile.gettempdir(), 'macro_screen.png')
+    cmd = [sys.executable, '-c', FAKE_SCREENCAP_PNG, '1080', '2400', path]
+    start = time.perf_counter()
+    for _ in range(n):
+        subprocess.run(cmd, check=True)
+        vision.load_gray(path)
+    file_s = time.perf_counter() - start
+
+    cap = fake_capture()
+    start = time.perf_counter()
+    for _ in range(n):
+        cap.grab().gray()
+    raw_s = time.perf_counter() - start
+
+    print(f'arquivo PNG : {file_s * 1000 / n:8.1f} ms/quadro')
+    print(f'pipe cru    : {raw_s * 1000 / n:8.1f} ms/quadro')
+
+
+# Pontos de entrada medidos no bench de inicializacao
+STARTUP_MODULES = ('engine', 'service', 'cli', 'main')
+# Maximo de processos por modulo (cada medicao e um interpretador novo)
+STARTUP_RUNS = 10
+
+
+def import_profile(module, cwd):
+    """Importa `module` num processo novo com -X importtime
+
+    Retorna (ms, [(ms, pacote), ...] dos imports diretos) ou (None, erro).
+    """
+    import subprocess
+
+    env = dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+
+    # Cada import aparece depois dos que ele puxou: os filhos diretos do
+    # modulo sao as linhas com um nivel de recuo antes da linha dele
+    children = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        us = int(cumulative)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return us / 1000, sorted(children, reverse=True)
+            children = []
+        elif depth == 1:
+            children.append((us / 1000, name))
+    return None, 'sem registro do import'
+
+
+def startup_report(cwd, runs):
+    """{modulo: (mediana ms, mais lentos da mediana) ou (None, erro)}"""
+    report = {}
+    for module in STARTUP_MODULES:
+        if not os.path.exists(os.path.join(cwd, module + '.py')):
+            report[module] = (None, 'nao existe')
+            continue
+        # Primeira execucao so gera os .pyc (arvore recem extraida do git)
+        import_profile(module, cwd)
+        samples = []
+        for _ in range(runs):
+            ms, detail = import_profile(module, cwd)
+            if ms is None:
+                samples = None
+                break
+            samples.append((ms, detail))
+        if samples is None:
+            report[module] = (None, detail)
+        else:
+            samples.sort(key=lambda s: s[0])
+            report[module] = samples[len(samples) // 2]
+    return report
+
+
+def bench_startup(n, rev=None):
+    """Tempo de importacao a frio dos pontos de entrada (opcional: vs `rev`)"""
+    import tarfile
+    import tempfile
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = max(1, min(n, STARTUP_RUNS))
+    after = startup_report(here, runs)
+
+    before = None
+    if rev:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = subprocess.run(['git', 'archive', rev], cwd=here, capture_output=True)
+            if archive.returncode != 0:
+                print(f'git archive {rev}: {archive.stderr.decode().strip()}')
+                return
+            tar_path = os.path.join(tmp, 'rev.tar')
+            with open(tar_path, 'wb') as f:
+                f.write(archive.stdout)
+            with tarfile.open(tar_path) as tar:
+                tar.extractall(os.path.join(tmp, 'src'))
+            before = startup_report(os.path.join(tmp, 'src'), runs)
+
+    print(f'mediana de {runs} processos por modulo (-X importtime)')
+    for module in STARTUP_MODULES:
+        ms, detail = after[module]
+        line = f'{module:8s}: '
+        line += f'{ms:8.1f} ms' if ms is not None else f'{"-":>8s}   ({detail})'
+        if before is not None:
+            old, old_detail = before[module]
+            if old is None:
+                line += f'  | {rev}: - ({old_detail})'
+            else:
+                line += f'  | {rev}: {old:8.1f} ms'
+                if ms is not None:
+                    line += f' ({ms - old:+.1f} ms)'
+        print(line)
+        if ms is not None:
+            slow = ', '.join(f'{name} {t:.1f}' for t, name in detail[:5])
+            print(f'          mais lentos: {slow}')
+
+
+BENCHES = {
+    'injector': bench_injector,
+    'batch': bench_batch,
+    'plan': bench_plan,
+    'vision': bench_vision,
+    'multi': bench_multi,
+    'ocr': bench_ocr,
+    'pixel': bench_pixel,
+    'recorder': bench_recorder,
+    'scheduler': bench_scheduler,
+    'arbiter': bench_arbiter,
+    'startup': bench_startup,
+    'capture': bench_capture,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks do Macro Vision')
+    parser.add_argument('name', choices=sorted(BENCHES) + ['all'])
+    parser.add_argument('-n', type=int, default=200, help='iteracoes')
+    parser.add_argument('--rev', help='startup: revisao git para comparar (ex.: HEAD~1)')
+    args = parser.parse_args(argv)
+
+    names = sorted(BENCHES) if args.name == 'all' else [args.name]
+    for name in names:
+        print(f'== {name} ==')
+        if name == 'startup':
+            bench_startup(args.n, args.rev)
+        else:
+            BENCHES[name](args.n)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
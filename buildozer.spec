@@ -8,10 +8,13 @@ source.include_exts = py,png,jpg,json,txt
 
 version = 3.0.0
 
-requirements = python3,kivy,pyjnius,android
+requirements = python3,kivy,pyjnius,android,numpy,pillow
 
 android.permissions = READ_EXTERNAL_STORAGE,WRITE_EXTERNAL_STORAGE,INTERNET,FOREGROUND_SERVICE,SYSTEM_ALERT_WINDOW
 
+# Execucao dos macros fora da interface (service.py, canal local em ipc.py)
+services = Engine:service.py:foreground
+
 android.api = 33
 android.minapi = 21
 android.ndk = 25b
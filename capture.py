@@ -0,0 +1,198 @@
+"""Captura de tela em memoria
+
+Le a saida crua do `screencap` (sem -p) por um pipe, direto para um
+buffer reutilizavel, sem codificar PNG nem gravar em /sdcard. O quadro
+e exposto como view numpy (sem copia) para o codigo de visao.
+"""
+
+import sys
+import time
+import struct
+import threading
+import subprocess
+
+import numpy as np
+
+
+# Formatos do screencap com 4 bytes por pixel
+RGBA_8888 = 1
+RGBX_8888 = 2
+
+
+class Frame:
+    """Quadro RGBA: `rgba` e uma view HxWx4 sobre o buffer da captura
+
+    O buffer e reaproveitado pela proxima captura; use copy() para
+    guardar o quadro.
+    """
+
+    def __init__(self, rgba, fmt=RGBA_8888, timestamp=None):
+        self.rgba = rgba
+        self.height, self.width = rgba.shape[:2]
+        self.format = fmt
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    @property
+    def age(self):
+        """Segundos desde a captura"""
+        return time.monotonic() - self.timestamp
+
+    def copy(self):
+        return Frame(self.rgba.copy(), self.format, self.timestamp)
+
+    def crop(self, region):
+        """Frame so com a regiao (x, y, w, h), sem copiar pixels"""
+        from vision import crop
+        rgba, _, _ = crop(self.rgba, region)
+        return Frame(rgba, self.format, self.timestamp)
+
+    def gray(self, region=None):
+        """Quadro (ou regiao) em tons de cinza (float32)
+
+        O recorte acontece antes da conversao, que so processa a regiao.
+        """
+        from vision import crop, to_gray
+        rgba, _, _ = crop(self.rgba, region)
+        return to_gray(rgba)
+
+
+def load_frame(path):
+    """Frame a partir de um PNG/JPG (caminho antigo do screenshot)"""
+    from PIL import Image
+    with Image.open(path) as img:
+        return Frame(np.asarray(img.convert('RGBA')))
+
+
+class ScreenCapture:
+    """Executa `screencap` e le o quadro cru para um buffer reutilizavel"""
+
+    def __init__(self, cmd=None):
+        self.cmd = cmd or ['screencap']
+        self._buf = bytearray(16 + 1080 * 2400 * 4)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def grab(self, reuse=True):
+        """Captura um quadro; retorna Frame (view sobre o buffer interno)
+
+        Com reuse=False o quadro ganha um buffer so dele, que nao sera
+        sobrescrito pelas proximas capturas.
+        """
+        start = time.perf_counter()
+        if not reuse:
+            self._buf = bytearray(len(self._buf))
+        proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            size = self._read_all(proc.stdout)
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+        frame = self._parse(size)
+        self.count += 1
+        self.total_ms += (time.perf_counter() - start) * 1000
+        return frame
+
+    def _read_all(self, stream):
+        view = memoryview(self._buf)
+        size = 0
+        while True:
+            if size == len(self._buf):
+                # Tela maior que o buffer: troca por um maior e continua
+                # (quadros antigos ainda podem apontar para o buffer atual)
+                view.release()
+                buf = bytearray(len(self._buf) * 2)
+                buf[:size] = self._buf[:size]
+                self._buf = buf
+                view = memoryview(self._buf)
+            n = stream.readinto(view[size:])
+            if not n:
+                break
+            size += n
+        view.release()
+        return size
+
+    def _parse(self, size):
+        if size < 12:
+            raise IOError('screencap sem dados')
+        w, h, fmt = struct.unpack_from('<III', self._buf, 0)
+        if fmt not in (RGBA_8888, RGBX_8888):
+            raise IOError(f'formato de screencap nao suportado: {fmt}')
+
+        # Android 9+ acrescenta o colorspace ao cabecalho (16 bytes)
+        header = size - w * h * 4
+        if header not in (12, 16):
+            raise IOError(f'screencap incompleto: {size} bytes para {w}x{h}')
+
+        rgba = np.frombuffer(self._buf, np.uint8, count=w * h * 4, offset=header)
+        return Frame(rgba.reshape(h, w, 4), fmt)
+
+    def stats(self):
+        avg = self.total_ms / self.count if self.count else 0.0
+        return {'count': self.count, 'avg_ms': round(avg, 3)}
+
+
+class CaptureBroker:
+    """Captura compartilhada: no maximo um quadro por intervalo
+
+    Todos os macros recebem o mesmo Frame (somente leitura) enquanto ele
+    tiver menos de `min_interval` segundos; capturas simultaneas esperam
+    a que ja esta em andamento em vez de repetir o screencap.
+    """
+
+    def __init__(self, grab, min_interval=0.1):
+        self._grab = grab
+        self.min_interval = min_interval
+        self._frame = None
+        self._lock = threading.Lock()
+
+        # Estatisticas
+        self.requests = 0
+        self.captures = 0
+        self.total_age = 0.0
+
+    def get(self, max_age=None):
+        """Quadro atual se tiver no maximo `max_age` seg; senao captura"""
+        if max_age is None:
+            max_age = self.min_interval
+        self.requests += 1
+
+        frame = self._frame
+        if frame is None or frame.age > max_age:
+            with self._lock:
+                frame = self._frame
+                if frame is None or frame.age > max_age:
+                    frame = self._grab()
+                    if frame is not None:
+                        frame.rgba.flags.writeable = False
+                        self.captures += 1
+                    self._frame = frame
+
+        if frame is not None:
+            self.total_age += frame.age
+        return frame
+
+    def stats(self):
+        served = max(self.requests, 1)
+        return {
+            'requests': self.requests,
+            'captures': self.captures,
+            'shared': self.requests - self.captures,
+            'avg_age_ms': round(self.total_age / served * 1000, 3),
+        }
+
+
+# Substituto local do screencap: emite um quadro cru falso
+FAKE_SCREENCAP = '''
+import sys, struct
+w, h = int(sys.argv[1]), int(sys.argv[2])
+out = sys.stdout.buffer
+out.write(struct.pack('<IIII', w, h, 1, 0))
+row = bytes(range(256)) * (w * 4 // 256 + 1)
+out.write(row[:w * 4] * h)
+'''
+
+
+def fake_capture(width=1080, height=2400):
+    """ScreenCapture que roda o screencap falso (benchmark no Linux)"""
+    return ScreenCapture([sys.executable, '-c', FAKE_SCREENCAP, str(width), str(height)])
@@ -0,0 +1,220 @@
+"""Execucao de macros sem interface (nao importa o Kivy)
+
+Carrega os macros do armazenamento do app, de um save.json/index.json
+ou de um arquivo com um macro e roda cada um pelo mesmo engine do app.
+Fora do Android os gestos vao para o backend do PC (impressos).
+
+Uso:
+    python cli.py --list
+    python cli.py "Meu macro" --once
+    python cli.py -f macro.json --count 10 --json
+
+Codigo de saida: 0 se tudo deu certo, 1 se alguma execucao falhou ou
+estourou o tempo, 2 para erro de uso/carregamento, 130 se interrompido.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+
+from engine import SAVE_FILE, INDEX_FILE, MACROS_DIR, MacroData, MacroRunner, ScriptEngine
+from storage import MacroStore
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+# ============================================================
+# CARREGAMENTO
+# ============================================================
+
+def load_store(store):
+    """Todos os macros de um MacroStore, ja com o corpo carregado"""
+    macros = []
+    for summary in store.load_index():
+        macro = MacroData.from_summary(summary)
+        macro.load_body(store.load_macro(macro.id))
+        macros.append(macro)
+    return macros
+
+
+def load_macros(path=None):
+    """Macros de `path` (save.json, index.json ou um macro) ou do app"""
+    if path is None:
+        return load_store(MacroStore(INDEX_FILE, MACROS_DIR, legacy_path=SAVE_FILE))
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f'formato desconhecido: {path}')
+    if 'macros' not in data:
+        return [MacroData.from_dict(data)]
+    entries = data['macros']
+    if entries and all(isinstance(e.get('actions'), int) for e in entries):
+        # index.json: os corpos ficam em macros/<id>.json ao lado
+        base = os.path.dirname(os.path.abspath(path))
+        return load_store(MacroStore(path, os.path.join(base, 'macros')))
+    return [MacroData.from_dict(d) for d in entries]
+
+
+def select(macros, names):
+    """Macros pedidos por nome ou id; KeyError com o primeiro que faltar"""
+    chosen = []
+    for name in names:
+        found = [m for m in macros if m.name == name or str(m.id) == name]
+        if not found:
+            raise KeyError(name)
+        chosen.extend(found)
+    return chosen
+
+
+# ============================================================
+# EXECUCAO
+# ============================================================
+
+class HeadlessRunner:
+    """MacroRunner com espera pelo fim de cada macro e coleta de resultados"""
+
+    def __init__(self):
+        self.runner = MacroRunner(ScriptEngine(), self._on_status, self._on_result)
+        self._done = {}
+        self._results = {}
+
+    def _on_status(self, macro):
+        event = self._done.get(macro.id)
+        if event is not None:
+            event.set()
+
+    def _on_result(self, macro, result):
+        self._results.setdefault(macro.id, []).append(result)
+
+    def run(self, macro, timeout=None):
+        """Roda o macro ate terminar (ou `timeout` seg); retorna o relatorio"""
+        done = self._done[macro.id] = threading.Event()
+        results = self._results[macro.id] = []
+        report = {'id': macro.id, 'name': macro.name, 'loop': macro.loop}
+
+        start = time.perf_counter()
+        try:
+            started = self.runner.start(macro)
+        except ValueError as e:
+            report.update(ok=False, ms=0.0, runs=0, errors=[str(e)])
+            return report
+        if started is None:
+            done.set()
+        timed_out = not done.wait(timeout)
+        if timed_out:
+            self.runner.stop(macro)
+        report['ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+        errors = [r.get('error', '') for r in results if not r.get('ok')]
+        if timed_out:
+            errors.append(f'tempo limite de {timeout}s excedido')
+        if macro.loop and started is not None:
+            report['runs'] = started.iterations
+            report['jitter'] = started.stats.summary()
+        elif started is not None:
+            report['runs'] = 1
+        else:
+            report['runs'] = 0
+        report['ok'] = not errors
+        report['errors'] = errors
+        report['output'] = ''.join(r.get('output', '') for r in results)
+        return report
+
+    def shutdown(self):
+        self.runner.shutdown()
+
+
+def format_report(report):
+    status = 'ok' if report['ok'] else 'FALHOU'
+    line = f"{report['name']:24s} {status:6s} {report['ms']:10.1f} ms  {report['runs']} execucao(oes)"
+    jitter = report.get('jitter')
+    if jitter:
+        line += (f", atraso medio {jitter['avg_ms']} ms, p95 {jitter['p95_ms']} ms, "
+                 f"{jitter['missed']} perdidas")
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Executa macros do Macro Vision sem interface')
+    parser.add_argument('macros', nargs='*', help='nomes ou ids dos macros')
+    parser.add_argument('-f', '--file', help='save.json, index.json ou arquivo de um macro')
+    parser.add_argument('--all', action='store_true', help='roda todos os macros carregados')
+    parser.add_argument('--list', action='store_true', help='so lista os macros')
+    parser.add_argument('--once', action='store_true', help='ignora o loop: uma execucao')
+    parser.add_argument('--count', type=int, help='numero de iteracoes dos loops')
+    parser.add_argument('--timeout', type=float, help='tempo maximo (seg) por macro')
+    parser.add_argument('--json', action='store_true', help='relatorio em JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='mostra a saida dos scripts')
+    args = parser.parse_args(argv)
+
+    try:
+        macros = load_macros(args.file)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Load error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.list:
+        for m in macros:
+            kind = 'script' if m.script else f'{len(m.actions)} acoes'
+            print(f"{m.id}  {m.name}  ({kind}{', loop' if m.loop else ''})")
+        return EXIT_OK
+
+    if args.macros:
+        try:
+            macros = select(macros, args.macros)
+        except KeyError as e:
+            print(f"Macro nao encontrado: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    elif len(macros) > 1 and not args.all:
+        print("Varios macros carregados: escolha pelo nome/id ou use --all", file=sys.stderr)
+        return EXIT_USAGE
+    if not macros:
+        print("Nenhum macro para executar", file=sys.stderr)
+        return EXIT_USAGE
+
+    for m in macros:
+        if args.once:
+            m.loop = False
+        if args.count is not None:
+            m.loop_count = args.count
+
+    # Com --json o stdout fica so para o relatorio (gestos do PC vao para o stderr)
+    out = sys.stdout
+    quiet = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    runner = HeadlessRunner()
+    reports = []
+    status = EXIT_OK
+    try:
+        with quiet:
+            for m in macros:
+                report = runner.run(m, args.timeout)
+                reports.append(report)
+                if not report['ok']:
+                    status = EXIT_FAILED
+                if not args.json:
+                    print(format_report(report))
+                    for err in report['errors']:
+                        print(f"    erro: {err}")
+                    if args.verbose and report['output']:
+                        print(report['output'].rstrip())
+    except KeyboardInterrupt:
+        runner.runner.stop_all()
+        status = EXIT_INTERRUPTED
+    finally:
+        runner.shutdown()
+
+    if args.json:
+        print(json.dumps(reports, indent=2, default=str), file=out)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
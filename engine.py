@@ -0,0 +1,1576 @@
+"""Motor de execucao dos macros, sem interface
+
+Tudo o que roda um macro (gestos, scripts, planos de acoes, loops) fica
+aqui e nao depende do Kivy: o app usa este modulo direto no PC e o
+servico Android (service.py) roda o mesmo codigo em segundo plano.
+"""
+
+import os
+import json
+import time
+import marshal
+import hashlib
+import threading
+import itertools
+import functools
+import contextlib
+import importlib.util
+from io import StringIO
+from collections import OrderedDict
+
+from arbiter import InputArbiter
+from workers import WorkerPool
+
+
+# Mesmo teste do kivy.utils.platform, sem importar o Kivy (vale no servico)
+IS_ANDROID = 'ANDROID_ARGUMENT' in os.environ
+
+# ============================================================
+# ANDROID
+# ============================================================
+
+class Android:
+    """Funcoes Android"""
+    
+    is_android = IS_ANDROID
+    _injector = None
+    _capture = None
+    _broker = None
+    _motion = None
+    
+    # Fora da Activity (servico), toast(msg) e repassado para quem mostra
+    toast_hook = None
+    
+    # Classe gerada pelo p4a para `services = Engine:service.py:foreground`
+    SERVICE_CLASS = 'com.macrovision.macrovisionai.ServiceEngine'
+    
+    # Canal de entrada compartilhado: um lote de gestos por vez
+    arbiter = InputArbiter()
+    
+    # Intervalo minimo entre capturas compartilhadas (segundos)
+    CAPTURE_INTERVAL = 0.1
+    
+    # Partida estimada (seg) de cada processo `input` (app_process) no aparelho
+    INPUT_STARTUP = 0.1
+    
+    @staticmethod
+    def context():
+        """Context Android do processo: a Activity no app, o Service no servico"""
+        from jnius import autoclass
+        activity = autoclass('org.kivy.android.PythonActivity').mActivity
+        if activity is not None:
+            return activity
+        return autoclass('org.kivy.android.PythonService').mService
+    
+    @staticmethod
+    def start_service():
+        """Inicia o servico de execucao (service.py, `services` no buildozer.spec)"""
+        if not Android.is_android:
+            return
+        try:
+            from jnius import autoclass
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            service = autoclass(Android.SERVICE_CLASS)
+            service.start(activity, '')
+        except Exception as e:
+            print(f"Service error: {e}")
+    
+    @staticmethod
+    def request_permissions():
+        if not Android.is_android:
+            return
+        try:
+            from android.permissions import request_permissions, Permission
+            request_permissions([
+                Permission.READ_EXTERNAL_STORAGE,
+                Permission.WRITE_EXTERNAL_STORAGE,
+                Permission.INTERNET,
+            ])
+        except Exception as e:
+            print(f"Perm error: {e}")
+    
+    @staticmethod
+    def request_overlay():
+        if not Android.is_android:
+            print("[PC] Overlay nao disponivel")
+            return
+        try:
+            from jnius import autoclass
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            Settings = autoclass('android.provider.Settings')
+            Uri = autoclass('android.net.Uri')
+            Intent = autoclass('android.content.Intent')
+            
+            if not Settings.canDrawOverlays(activity):
+                intent = Intent(
+                    Settings.ACTION_MANAGE_OVERLAY_PERMISSION,
+                    Uri.parse("package:" + activity.getPackageName())
+                )
+                activity.startActivityForResult(intent, 1234)
+        except Exception as e:
+            print(f"Overlay error: {e}")
+    
+    @staticmethod
+    def request_accessibility():
+        if not Android.is_android:
+            print("[PC] Acessibilidade nao disponivel")
+            return
+        try:
+            from jnius import autoclass
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            Settings = autoclass('android.provider.Settings')
+            Intent = autoclass('android.content.Intent')
+            
+            intent = Intent(Settings.ACTION_ACCESSIBILITY_SETTINGS)
+            activity.startActivity(intent)
+        except Exception as e:
+            print(f"Access error: {e}")
+    
+    @staticmethod
+    def request_write_settings():
+        if not Android.is_android:
+            return
+        try:
+            from jnius import autoclass
+            activity = autoclass('org.kivy.android.PythonActivity').mActivity
+            Settings = autoclass('android.provider.Settings')
+            Uri = autoclass('android.net.Uri')
+            Intent = autoclass('android.content.Intent')
+            
+            if not Settings.System.canWrite(activity):
+                intent = Intent(
+                    Settings.ACTION_MANAGE_WRITE_SETTINGS,
+                    Uri.parse("package:" + activity.getPackageName())
+                )
+                activity.startActivity(intent)
+        except Exception as e:
+            print(f"Write settings error: {e}")
+    
+    @staticmethod
+    def get_injector():
+        """Injetor persistente (iniciado no primeiro gesto)
+        
+        Toques vao direto para o touchscreen quando ele abre para escrita;
+        teclas, texto (e os toques, se nao abrir) vao como `input` pelo shell.
+        """
+        if Android._injector is None:
+            from injector import InputInjector, TouchWriter
+            Android._injector = InputInjector(
+                writer=TouchWriter.find(),
+                motion=Android.motion_events(),
+                startup=Android.INPUT_STARTUP,
+            )
+        return Android._injector
+    
+    @staticmethod
+    def arbitrate(fn, cancel=None):
+        """Executa fn() com o canal de entrada, na vez do macro atual
+        
+        Prioridade e dono vem do RunContext da thread; sem contexto (UI),
+        o pedido entra com prioridade 0.
+        """
+        ctx = RunContext.current()
+        if ctx is None:
+            return Android.arbiter.run(fn, cancel=cancel)[1]
+        # A parada forcada nao pode cair no meio da fila do arbitro ou do injetor
+        with ctx.critical():
+            ok, result = Android.arbiter.run(fn, ctx.group, ctx.priority, cancel or ctx.cancel, ctx.name)
+        if not ok:
+            ctx.check()
+        return result
+    
+    @staticmethod
+    def input(gesture, cancel=None):
+        """Envia um gesto (tupla, ver injector) pelo injetor; retorna latencia em ms
+        
+        Sem `cancel`, vale o da execucao atual: parar o macro solta o dedo
+        no meio de um arrasto ou toque longo.
+        """
+        if cancel is None:
+            cancel = Android._run_cancel()
+        return Android.arbitrate(
+            lambda: Android.get_injector().send(gesture, cancel=cancel), cancel
+        )
+    
+    @staticmethod
+    def _run_cancel():
+        ctx = RunContext.current()
+        return ctx.cancel if ctx is not None else None
+    
+    @staticmethod
+    def batch(items, cancel=None):
+        """Envia varios gestos de uma vez (tupla = gesto, numero = pausa)
+        
+        `cancel` (threading.Event, por padrao o da execucao atual) libera a
+        espera assim que for sinalizado. O lote inteiro usa o canal sem
+        intercalar com outros macros.
+        """
+        if cancel is None:
+            cancel = Android._run_cancel()
+        if Android.is_android:
+            return Android.arbitrate(
+                lambda: Android.get_injector().send_batch(items, cancel=cancel), cancel
+            )
+        
+        def _print():
+            from injector import command
+            for item in items:
+                if cancel is not None and cancel.is_set():
+                    break
+                if isinstance(item, tuple):
+                    print(f"[PC] {command(item)}")
+                elif item > 0:
+                    if cancel is not None:
+                        cancel.wait(item)
+                    else:
+                        time.sleep(item)
+        
+        return Android.arbitrate(_print, cancel)
+    
+    @staticmethod
+    def motion_events():
+        """`input motionevent` existe a partir do Android 10 (API 29)"""
+        if Android._motion is None:
+            Android._motion = False
+            if Android.is_android:
+                try:
+                    from jnius import autoclass
+                    Android._motion = autoclass('android.os.Build$VERSION').SDK_INT >= 29
+                except Exception as e:
+                    print(f"SDK error: {e}")
+        return Android._motion
+    
+    @staticmethod
+    def tap(x, y):
+        if Android.is_android:
+            Android.input(('tap', x, y))
+        else:
+            print(f"[PC] TAP ({x}, {y})")
+    
+    @staticmethod
+    def swipe(x1, y1, x2, y2, ms=300):
+        if Android.is_android:
+            Android.input(('swipe', x1, y1, x2, y2, ms))
+        else:
+            print(f"[PC] SWIPE ({x1},{y1})->({x2},{y2})")
+    
+    @staticmethod
+    def long_press(x, y, ms=1000):
+        if Android.is_android:
+            Android.input(('long_press', x, y, ms))
+        else:
+            print(f"[PC] LONG ({x}, {y})")
+    
+    @staticmethod
+    def path(points, ms=None):
+        if Android.is_android:
+            Android.input(path_gesture(points, ms))
+        else:
+            print(f"[PC] PATH {len(points)} pontos")
+    
+    @staticmethod
+    def key(code):
+        if Android.is_android:
+            Android.input(('key', code))
+    
+    @staticmethod
+    def type_text(text):
+        if Android.is_android:
+            Android.input(('text', text))
+    
+    @staticmethod
+    def screenshot(path=None):
+        if path is None:
+            path = '/sdcard/macro_screen.png'
+        if Android.is_android:
+            os.system(f'screencap -p {path}')
+        return path
+    
+    @staticmethod
+    def capture(reuse=True):
+        """Captura a tela em memoria (Frame RGBA) sem gravar PNG
+        
+        Com reuse=True o quadro aponta para um buffer reutilizado na
+        proxima captura. Retorna None fora do Android.
+        """
+        if not Android.is_android:
+            return None
+        if Android._capture is None:
+            from capture import ScreenCapture
+            Android._capture = ScreenCapture()
+        try:
+            return Android._capture.grab(reuse)
+        except Exception as e:
+            print(f"Capture error: {e}")
+            return None
+    
+    @staticmethod
+    def _grab_fresh():
+        frame = Android.capture(reuse=False)
+        if frame is None:
+            path = Android.screenshot()
+            if os.path.exists(path):
+                from capture import load_frame
+                frame = load_frame(path)
+        return frame
+    
+    @staticmethod
+    def frame(max_age=None):
+        """Quadro compartilhado entre todos os macros (ou None)
+        
+        Reaproveita a ultima captura se tiver no maximo `max_age` seg
+        (padrao CAPTURE_INTERVAL). O quadro e somente leitura.
+        """
+        if Android._broker is None:
+            from capture import CaptureBroker
+            Android._broker = CaptureBroker(Android._grab_fresh, Android.CAPTURE_INTERVAL)
+        return Android._broker.get(max_age)
+    
+    @staticmethod
+    def toast(msg):
+        if Android.toast_hook is not None:
+            Android.toast_hook(str(msg))
+            return
+        if not Android.is_android:
+            print(f"[TOAST] {msg}")
+            return
+        try:
+            from jnius import autoclass
+            from android.runnable import run_on_ui_thread
+            activity = Android.context()
+            Toast = autoclass('android.widget.Toast')
+            
+            @run_on_ui_thread
+            def show():
+                Toast.makeText(activity, str(msg), Toast.LENGTH_SHORT).show()
+            show()
+        except:
+            pass
+    
+    @staticmethod
+    def vibrate(ms=100):
+        if Android.is_android:
+            try:
+                from jnius import autoclass
+                activity = Android.context()
+                Context = autoclass('android.content.Context')
+                vibrator = activity.getSystemService(Context.VIBRATOR_SERVICE)
+                vibrator.vibrate(ms)
+            except:
+                pass
+    
+    @staticmethod
+    def battery():
+        if Android.is_android:
+            try:
+                from jnius import autoclass
+                activity = Android.context()
+                Context = autoclass('android.content.Context')
+                BM = autoclass('android.os.BatteryManager')
+                bm = activity.getSystemService(Context.BATTERY_SERVICE)
+                return bm.getIntProperty(BM.BATTERY_PROPERTY_CAPACITY)
+            except:
+                pass
+        return 100
+    
+    @staticmethod
+    def launch_app(package):
+        if Android.is_android:
+            try:
+                from jnius import autoclass
+                activity = Android.context()
+                Intent = autoclass('android.content.Intent')
+                pm = activity.getPackageManager()
+                intent = pm.getLaunchIntentForPackage(package)
+                if intent:
+                    # Necessario quando quem abre e o servico
+                    intent.addFlags(Intent.FLAG_ACTIVITY_NEW_TASK)
+                    activity.startActivity(intent)
+                    return True
+            except:
+                pass
+        return False
+    
+    @staticmethod
+    def brightness(val):
+        if Android.is_android:
+            try:
+                from jnius import autoclass
+                activity = Android.context()
+                Settings = autoclass('android.provider.Settings')
+                Settings.System.putInt(
+                    activity.getContentResolver(),
+                    Settings.System.SCREEN_BRIGHTNESS,
+                    int(val)
+                )
+            except:
+                pass
+
+
+def timed_points(points, ms=None):
+    """Pontos como [x, y, t_ms]; (x, y) sem tempo sao espalhados em `ms`"""
+    points = list(points)
+    if points and len(points[0]) < 3:
+        step = (ms or 300) / max(len(points) - 1, 1)
+        return [[int(p[0]), int(p[1]), int(round(i * step))] for i, p in enumerate(points)]
+    return [[int(p[0]), int(p[1]), int(p[2])] for p in points]
+
+
+def path_gesture(points, ms=None):
+    """Gesto 'path' do injetor: pontos (x, y, t_ms) e duracao total em ms"""
+    points = timed_points(points, ms)
+    end = max(ms or 0, points[-1][2] if points else 0)
+    return ('path', tuple(tuple(p) for p in points), end)
+
+
+# ============================================================
+# SCRIPT ENGINE
+# ============================================================
+
+class ScriptStopped(BaseException):
+    """Execucao interrompida (parar, stop ou tempo limite)
+    
+    Herda de BaseException para nao ser engolida por `except Exception`
+    dentro dos scripts.
+    """
+
+
+class RunContext:
+    """Estado isolado de uma execucao: saida, tags e cancelamento"""
+    
+    _ids = itertools.count(1)
+    _local = threading.local()
+    
+    # Segundos de tolerancia antes de interromper a thread a forca
+    PREEMPT_AFTER = 0.05
+    
+    def __init__(self, tags=None, name='', images=None, priority=0, group=None):
+        self.id = next(RunContext._ids)
+        self.name = name
+        self.priority = priority
+        # Dono no arbitro de entrada (o macro; execucoes avulsas usam o id)
+        self.group = self.id if group is None else group
+        self.output = StringIO()
+        self.tags = dict(tags or {})
+        self.images = list(images or [])
+        self.cancel = threading.Event()
+        self.reason = None
+        self.future = None
+        self.waits = []
+        # Erros das acoes 'script' (exec_in): a execucao segue, mas falha no fim
+        self.errors = []
+        # on_log(ctx, linha) recebe cada log assim que e escrito
+        self.on_log = None
+        self._thread_id = None
+        self._lock = threading.Lock()
+        # Trechos critical() em andamento e parada forcada adiada/injetada
+        self._critical = 0
+        self._deferred = False
+        self._preempted = False
+    
+    @property
+    def stopped(self):
+        return self.cancel.is_set()
+    
+    def stop(self, reason='parado'):
+        """Pede a parada; se o script nao cooperar, interrompe a thread"""
+        if self.cancel.is_set():
+            return
+        self.reason = reason
+        self.cancel.set()
+        if self._thread_id is not None and self._thread_id != threading.get_ident():
+            self._preempt_later()
+    
+    def halt(self):
+        """parar() dentro do script: encerra na hora"""
+        self.stop()
+        raise ScriptStopped(self.reason)
+    
+    def check(self):
+        """Levanta ScriptStopped se a execucao foi cancelada"""
+        if self.cancel.is_set():
+            raise ScriptStopped(self.reason)
+    
+    def wait(self, seconds):
+        """Espera interrompivel (substitui time.sleep nos scripts)"""
+        if self.cancel.wait(max(0, seconds)):
+            raise ScriptStopped(self.reason)
+    
+    def wait_until(self, deadline):
+        """Espera ate o prazo absoluto (time.monotonic)"""
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            self.wait(remaining)
+        else:
+            self.check()
+    
+    def guard(self, fn):
+        """Envolve uma funcao da API com checagem de cancelamento"""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.check()
+            return fn(*args, **kwargs)
+        return wrapper
+    
+    def exclusive(self):
+        """with exclusivo(): gestos deste macro sem intercalar com outros"""
+        return self._exclusive()
+    
+    @contextlib.contextmanager
+    def _exclusive(self):
+        self.check()
+        section = Android.arbiter.exclusive(self.group, self.priority, self.cancel, self.name)
+        with self.critical():
+            try:
+                section.__enter__()
+            except InterruptedError:
+                raise ScriptStopped(self.reason)
+        try:
+            yield
+        finally:
+            with self.critical(raising=False):
+                section.__exit__(None, None, None)
+    
+    @contextlib.contextmanager
+    def critical(self, raising=True):
+        """Trecho que a parada forcada nao pode cortar (arbitro, injetor)
+        
+        _preempt adia a excecao ate o fim do trecho. Se ela ja foi injetada
+        e ainda nao disparou, e descartada na entrada, que levanta o
+        ScriptStopped no lugar (ou so segue, com `raising=False`, em
+        limpezas que precisam rodar).
+        """
+        with self._lock:
+            stop = self._preempted
+            if stop:
+                self._clear_preempt()
+            self._critical += 1
+        try:
+            if stop and raising:
+                raise ScriptStopped(self.reason)
+            yield
+        finally:
+            with self._lock:
+                self._critical -= 1
+                rearm = self._deferred and not self._critical
+                if rearm:
+                    self._deferred = False
+            if rearm:
+                self._preempt_later()
+    
+    @staticmethod
+    def current():
+        """Contexto da execucao rodando nesta thread (ou None)"""
+        return getattr(RunContext._local, 'ctx', None)
+    
+    def attach(self):
+        with self._lock:
+            self._thread_id = threading.get_ident()
+        RunContext._local.ctx = self
+    
+    def detach(self):
+        with self._lock:
+            if self._preempted:
+                self._clear_preempt()
+            self._thread_id = None
+        RunContext._local.ctx = None
+    
+    def _preempt_later(self):
+        t = threading.Timer(self.PREEMPT_AFTER, self._preempt)
+        t.daemon = True
+        t.start()
+    
+    def _preempt(self):
+        # Injeta ScriptStopped na thread que ainda roda (ex.: loop sem chamadas da API)
+        import ctypes
+        with self._lock:
+            if self._thread_id is None or self._preempted:
+                return
+            if self._critical:
+                self._deferred = True
+                return
+            self._preempted = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(self._thread_id),
+                ctypes.py_object(ScriptStopped)
+            )
+    
+    def _clear_preempt(self):
+        # Descarta a excecao injetada que ainda nao disparou (na propria thread, com _lock)
+        import ctypes
+        self._preempted = False
+        if self._thread_id == threading.get_ident():
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self._thread_id), None)
+    
+    def log(self, msg):
+        line = f"[{time.strftime('%H:%M:%S')}] {msg}\n"
+        self.output.write(line)
+        if self.on_log is not None:
+            self.on_log(self, line)
+    
+    def get_tag(self, name, default=None):
+        return self.tags.get(name, default)
+    
+    def set_tag(self, name, value):
+        self.tags[name] = value
+
+
+class ScriptEngine:
+    """Executa scripts Python com API de automacao"""
+    
+    # Codigos compilados mantidos em memoria (LRU)
+    CACHE_SIZE = 64
+    
+    # Execucoes avulsas simultaneas (editor, pre-processamento); as demais
+    # esperam na fila
+    MAX_WORKERS = 8
+    
+    # Segundos ociosa ate uma thread de macro ser encerrada
+    MACRO_IDLE = 60
+    
+    def __init__(self, dispatch=None):
+        self.pool = WorkerPool(self.MAX_WORKERS, name='engine')
+        # Macros costumam rodar sem fim (while True): cada um tem sua thread,
+        # sem limite, para nenhum ficar na fila parecendo que esta rodando
+        self.macro_pool = WorkerPool(None, name='macro', idle_timeout=self.MACRO_IDLE)
+        # dispatch(fn) entrega os callbacks de run() (o app usa o Clock do Kivy)
+        self.dispatch = dispatch or (lambda fn: fn())
+        # on_log(ctx, linha) de todas as execucoes (log ao vivo)
+        self.on_log = None
+        self.runs = {}
+        self._runs_lock = threading.Lock()
+        self._code_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_disk_hits = 0
+    
+    def get_api(self, ctx):
+        """Retorna funcoes disponiveis nos scripts de uma execucao
+        
+        Toda funcao que age no dispositivo checa o cancelamento antes.
+        """
+        g = ctx.guard
+        return {
+            'tap': g(Android.tap),
+            'toque': g(Android.tap),
+            'swipe': g(Android.swipe),
+            'arrastar': g(Android.swipe),
+            'long_press': g(Android.long_press),
+            'path': g(Android.path),
+            'trajeto': g(Android.path),
+            'segurar': g(Android.long_press),
+            'esperar': ctx.wait,
+            'wait': ctx.wait,
+            'sleep': ctx.wait,
+            'digitar': g(Android.type_text),
+            'type_text': g(Android.type_text),
+            'tecla': g(Android.key),
+            'key': g(Android.key),
+            'screenshot': g(self._screenshot),
+            'captura': g(self._screenshot),
+            'find_image': g(self._find_image),
+            'procurar_imagem': g(self._find_image),
+            'tap_image': g(self._tap_image),
+            'tocar_imagem': g(self._tap_image),
+            'find_images': g(functools.partial(self._find_images, ctx)),
+            'procurar_imagens': g(functools.partial(self._find_images, ctx)),
+            'best_image': g(functools.partial(self._best_image, ctx)),
+            'melhor_imagem': g(functools.partial(self._best_image, ctx)),
+            'imagens': lambda: list(ctx.images),
+            'pixel': g(self._pixel),
+            'pixels': g(self._pixels),
+            'color_in_region': g(self._color_in_region),
+            'cor_na_regiao': g(self._color_in_region),
+            'read_text': g(self._read_text),
+            'ler_texto': g(self._read_text),
+            'read_number': g(self._read_number),
+            'ler_numero': g(self._read_number),
+            'images': lambda: list(ctx.images),
+            'home': g(lambda: Android.key('KEYCODE_HOME')),
+            'voltar': g(lambda: Android.key('KEYCODE_BACK')),
+            'back': g(lambda: Android.key('KEYCODE_BACK')),
+            'toast': g(Android.toast),
+            'vibrar': g(Android.vibrate),
+            'bateria': Android.battery,
+            'battery': Android.battery,
+            'brilho': g(Android.brightness),
+            'brightness': g(Android.brightness),
+            'abrir_app': g(Android.launch_app),
+            'launch': g(Android.launch_app),
+            'log': ctx.log,
+            'print': ctx.log,
+            'tag': ctx.get_tag,
+            'get_tag': ctx.get_tag,
+            'set_tag': ctx.set_tag,
+            'definir_tag': ctx.set_tag,
+            'tags': lambda: ctx.tags.copy(),
+            'exclusive': ctx.exclusive,
+            'exclusivo': ctx.exclusive,
+            'parar': ctx.halt,
+            'stop': ctx.halt,
+            'wait_for_image': g(functools.partial(self._wait_for_image, ctx)),
+            'esperar_imagem': g(functools.partial(self._wait_for_image, ctx)),
+            'wait_for_pixel': g(functools.partial(self._wait_for_pixel, ctx)),
+            'esperar_pixel': g(functools.partial(self._wait_for_pixel, ctx)),
+            'wait_until_screen_stable': g(functools.partial(self._wait_stable, ctx)),
+            'esperar_tela_parar': g(functools.partial(self._wait_stable, ctx)),
+            'last_wait': lambda: ctx.waits[-1] if ctx.waits else None,
+            'ultima_espera': lambda: ctx.waits[-1] if ctx.waits else None,
+            'aleatorio': self._random,
+            'random': self._random,
+            'ler_arquivo': self._read,
+            'read_file': self._read,
+            'escrever_arquivo': self._write,
+            'write_file': self._write,
+            'time': time,
+            'os': os,
+            'json': json,
+        }
+    
+    def _screenshot(self, path=None, region=None):
+        """Screenshot em arquivo; com `region` (x, y, w, h) grava so o recorte"""
+        if region is None:
+            return Android.screenshot(path)
+        
+        from PIL import Image
+        if path is None:
+            path = '/sdcard/macro_screen.png'
+        frame = Android.frame()
+        if frame is not None:
+            Image.fromarray(frame.crop(region).rgba).save(path)
+        return path
+    
+    def _find_image(self, path, threshold=0.8, region=None):
+        """Procura a imagem na tela; retorna Match (x, y, score, ...) ou None
+        
+        `region` (x, y, w, h) restringe a busca; se os pixels da regiao nao
+        mudaram desde a ultima busca, o resultado anterior e reaproveitado.
+        O quadro vem da captura compartilhada entre os macros.
+        """
+        import vision
+        frame = Android.frame()
+        if frame is None:
+            return None
+        return vision.find_image(path, threshold, frame, region)
+    
+    def _find_images(self, ctx, paths=None, threshold=0.8, region=None, stop_at=None):
+        """Procura varias imagens numa passada so; lista de Match/None
+        
+        Sem `paths`, usa as imagens do macro. A tela e pre-processada uma
+        vez para todas; com `stop_at`, para na primeira com score >= stop_at.
+        """
+        import vision
+        paths = ctx.images if paths is None else paths
+        frame = Android.frame()
+        if frame is None or not paths:
+            return [None] * len(paths)
+        return vision.find_images(paths, threshold, frame, region, stop_at)
+    
+    def _pixel(self, x, y, max_age=None):
+        """Cor (r, g, b) do pixel (x, y) no quadro compartilhado"""
+        return self._pixels([(x, y)], max_age)[0]
+    
+    def _pixels(self, points, max_age=None):
+        """Cores (r, g, b) de varios pontos [(x, y), ...] num so acesso
+        
+        Usa o quadro atual se tiver no maximo `max_age` seg; senao captura.
+        """
+        import vision
+        frame = Android.frame(max_age)
+        if frame is None:
+            return [None] * len(points)
+        return [tuple(c) for c in vision.sample(frame.rgba, points).tolist()]
+    
+    def _color_in_region(self, region, rgb, tolerance=10, max_age=None):
+        """Fracao (0..1) da regiao (x, y, w, h) com a cor rgb (+- tolerance)
+        
+        0.0 se a cor nao aparece; serve direto como condicao em `if`.
+        """
+        import vision
+        frame = Android.frame(max_age)
+        if frame is None:
+            return 0.0
+        return vision.color_ratio(frame.rgba, rgb, tolerance, region)
+    
+    def _read_text(self, region=None, glyphs=None, chars=None):
+        """Le texto (digitos por padrao) da regiao (x, y, w, h) da tela
+        
+        `glyphs` e uma pasta com uma imagem por caractere (`0.png`,
+        `barra.png`...) para ler a fonte do app; sem ela usa a fonte
+        embutida. Regioes que nao mudaram devolvem a leitura anterior.
+        """
+        import ocr
+        frame = Android.frame()
+        if frame is None:
+            return ''
+        return ocr.read_text(frame, region, glyphs, chars or ocr.DEFAULT_CHARS)
+    
+    def _read_number(self, region=None, glyphs=None):
+        """Primeiro numero lido na regiao (int/float) ou None"""
+        import ocr
+        return ocr.parse_number(self._read_text(region, glyphs))
+    
+    def _best_image(self, ctx, paths=None, threshold=0.8, region=None):
+        """(indice, Match) da imagem com maior score, ou (-1, None)"""
+        matches = self._find_images(ctx, paths, threshold, region)
+        best = (-1, None)
+        for i, m in enumerate(matches):
+            if m is not None and (best[1] is None or m.score > best[1].score):
+                best = (i, m)
+        return best
+    
+    # ---- ESPERAS POR EVENTO ----
+    
+    # Intervalo de checagem: comeca curto e cresce enquanto a tela nao muda
+    POLL_MIN = 0.05
+    POLL_MAX = 0.5
+    POLL_GROWTH = 1.5
+    
+    def _poll(self, ctx, name, check, timeout):
+        """Repete check(frame) com intervalo adaptativo ate ter resultado
+        
+        check retorna (resultado, digest); quando o digest muda a tela
+        esta mexendo e o intervalo volta ao minimo. Registra em ctx.waits
+        o tempo total e a latencia de reacao (intervalo entre a ultima
+        captura sem resultado e a que detectou).
+        """
+        start = time.perf_counter()
+        interval = self.POLL_MIN
+        last_digest = None
+        last_poll = start
+        polls = 0
+        
+        while True:
+            now = time.perf_counter()
+            frame = Android.frame()
+            result, digest = check(frame) if frame is not None else (None, None)
+            polls += 1
+            
+            done = bool(result)
+            timed_out = not done and timeout is not None and now - start >= timeout
+            if done or timed_out:
+                ctx.waits.append({
+                    'name': name,
+                    'ok': done,
+                    'elapsed_ms': (time.perf_counter() - start) * 1000,
+                    'reaction_ms': (time.perf_counter() - last_poll) * 1000 if polls > 1 else 0.0,
+                    'polls': polls,
+                })
+                return result if done else None
+            
+            if digest != last_digest:
+                interval = self.POLL_MIN
+            else:
+                interval = min(interval * self.POLL_GROWTH, self.POLL_MAX)
+            last_digest = digest
+            last_poll = now
+            
+            if timeout is not None:
+                interval = min(interval, max(0, start + timeout - time.perf_counter()))
+            ctx.wait(interval)
+    
+    def _wait_for_image(self, ctx, path, timeout=10, threshold=0.8, region=None):
+        """Espera a imagem aparecer; retorna Match ou None no tempo limite"""
+        import vision
+        
+        def check(frame):
+            pixels, _, _ = vision.crop(frame.rgba, region)
+            return vision.find_image(path, threshold, frame, region), vision.region_digest(pixels)
+        
+        return self._poll(ctx, 'wait_for_image', check, timeout)
+    
+    def _wait_for_pixel(self, ctx, x, y, rgb, tolerance=10, timeout=10):
+        """Espera o pixel (x, y) ficar com a cor rgb (+- tolerance)"""
+        import vision
+        
+        def check(frame):
+            px = vision.sample(frame.rgba, [(x, y)])
+            return bool(vision.color_mask(px, rgb, tolerance)[0]), px.tobytes()
+        
+        return bool(self._poll(ctx, 'wait_for_pixel', check, timeout))
+    
+    def _wait_stable(self, ctx, region=None, stable_for=0.5, timeout=10):
+        """Espera a tela (ou regiao) ficar sem mudancas por `stable_for` seg"""
+        import vision
+        state = {'digest': None, 'since': None}
+        
+        def check(frame):
+            pixels, _, _ = vision.crop(frame.rgba, region)
+            digest = vision.region_digest(pixels)
+            now = time.perf_counter()
+            if digest != state['digest']:
+                state['digest'] = digest
+                state['since'] = now
+            return now - state['since'] >= stable_for, digest
+        
+        return bool(self._poll(ctx, 'wait_until_screen_stable', check, timeout))
+    
+    def _tap_image(self, path, threshold=0.8, region=None):
+        """Toca no centro da imagem, se encontrada"""
+        match = self._find_image(path, threshold, region)
+        if match:
+            Android.tap(match.x, match.y)
+        return match
+    
+    def _random(self, a, b):
+        import random
+        if isinstance(a, int) and isinstance(b, int):
+            return random.randint(a, b)
+        return random.uniform(a, b)
+    
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except:
+            return None
+    
+    def _write(self, path, content):
+        try:
+            with open(path, 'w') as f:
+                f.write(str(content))
+            return True
+        except:
+            return False
+    
+    def compile(self, code):
+        """Compila o codigo, reaproveitando cache em memoria e em disco"""
+        key = hashlib.sha1(code.encode('utf-8')).hexdigest()
+        
+        with self._cache_lock:
+            obj = self._code_cache.get(key)
+            if obj is not None:
+                self._code_cache.move_to_end(key)
+                self.cache_hits += 1
+                return obj
+        
+        obj = self._load_bytecode(key)
+        if obj is None:
+            obj = compile(code, '<script>', 'exec')
+            self._save_bytecode(key, obj)
+        else:
+            self.cache_disk_hits += 1
+        
+        with self._cache_lock:
+            self._code_cache[key] = obj
+            while len(self._code_cache) > self.CACHE_SIZE:
+                self._code_cache.popitem(last=False)
+            self.cache_misses += 1
+        return obj
+    
+    @staticmethod
+    def _bytecode_path(key):
+        return os.path.join(BYTECODE_DIR, key + '.bin')
+    
+    def _load_bytecode(self, key):
+        path = self._bytecode_path(key)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(importlib.util.MAGIC_NUMBER)) != importlib.util.MAGIC_NUMBER:
+                    return None
+                obj = marshal.loads(f.read())
+            # mtime marca o ultimo uso (a limpeza descarta os mais antigos)
+            os.utime(path)
+            return obj
+        except Exception:
+            return None
+    
+    def _save_bytecode(self, key, obj):
+        try:
+            os.makedirs(BYTECODE_DIR, exist_ok=True)
+            tmp = self._bytecode_path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(importlib.util.MAGIC_NUMBER)
+                f.write(marshal.dumps(obj))
+            os.replace(tmp, self._bytecode_path(key))
+        except Exception as e:
+            print(f"Bytecode save error: {e}")
+            return
+        self._prune_bytecode()
+    
+    def _prune_bytecode(self):
+        """Mantem no disco so os CACHE_SIZE codigos usados mais recentemente"""
+        try:
+            entries = []
+            for entry in os.scandir(BYTECODE_DIR):
+                if entry.name.endswith('.bin'):
+                    entries.append((entry.stat().st_mtime, entry.path))
+            entries.sort()
+            for _, path in entries[:-self.CACHE_SIZE]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Bytecode prune error: {e}")
+    
+    def cache_stats(self):
+        """Contadores do cache de codigo compilado"""
+        with self._cache_lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'disk_hits': self.cache_disk_hits,
+                'size': len(self._code_cache),
+            }
+    
+    def submit(self, fn, *args, priority=0, long=False):
+        """Agenda uma funcao no pool do engine; retorna Future
+        
+        Com long=True (execucoes de macro) vai para o pool sem limite.
+        """
+        pool = self.macro_pool if long else self.pool
+        return pool.submit(fn, *args, priority=priority)
+    
+    def spawn(self, fn, tags=None, name='', priority=0, timeout=None, images=None, group=None,
+              long=False):
+        """Executa fn(ctx) no pool com um RunContext proprio
+        
+        Com `timeout` (segundos), um watchdog para a execucao ao estourar.
+        `priority` vale para o pool e para o canal de entrada; `group`
+        (ex.: id do macro) divide o canal de forma justa entre execucoes.
+        `long` marca execucoes de macro, que nunca esperam na fila.
+        """
+        ctx = RunContext(tags, name, images, priority, group)
+        ctx.on_log = self.on_log
+        with self._runs_lock:
+            self.runs[ctx.id] = ctx
+        
+        def _task():
+            watchdog = None
+            try:
+                ctx.attach()
+                try:
+                    if timeout:
+                        watchdog = threading.Timer(timeout, ctx.stop, ('tempo limite',))
+                        watchdog.daemon = True
+                        watchdog.start()
+                    return fn(ctx)
+                finally:
+                    ctx.detach()
+                    if watchdog:
+                        watchdog.cancel()
+                    with self._runs_lock:
+                        self.runs.pop(ctx.id, None)
+                    if group is None:
+                        Android.arbiter.forget(ctx.group)
+            except ScriptStopped:
+                return None
+        
+        ctx.future = self.submit(_task, priority=priority, long=long)
+        return ctx
+    
+    def run(self, code, callback=None, priority=0, tags=None, name='', timeout=None,
+            images=None, group=None, long=False):
+        """Executa codigo no pool de workers; retorna o RunContext"""
+        def script(ctx):
+            exec(self.compile(code), self.get_api(ctx))
+        
+        return self.execute(script, callback, priority, tags, name, timeout, images, group, long)
+    
+    def execute(self, fn, callback=None, priority=0, tags=None, name='', timeout=None,
+                images=None, group=None, long=False):
+        """Executa fn(ctx) como um script: callback(result) com ok, erro, saida e tags
+        
+        Erros registrados em ctx.errors (acoes 'script' de um plano) tambem
+        fazem a execucao falhar.
+        """
+        def _exec(ctx):
+            start = time.perf_counter()
+            try:
+                fn(ctx)
+                result = {'ok': True}
+            except ScriptStopped:
+                ctx.detach()
+                result = {'ok': ctx.reason != 'tempo limite', 'stopped': ctx.reason}
+                if not result['ok']:
+                    result['error'] = f'Tempo limite de {timeout}s excedido'
+            except Exception as e:
+                import traceback
+                result = {
+                    'ok': False,
+                    'error': str(e),
+                    'trace': traceback.format_exc()
+                }
+            if ctx.errors and result['ok']:
+                result['ok'] = False
+                result['error'] = '\n'.join(ctx.errors)
+            result['output'] = ctx.output.getvalue()
+            result['tags'] = ctx.tags
+            result['ms'] = (time.perf_counter() - start) * 1000
+            
+            if callback:
+                self.dispatch(lambda: callback(result))
+            return result
+        
+        return self.spawn(_exec, tags, name, priority, timeout, images, group, long)
+    
+    def exec_in(self, ctx, code):
+        """Executa codigo dentro de uma execucao em andamento (acao 'script')
+        
+        Usa o RunContext de quem chamou: mesmo cancelamento, tags e vez no
+        canal de entrada. Erros do codigo vao para o log e para ctx.errors
+        (a execucao termina como falha) e o macro segue.
+        """
+        try:
+            exec(self.compile(code), self.get_api(ctx))
+        except Exception as e:
+            ctx.errors.append(f"Script error: {e}")
+            ctx.log(f"Script error: {e}")
+    
+    def stop(self, ctx=None):
+        """Para uma execucao (ou todas, se ctx for None)"""
+        if ctx is not None:
+            ctx.stop()
+            return
+        with self._runs_lock:
+            runs = list(self.runs.values())
+        for c in runs:
+            c.stop()
+
+
+# ============================================================
+# DADOS
+# ============================================================
+
+if IS_ANDROID:
+    from android.storage import app_storage_path
+    DATA_DIR = app_storage_path()
+else:
+    DATA_DIR = os.path.expanduser('~/.macrovision')
+
+os.makedirs(DATA_DIR, exist_ok=True)
+SAVE_FILE = os.path.join(DATA_DIR, 'save.json')
+INDEX_FILE = os.path.join(DATA_DIR, 'index.json')
+MACROS_DIR = os.path.join(DATA_DIR, 'macros')
+BYTECODE_DIR = os.path.join(DATA_DIR, 'bytecode')
+# Gravacao do getevent reproduzida no lugar do touchscreen (PC)
+EVENTS_FILE = os.path.join(DATA_DIR, 'events.log')
+# Token do canal local app <-> servico (ipc.py), gravado pelo servico
+IPC_TOKEN_FILE = os.path.join(DATA_DIR, 'ipc.token')
+
+
+class MacroAction:
+    def __init__(self):
+        self.name = 'Nova Acao'
+        self.type = 'tap'
+        self.enabled = True
+        self.x = 500
+        self.y = 800
+        self.x2 = 500
+        self.y2 = 400
+        self.duration = 300
+        self.wait_sec = 1.0
+        self.script = ''
+        self.key_code = 'KEYCODE_BACK'
+        self.text = ''
+        self.app_pkg = ''
+        self.repeats = 1
+        self.delay = 0.5
+        self.points = []
+    
+    def to_dict(self):
+        return self.__dict__.copy()
+    
+    @staticmethod
+    def from_dict(d):
+        a = MacroAction()
+        for k, v in d.items():
+            if hasattr(a, k):
+                setattr(a, k, v)
+        return a
+
+
+# Tipos de acao que podem ir juntos num lote para o injetor (gestos
+# seguidos, sem pausa: as pausas ficam fora e liberam o canal de entrada)
+BATCH_TYPES = ('tap', 'swipe', 'long_press', 'path', 'key', 'text')
+
+# Tamanho maximo de um lote (entre lotes o runner checa se deve parar e
+# outros macros podem usar o canal de entrada: e a fatia de tempo de cada um)
+BATCH_MAX = 50
+BATCH_MAX_SEC = 0.5
+
+
+def split_batch(entries):
+    """Divide um lote em fatias por numero de comandos e tempo de canal
+    
+    `entries` sao pares (gesto, segundos que ele segura o canal, ver
+    action_seconds). Uma fatia passa de BATCH_MAX_SEC so quando
+    um unico gesto ja e mais longo que isso.
+    """
+    chunk = []
+    busy = 0.0
+    for item, seconds in entries:
+        if chunk and busy + seconds > BATCH_MAX_SEC:
+            yield chunk
+            chunk = []
+            busy = 0.0
+        chunk.append(item)
+        busy += seconds
+        if len(chunk) >= BATCH_MAX:
+            yield chunk
+            chunk = []
+            busy = 0.0
+    if chunk:
+        yield chunk
+
+
+def action_seconds(action):
+    """Tempo (seg) que o gesto de uma acao em lote segura o canal
+    
+    Conta a partida do `input` (pior caso, gesto pelo shell): pelo
+    TouchWriter o toque sai na hora e a fatia so fica mais curta.
+    """
+    t = action.type
+    ms = 0
+    if t in ('swipe', 'long_press'):
+        ms = action.duration
+    elif t == 'path':
+        points = timed_points(action.points, action.duration)
+        ms = max(action.duration or 0, points[-1][2] if points else 0)
+    return Android.INPUT_STARTUP + float(ms) / 1000
+
+
+def action_gesture(action):
+    """Gesto (tupla do injetor) de uma acao em lote"""
+    t = action.type
+    if t == 'tap':
+        return ('tap', action.x, action.y)
+    if t == 'swipe':
+        return ('swipe', action.x, action.y, action.x2, action.y2, action.duration)
+    if t == 'long_press':
+        return ('long_press', action.x, action.y, action.duration)
+    if t == 'path':
+        return path_gesture(action.points, action.duration)
+    if t == 'key':
+        return ('key', action.key_code)
+    if t == 'text':
+        return ('text', action.text)
+
+
+class MacroData:
+    def __init__(self, name='Novo Macro'):
+        self.id = int(time.time() * 1000)
+        self.name = name
+        self.actions = []
+        self.script = ''
+        self.tags = {}
+        self.images = []
+        self.is_running = False
+        self.loop = False
+        self.loop_count = 0
+        self.loop_delay = 1.0
+        self.schedule = ''
+        self.priority = 0
+        self.timeout = 0
+        self.runs = 0
+        self.loaded = True
+        self._summary = None
+        self._plan = None
+    
+    def summary(self):
+        """Resumo para a lista de macros (vem do indice se nao carregado)"""
+        if not self.loaded:
+            return dict(self._summary, name=self.name, runs=self.runs)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'actions': len(self.actions),
+            'images': len(self.images),
+            'tags': len(self.tags),
+            'runs': self.runs,
+        }
+    
+    def get_plan(self, engine):
+        """Plano compilado das acoes (recompila so apos invalidate_plan)"""
+        if self._plan is None or self._plan.engine is not engine:
+            self._plan = compile_plan(self, engine)
+        return self._plan
+    
+    def invalidate_plan(self):
+        self._plan = None
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'actions': [a.to_dict() for a in self.actions],
+            'script': self.script,
+            'tags': self.tags,
+            'images': self.images,
+            'loop': self.loop,
+            'loop_count': self.loop_count,
+            'loop_delay': self.loop_delay,
+            'schedule': self.schedule,
+            'priority': self.priority,
+            'timeout': self.timeout,
+            'runs': self.runs,
+        }
+    
+    def load_body(self, d):
+        """Preenche o corpo do macro a partir do dict salvo"""
+        self.name = d.get('name', self.name)
+        self.script = d.get('script', '')
+        self.tags = d.get('tags', {})
+        self.images = d.get('images', [])
+        self.loop = d.get('loop', False)
+        self.loop_count = d.get('loop_count', 0)
+        self.loop_delay = d.get('loop_delay', 1.0)
+        self.schedule = d.get('schedule', '')
+        self.priority = d.get('priority', 0)
+        self.timeout = d.get('timeout', 0)
+        self.runs = d.get('runs', 0)
+        self.actions = [MacroAction.from_dict(a) for a in d.get('actions', [])]
+        self.loaded = True
+        self._plan = None
+    
+    @staticmethod
+    def from_dict(d):
+        m = MacroData(d.get('name', 'Macro'))
+        m.id = d.get('id', m.id)
+        m.load_body(d)
+        return m
+    
+    @staticmethod
+    def from_summary(s):
+        """Macro ainda nao carregado, so com os dados do indice"""
+        m = MacroData(s.get('name', 'Macro'))
+        m.id = s['id']
+        m.runs = s.get('runs', 0)
+        m.loaded = False
+        m._summary = s
+        return m
+
+
+# ============================================================
+# PLANO DE EXECUCAO
+# ============================================================
+
+class ActionPlan:
+    """Acoes ja compiladas: tupla plana de (funcao, argumentos)"""
+    
+    __slots__ = ('steps', 'engine')
+    
+    def __init__(self, steps, engine):
+        self.steps = steps
+        self.engine = engine
+    
+    def __iter__(self):
+        return iter(self.steps)
+    
+    def __len__(self):
+        return len(self.steps)
+    
+    def run(self, ctx):
+        """Executa os passos, checando o cancelamento entre cada um
+        
+        Cada pausa conta a partir do fim do passo anterior (a tela precisa
+        assentar depois do gesto). Pausas seguidas encadeiam o prazo: o
+        atraso ao acordar de uma e descontado da seguinte. Os prazos
+        absolutos ficam no inicio das iteracoes (scheduler.Loop).
+        """
+        deadline = None
+        for fn, args in self.steps:
+            ctx.check()
+            if fn is time.sleep:
+                deadline = (time.monotonic() if deadline is None else deadline) + args[0]
+                ctx.wait_until(deadline)
+                continue
+            deadline = None
+            if fn is Android.batch:
+                fn(*args, cancel=ctx.cancel)
+            elif fn is ScriptEngine.exec_in:
+                fn(self.engine, ctx, *args)
+            else:
+                fn(*args)
+
+
+def compile_plan(macro, engine):
+    """Compila as acoes do macro num plano imutavel
+    
+    Remove acoes desativadas, expande repeticoes, junta gestos
+    consecutivos em lotes e liga cada passo a sua funcao. Pausas nunca
+    entram no lote: o arbitro cobra o tempo com o canal, e segurar o
+    canal parado so atrasaria os outros macros (e o proximo lote deste).
+    """
+    steps = []
+    batch = []
+    
+    def flush():
+        for chunk in split_batch(batch):
+            steps.append((Android.batch, (tuple(chunk),)))
+        batch.clear()
+    
+    for action in macro.actions:
+        if not action.enabled:
+            continue
+        
+        delay = action.delay if action.repeats > 1 else 0
+        
+        if action.type in BATCH_TYPES:
+            entry = (action_gesture(action), action_seconds(action))
+            for _ in range(action.repeats):
+                batch.append(entry)
+                if delay > 0:
+                    flush()
+                    steps.append((time.sleep, (delay,)))
+            continue
+        flush()
+        
+        t = action.type
+        if t == 'wait':
+            step = (time.sleep, (action.wait_sec,))
+        elif t == 'script':
+            # Roda na mesma execucao do macro: parar o macro para o script
+            step = (ScriptEngine.exec_in, (action.script,))
+        elif t == 'app':
+            step = (Android.launch_app, (action.app_pkg,))
+        else:
+            continue
+        
+        for _ in range(action.repeats):
+            steps.append(step)
+            if delay > 0:
+                steps.append((time.sleep, (delay,)))
+    flush()
+    
+    return ActionPlan(tuple(steps), engine)
+
+
+# ============================================================
+# EXECUCAO DOS MACROS
+# ============================================================
+
+class MacroRunner:
+    """Inicia e para macros (uma vez ou em loop) num ScriptEngine
+    
+    E o mesmo no app (PC) e no servico (Android). Os avisos passam pelo
+    dispatch do engine: on_status(macro) quando o macro termina sozinho,
+    on_result(macro, result) ao fim de cada execucao (script ou acoes) e
+    on_log(id, linha) a cada log (este direto da thread do script).
+    """
+    
+    def __init__(self, engine, on_status=None, on_result=None, on_log=None):
+        self.engine = engine
+        self.on_status = on_status
+        self.on_result = on_result
+        self.contexts = {}
+        self.loops = {}
+        if on_log is not None:
+            engine.on_log = lambda ctx, line: on_log(ctx.group, line)
+    
+    def start(self, macro):
+        """Executa o macro; em loop, segue o agendamento do macro
+        
+        As iteracoes do loop rodam em prazos absolutos (scheduler.Loop)
+        numa thread propria; cada uma ganha seu proprio contexto.
+        Levanta ValueError se o agendamento for invalido.
+        """
+        self.warm(macro.images)
+        
+        if not macro.script and not macro.actions:
+            return None
+        if not macro.loop:
+            macro.is_running = True
+            ctx = self._run_once(macro)
+            ctx.future.add_done_callback(lambda f: self._ended(macro, ctx))
+            return ctx
+        
+        from scheduler import Loop, parse_schedule
+        schedule = parse_schedule(macro.schedule, macro.loop_delay)
+        
+        def iteration():
+            ctx = self._run_once(macro)
+            try:
+                ctx.future.result()
+            except Exception as e:
+                print(f"Loop error: {e}")
+        
+        def finished(loop):
+            if self.loops.get(macro.id) is loop:
+                del self.loops[macro.id]
+                self.contexts.pop(macro.id, None)
+                self._notify(macro)
+        
+        macro.is_running = True
+        loop = Loop(iteration, schedule, macro.loop_count, name=macro.name)
+        self.loops[macro.id] = loop
+        return loop.start(finished)
+    
+    def _run_once(self, macro):
+        """Uma execucao do macro no seu proprio contexto"""
+        def on_done(result):
+            macro.tags.update(result['tags'])
+            if self.on_result:
+                self.on_result(macro, result)
+        
+        if macro.script:
+            ctx = self.engine.run(macro.script, on_done, macro.priority, macro.tags, macro.name,
+                                  macro.timeout, macro.images, macro.id, long=True)
+        
+        else:
+            def run_actions(ctx):
+                macro.get_plan(self.engine).run(ctx)
+            
+            ctx = self.engine.execute(run_actions, on_done, macro.priority, macro.tags, macro.name,
+                                      macro.timeout, macro.images, macro.id, long=True)
+        
+        self.contexts[macro.id] = ctx
+        return ctx
+    
+    def _ended(self, macro, ctx):
+        # Fim de uma execucao sem loop (se ninguem parou ou reiniciou antes)
+        if self.contexts.get(macro.id) is ctx:
+            del self.contexts[macro.id]
+            self._notify(macro)
+    
+    def _notify(self, macro):
+        macro.is_running = False
+        if self.on_status:
+            self.engine.dispatch(lambda: self.on_status(macro))
+    
+    def stop(self, macro):
+        """Para so este macro, sem afetar os outros"""
+        macro.is_running = False
+        loop = self.loops.pop(macro.id, None)
+        if loop:
+            loop.stop()
+        ctx = self.contexts.pop(macro.id, None)
+        if ctx:
+            self.engine.stop(ctx)
+    
+    def stop_all(self):
+        """Para todos os macros e execucoes avulsas"""
+        for loop in list(self.loops.values()):
+            loop.stop()
+        self.loops.clear()
+        self.contexts.clear()
+        self.engine.stop()
+    
+    def run_code(self, code, callback=None, tags=None, name=''):
+        """Execucao avulsa de um trecho de codigo (editor de script)"""
+        return self.engine.run(code, callback, tags=tags, name=name)
+    
+    def loop_stats(self, macro_id):
+        """Atrasos do loop em andamento (JitterStats.summary) ou None"""
+        loop = self.loops.get(macro_id)
+        return loop.stats.summary() if loop else None
+    
+    def warm(self, paths):
+        """Pre-processa imagens de referencia em segundo plano"""
+        if not paths:
+            return
+        
+        def _warm():
+            try:
+                import vision
+            except ImportError:
+                return
+            vision.templates.warm(paths)
+        
+        self.engine.submit(_warm, priority=10)
+    
+    def shutdown(self):
+        self.stop_all()
+        self.engine.pool.shutdown()
+        self.engine.macro_pool.shutdown()
+        if Android._injector:
+            Android._injector.close()
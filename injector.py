@@ -0,0 +1,615 @@
+"""Injecao de gestos sem um processo por gesto
+
+Toques, arrastos, toques longos e trajetos sao escritos direto no
+touchscreen (/dev/input/eventN) pelo TouchWriter: o dispositivo fica
+aberto e cada gesto e so uma sequencia de write() com os eventos do
+kernel, sem o app_process (uma JVM, ~100 ms de partida) que cada
+`input` sobe.
+
+Teclas, texto e os toques quando o touchscreen nao abre para escrita
+vao como comandos `input` por um shell persistente: ali o ganho e so o
+fork do sh, a partida do `input` continua em todo gesto.
+
+Gestos sao tuplas:
+    ('tap', x, y)
+    ('swipe', x1, y1, x2, y2, ms)
+    ('long_press', x, y, ms)
+    ('path', ((x, y, t_ms), ...), ms)
+    ('key', codigo)
+    ('text', texto)
+"""
+
+import os
+import re
+import time
+import shlex
+import signal
+import select
+import struct
+import tempfile
+import itertools
+import threading
+import subprocess
+
+
+# Gestos que o TouchWriter toca direto no touchscreen
+TOUCH = ('tap', 'swipe', 'long_press', 'path')
+
+# Tipos e codigos do kernel (linux/input-event-codes.h)
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0x00
+BTN_TOUCH = 0x14a
+ABS_MT_SLOT = 0x2f
+ABS_MT_TOUCH_MAJOR = 0x30
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+ABS_MT_PRESSURE = 0x3a
+
+# Eixos opcionais enviados a cada toque (fracao do maximo do eixo): sem
+# eles alguns drivers declaram pressao e o Android descarta toque com 0
+TOUCH_AXES = {
+    'ABS_MT_PRESSURE': (ABS_MT_PRESSURE, 0.5),
+    'ABS_MT_TOUCH_MAJOR': (ABS_MT_TOUCH_MAJOR, 0.05),
+}
+
+
+def command(gesture, motion=False, startup=0.0):
+    """Comando `input` (shell) de um gesto
+
+    Trajetos usam `input motionevent` (dedo continuo) quando `motion`
+    (Android 10+). Cada motionevent e um processo `input` com `startup`
+    seg de partida: pontos mais proximos que isso no tempo sao
+    descartados e as pausas descontam a partida, para o trajeto manter a
+    velocidade (curvas muito rapidas perdem detalhe). Sem motionevent vira
+    um unico `input swipe` do primeiro ao ultimo ponto: swipes encadeados
+    levantariam o dedo entre os trechos.
+    """
+    kind = gesture[0]
+    if kind == 'tap':
+        return f'input tap {gesture[1]} {gesture[2]}'
+    if kind == 'swipe':
+        x1, y1, x2, y2, ms = gesture[1:]
+        return f'input swipe {x1} {y1} {x2} {y2} {ms}'
+    if kind == 'long_press':
+        x, y, ms = gesture[1:]
+        return f'input swipe {x} {y} {x} {y} {ms}'
+    if kind == 'key':
+        return f'input keyevent {shlex.quote(str(gesture[1]))}'
+    if kind == 'text':
+        # Aspas do proprio texto nao podem abrir uma string no shell persistente
+        return f'input text {shlex.quote(str(gesture[1]))}'
+    if kind == 'path':
+        return _path_command(gesture[1], gesture[2], motion, startup)
+    raise ValueError(f'gesto desconhecido: {kind}')
+
+
+def _path_command(points, end, motion, startup):
+    if len(points) < 2:
+        x, y = points[0][:2] if points else (0, 0)
+        return f'input tap {x} {y}'
+
+    if not motion:
+        (x1, y1, _), (x2, y2, _) = points[0], points[-1]
+        return f'input swipe {x1} {y1} {x2} {y2} {max(int(end), 1)}'
+
+    startup *= 1000
+    kept = [points[0]]
+    for p in points[1:-1]:
+        if p[2] - kept[-1][2] >= startup:
+            kept.append(p)
+    if len(kept) > 1 and points[-1][2] - kept[-1][2] < startup:
+        kept.pop()
+    kept.append(points[-1])
+
+    x, y, t = kept[0]
+    cmds = [f'input motionevent DOWN {x} {y}']
+    for x, y, t2 in kept[1:]:
+        if t2 - t > startup:
+            cmds.append(f'sleep {(t2 - t - startup) / 1000:.3f}')
+        cmds.append(f'input motionevent MOVE {x} {y}')
+        t = t2
+    if end - t > startup:
+        cmds.append(f'sleep {(end - t - startup) / 1000:.3f}')
+    cmds.append(f'input motionevent UP {x} {y}')
+    return '; '.join(cmds)
+
+
+def parse_devices(text):
+    """Dispositivos do `getevent -lp`: [(caminho, {eixo: (min, max)})]"""
+    devices = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('add device'):
+            devices.append((line.split(':', 1)[1].strip(), {}))
+            continue
+        m = re.search(r'(ABS_\w+)\s*:\s*value\s+-?\d+,\s*min\s+(-?\d+),\s*max\s+(-?\d+)', line)
+        if m and devices:
+            devices[-1][1][m.group(1)] = (int(m.group(2)), int(m.group(3)))
+    return devices
+
+
+def screen_size(text):
+    """(largura, altura) em px da saida do `wm size` (Override vale mais)"""
+    size = None
+    for line in text.splitlines():
+        m = re.search(r'(\d+)x(\d+)', line)
+        if m and (size is None or 'Override' in line):
+            size = int(m.group(1)), int(m.group(2))
+    return size
+
+
+class TouchWriter:
+    """Dedo virtual escrito direto no touchscreen (evdev, protocolo B)
+
+    O dispositivo fica aberto: cada gesto e so write() de eventos, com os
+    pontos intermediarios dos arrastos interpolados a cada STEP seg em
+    prazos absolutos. Usa o ultimo slot do multitoque, longe do dedo real
+    (slot 0). As coordenadas de tela viram unidades do touchscreen pela
+    escala inversa de recorder.touch_scale: um macro gravado toca nos
+    mesmos pontos.
+
+    Precisa de permissao de escrita em /dev/input (root ou grupo input).
+    """
+
+    # struct input_event: timeval (o kernel poe a hora), tipo, codigo, valor
+    EVENT = struct.Struct('llHHi')
+
+    # Intervalo (seg) entre os pontos interpolados de um arrasto
+    STEP = 0.01
+
+    def __init__(self, path, max_x, max_y, size, slot=0, extra=()):
+        self.path = path
+        self.max_x = max_x
+        self.max_y = max_y
+        self.scale_x = (max_x + 1) / size[0]
+        self.scale_y = (max_y + 1) / size[1]
+        self.slot = slot
+        # (codigo, valor) enviados junto com o dedo descendo
+        self.extra = tuple(extra)
+        self.fd = None
+        self.failed = False
+        self._ids = itertools.count(1)
+        self._pos = None
+
+    @staticmethod
+    def find(size=None):
+        """Touchscreen do aparelho pelo `getevent -lp` (None se nao houver)"""
+        try:
+            out = subprocess.run(['getevent', '-lp'], capture_output=True, text=True, timeout=5).stdout
+            if size is None:
+                size = screen_size(subprocess.run(
+                    ['wm', 'size'], capture_output=True, text=True, timeout=10
+                ).stdout)
+        except Exception as e:
+            print(f"Touch error: {e}")
+            return None
+        if not size:
+            return None
+        for path, axes in parse_devices(out):
+            if not all(a in axes for a in ('ABS_MT_SLOT', 'ABS_MT_POSITION_X', 'ABS_MT_POSITION_Y')):
+                continue
+            extra = [
+                (code, max(1, int(axes[name][1] * frac)))
+                for name, (code, frac) in TOUCH_AXES.items() if name in axes
+            ]
+            return TouchWriter(
+                path, axes['ABS_MT_POSITION_X'][1], axes['ABS_MT_POSITION_Y'][1],
+                size, axes['ABS_MT_SLOT'][1], extra,
+            )
+        return None
+
+    def open(self):
+        """Abre o touchscreen para escrita; False se nao for possivel"""
+        if self.fd is not None or self.failed:
+            return not self.failed
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY)
+        except OSError as e:
+            print(f"Touch error: {e}")
+            self.failed = True
+        return not self.failed
+
+    def play(self, gesture, cancel=None):
+        """Toca um gesto de TOUCH; False se `cancel` interrompeu (o dedo sobe)"""
+        kind = gesture[0]
+        if kind == 'tap':
+            points = [(gesture[1], gesture[2], 0)]
+        elif kind == 'swipe':
+            x1, y1, x2, y2, ms = gesture[1:]
+            points = [(x1, y1, 0), (x2, y2, ms)]
+        elif kind == 'long_press':
+            x, y, ms = gesture[1:]
+            points = [(x, y, 0), (x, y, ms)]
+        else:
+            points = list(gesture[1]) or [(0, 0, 0)]
+        end = gesture[2] if kind == 'path' else points[-1][2]
+        return self._trace(points, end, cancel)
+
+    def _trace(self, points, end, cancel):
+        start = time.monotonic()
+        x, y, _ = points[0]
+        self._down(x, y)
+        try:
+            for (x1, y1, t1), (x2, y2, t2) in zip(points, points[1:]):
+                steps = 1
+                if (x1, y1) != (x2, y2):
+                    steps = max(1, int((t2 - t1) / 1000 / self.STEP))
+                for k in range(1, steps + 1):
+                    f = k / steps
+                    if not self._wait_until(start + (t1 + (t2 - t1) * f) / 1000, cancel):
+                        return False
+                    self._move(x1 + (x2 - x1) * f, y1 + (y2 - y1) * f)
+            return self._wait_until(start + end / 1000, cancel)
+        finally:
+            self._up()
+
+    @staticmethod
+    def _wait_until(deadline, cancel):
+        remaining = deadline - time.monotonic()
+        if cancel is not None:
+            return not (cancel.wait(remaining) if remaining > 0 else cancel.is_set())
+        if remaining > 0:
+            time.sleep(remaining)
+        return True
+
+    def _device(self, x, y):
+        return (
+            min(max(int(round(x * self.scale_x)), 0), self.max_x),
+            min(max(int(round(y * self.scale_y)), 0), self.max_y),
+        )
+
+    def _down(self, x, y):
+        self._pos = self._device(x, y)
+        self._emit([
+            (EV_ABS, ABS_MT_SLOT, self.slot),
+            (EV_ABS, ABS_MT_TRACKING_ID, next(self._ids) & 0xffff),
+            (EV_ABS, ABS_MT_POSITION_X, self._pos[0]),
+            (EV_ABS, ABS_MT_POSITION_Y, self._pos[1]),
+            *[(EV_ABS, code, value) for code, value in self.extra],
+            (EV_KEY, BTN_TOUCH, 1),
+        ])
+
+    def _move(self, x, y):
+        pos = self._device(x, y)
+        if pos == self._pos:
+            return
+        self._pos = pos
+        self._emit([
+            (EV_ABS, ABS_MT_SLOT, self.slot),
+            (EV_ABS, ABS_MT_POSITION_X, pos[0]),
+            (EV_ABS, ABS_MT_POSITION_Y, pos[1]),
+        ])
+
+    def _up(self):
+        self._emit([
+            (EV_ABS, ABS_MT_SLOT, self.slot),
+            (EV_ABS, ABS_MT_TRACKING_ID, -1),
+            (EV_KEY, BTN_TOUCH, 0),
+        ])
+
+    def _emit(self, events):
+        # Um write() por quadro: o leitor ve o SYN_REPORT junto com os eixos
+        events.append((EV_SYN, SYN_REPORT, 0))
+        os.write(self.fd, b''.join(self.EVENT.pack(0, 0, t, c, v) for t, c, v in events))
+
+    def close(self):
+        fd, self.fd = self.fd, None
+        if fd is not None:
+            os.close(fd)
+
+
+class InputInjector:
+    """Canal de gestos: TouchWriter para toques, shell persistente para o resto
+
+    Cada ida ao shell espera a marca de fim do comando. Se o shell nao
+    responder no tempo limite (ou morrer), ele e encerrado junto com o que
+    estiver rodando e um shell novo e aberto no proximo envio.
+
+    Ao cancelar um lote, o shell recebe SIGUSR1: o gesto em andamento
+    termina (o dedo nao fica preso na tela) e o resto do lote e pulado;
+    no TouchWriter o dedo sobe na hora.
+    """
+
+    MARK = '__macro_done__'
+
+    # Marca `skip` ao receber SIGUSR1; os comandos do lote checam antes de rodar
+    TRAP = "trap 'skip=1; kill $! 2>/dev/null' USR1"
+
+    # Intervalo (seg) para checar o cancelamento enquanto espera o shell
+    POLL = 0.01
+
+    def __init__(self, shell=None, prelude='', writer=None, motion=False, startup=0.0):
+        self.shell = shell or ['sh']
+        self.prelude = prelude
+        self.writer = writer
+        # Opcoes de command(): `input motionevent` e partida do `input` (seg)
+        self.motion = motion
+        self.startup = startup
+        self.proc = None
+        self.failed = False
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buf = b''
+
+        # Estatisticas
+        self.count = 0
+        self.touches = 0
+        self.fallbacks = 0
+        self.restarts = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def start(self):
+        """Abre o touchscreen e o shell, se ainda nao estiverem abertos"""
+        with self._lock:
+            if self.writer is not None:
+                self.writer.open()
+            return self._spawn()
+
+    def _spawn(self):
+        if self.proc is not None or self.failed:
+            return not self.failed
+        try:
+            # Sessao propria: _kill() derruba o shell e o `input` em andamento
+            self.proc = subprocess.Popen(
+                self.shell,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            self._buf = b''
+            self._write(self.TRAP + '\n')
+            if self.prelude:
+                self._write(self.prelude + '\n')
+        except Exception as e:
+            print(f"Injector error: {e}")
+            self.proc = None
+            self.failed = True
+            return False
+        return True
+
+    def send(self, gesture, timeout=30, cancel=None):
+        """Envia um gesto (tupla) ou comando de shell (str) e espera o fim
+
+        Retorna a latencia em ms, ou None se `cancel` (threading.Event) for
+        sinalizado ou o shell passar de `timeout` seg (e for reiniciado).
+        """
+        return self.send_batch((gesture,), cancel, timeout)
+
+    def send_batch(self, items, cancel=None, timeout=30):
+        """Envia gestos, comandos (str) e pausas (seg) em sequencia
+
+        Toques vao pelo TouchWriter, com as pausas seguintes medidas aqui.
+        Comandos e as pausas depois deles vao juntos numa unica ida ao
+        shell. Retorna a latencia em ms (None se cancelado).
+        """
+        queued = time.perf_counter()
+        with self._lock:
+            if cancel is not None and cancel.is_set():
+                return None
+            job = []
+            for item in items:
+                if isinstance(item, (int, float)):
+                    if job:
+                        job.append(item)
+                    elif item > 0 and not TouchWriter._wait_until(time.monotonic() + item, cancel):
+                        return None
+                    continue
+                if isinstance(item, tuple) and item[0] in TOUCH and self._writer():
+                    if job and not self._shell(job, timeout, cancel):
+                        return None
+                    job = []
+                    played = self._play(item, cancel)
+                    if played is None:
+                        job.append(item)
+                    elif not played:
+                        return None
+                    continue
+                job.append(item)
+            if job and not self._shell(job, timeout, cancel):
+                return None
+
+        ms = (time.perf_counter() - queued) * 1000
+        self._record(ms)
+        return ms
+
+    def _writer(self):
+        return self.writer is not None and self.writer.open()
+
+    def _play(self, gesture, cancel):
+        """Toca no TouchWriter; None se ele falhou (o gesto vai pelo shell)"""
+        try:
+            played = self.writer.play(gesture, cancel)
+        except OSError as e:
+            print(f"Touch error: {e}")
+            self.writer.close()
+            self.writer.failed = True
+            return None
+        self.touches += 1
+        return played
+
+    def _shell(self, job, timeout, cancel):
+        """Roda comandos e pausas numa ida ao shell; False se cancelado ou travado
+
+        Cada comando so roda se o lote nao foi cancelado; a pausa roda em
+        segundo plano com `wait`, que o sinal de cancelamento interrompe.
+        """
+        lines = []
+        pause = 0.0
+        for item in job:
+            if isinstance(item, (int, float)):
+                if item > 0:
+                    lines.append(f'[ -n "$skip" ] || {{ sleep {item:g} & wait $!; }}')
+                    pause += item
+                continue
+            if isinstance(item, tuple):
+                item = command(item, self.motion, self.startup)
+            # Agrupado: um trajeto (varios comandos) roda inteiro ou e pulado inteiro
+            lines.append(f'[ -n "$skip" ] || {{ {item}; }} >/dev/null 2>&1')
+        if not lines:
+            return True
+        cmd = '\n'.join(lines)
+
+        if not self._spawn():
+            return self._fallback(cmd)
+        self._seq += 1
+        mark = f'{self.MARK} {self._seq}'
+        deadline = time.perf_counter() + timeout + pause
+        try:
+            self._write(f"skip=\n{{\n{cmd}\n}} >/dev/null 2>&1\necho {mark} $?\n")
+            done = self._read_mark(mark, deadline, cancel)
+        except (OSError, EOFError) as e:
+            print(f"Injector error: {e}")
+            self._kill()
+            return self._fallback(cmd)
+        if done is None:
+            print(f"Injector error: sem resposta em {timeout + pause:g}s, reiniciando o shell")
+            self._kill()
+            return False
+        if not done:
+            self._interrupt()
+            return False
+        return True
+
+    def _write(self, text):
+        self.proc.stdin.write(text.encode('utf-8'))
+        self.proc.stdin.flush()
+
+    def _read_mark(self, mark, deadline, cancel):
+        """Le a saida ate a marca: True; False se cancelado; None no tempo limite
+
+        Marcas de comandos anteriores (cujo chamador desistiu) sao ignoradas.
+        """
+        fd = self.proc.stdout.fileno()
+        prefix = (mark + ' ').encode('utf-8')
+        while True:
+            while b'\n' in self._buf:
+                line, self._buf = self._buf.split(b'\n', 1)
+                if line.startswith(prefix):
+                    return True
+            if cancel is not None and cancel.is_set():
+                return False
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            if cancel is not None:
+                remaining = min(remaining, self.POLL)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                data = os.read(fd, 4096)
+                if not data:
+                    raise EOFError('shell encerrado')
+                self._buf += data
+
+    def _interrupt(self):
+        """Pula o resto do lote em andamento (o comando atual termina)
+
+        A marca do lote chega depois e e descartada pelo proximo envio.
+        """
+        try:
+            os.kill(self.proc.pid, signal.SIGUSR1)
+        except OSError:
+            pass
+
+    def _kill(self):
+        """Encerra o shell travado e o que rodava nele; o proximo envio abre outro"""
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        self.restarts += 1
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def _fallback(self, cmd):
+        os.system(cmd.replace('\n', '; '))
+        self.fallbacks += 1
+        return True
+
+    def _record(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def stats(self):
+        """Retorna estatisticas de latencia"""
+        avg = self.total_ms / self.count if self.count else 0.0
+        return {
+            'count': self.count,
+            'touches': self.touches,
+            'fallbacks': self.fallbacks,
+            'restarts': self.restarts,
+            'avg_ms': round(avg, 3),
+            'last_ms': round(self.last_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'running': self.proc is not None,
+            'writer': self.writer.path if self.writer is not None and not self.writer.failed else None,
+        }
+
+    def close(self):
+        """Encerra o shell e fecha o touchscreen"""
+        with self._lock:
+            if self.writer is not None:
+                self.writer.close()
+            proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+        proc.stdout.close()
+
+
+# `input` falso para PC: um processo externo que so paga a partida. No
+# aparelho cada `input` sobe um app_process (JVM), ~100 ms ou mais por
+# gesto; o shell persistente economiza so o fork do sh, nao essa partida.
+FAKE_STARTUP = 0.05
+
+
+def fake_input_dir(startup=FAKE_STARTUP):
+    """Diretorio com um executavel `input` que so espera `startup` seg"""
+    path = os.path.join(tempfile.gettempdir(), f'macrovision-input-{int(startup * 1000)}ms')
+    exe = os.path.join(path, 'input')
+    if not os.path.exists(exe):
+        os.makedirs(path, exist_ok=True)
+        with open(exe, 'w') as f:
+            f.write(f'#!/bin/sh\nsleep {startup:g}\n')
+        os.chmod(exe, 0o755)
+    return path
+
+
+def fake_prelude(startup=FAKE_STARTUP):
+    """Linha de shell que poe o `input` falso no PATH"""
+    return f'PATH={shlex.quote(fake_input_dir(startup))}:$PATH'
+
+
+def fake_injector(startup=FAKE_STARTUP, writer=None):
+    """Injetor com o `input` falso (benchmark no Linux)"""
+    return InputInjector(['sh'], prelude=fake_prelude(startup), writer=writer, startup=startup)
+
+
+def fake_writer(path=None, size=(1080, 2400)):
+    """TouchWriter num arquivo comum no lugar do touchscreen (benchmark)
+
+    Mede a injecao do lado do macro; o repasse do kernel ao Android nao
+    entra na conta.
+    """
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), 'macrovision-touch.bin')
+    open(path, 'wb').close()
+    return TouchWriter(path, size[0] - 1, size[1] - 1, size, 9, [(ABS_MT_PRESSURE, 1)])
@@ -0,0 +1,400 @@
+"""Canal local entre o app (interface) e o servico (execucao)
+
+Um objeto JSON por linha sobre TCP em 127.0.0.1. O app manda comandos
+({"cmd": "start", ...}); o servico responde a quem pediu e transmite
+eventos ({"event": "status", ...}) para todos os clientes conectados.
+
+Comandos:
+    hello   {token}              primeira linha de toda conexao
+    start   {macro}              executa o macro (dict de MacroData)
+    stop    {id}                 para um macro
+    stop_all
+    run     {ref, code, tags, name}  execucao avulsa de codigo
+    status                       pede um snapshot
+    ping
+    shutdown                     encerra o servico
+
+Eventos:
+    status   {id, running, stats}    macro iniciou/terminou
+    result   {id | ref, result}      fim de um script
+    log      {id, line}              log ao vivo dos scripts
+    toast    {text}                  toast() chamado no servico
+    snapshot {running, stats}        resposta ao status
+    error    {error, id?}
+    pong
+
+O token fica no diretorio privado do app: outros apps do aparelho
+tambem alcancam portas locais e nao podem comandar os macros.
+"""
+
+import os
+import json
+import time
+import socket
+import itertools
+import threading
+
+
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('MACROVISION_PORT', 48650))
+# Tempo maximo (seg) esperando o servico subir e aceitar a conexao
+CONNECT_TIMEOUT = 5.0
+
+
+def encode(msg):
+    """Mensagem -> linha JSON em bytes (valores estranhos viram texto)"""
+    return (json.dumps(msg, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+
+
+def write_token(path):
+    """Gera um token novo e grava so para o dono (servico)"""
+    import secrets
+    token = secrets.token_hex(16)
+    tmp = path + '.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return token
+
+
+def read_token(path):
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+
+class Connection:
+    """Socket com escrita serializada e leitura linha a linha"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile('r', encoding='utf-8', newline='\n')
+        self._lock = threading.Lock()
+
+    def send(self, msg):
+        data = encode(msg)
+        with self._lock:
+            self.sock.sendall(data)
+
+    def messages(self):
+        """Gerador das mensagens recebidas ate a conexao fechar"""
+        for line in self.file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError as e:
+                print(f"IPC error: linha invalida: {e}")
+                continue
+            if isinstance(msg, dict):
+                yield msg
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# ============================================================
+# SERVIDOR (servico)
+# ============================================================
+
+class IpcServer:
+    """Aceita clientes locais e entrega cada comando a handler(conn, msg)
+
+    O dict retornado pelo handler volta so para quem mandou o comando;
+    broadcast() manda um evento para todos os clientes.
+    """
+
+    def __init__(self, handler, token, host=HOST, port=PORT):
+        self.handler = handler
+        self.token = token
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self._lock = threading.Lock()
+        self._sock = None
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(4)
+        # Com port=0 o sistema escolhe a porta (testes)
+        self.port = sock.getsockname()[1]
+        self._sock = sock
+        threading.Thread(target=self._accept, name='ipc-accept', daemon=True).start()
+        return self
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(Connection(sock),), daemon=True).start()
+
+    def _serve(self, conn):
+        messages = conn.messages()
+        try:
+            hello = next(messages, None)
+            if not hello or hello.get('cmd') != 'hello' or hello.get('token') != self.token:
+                conn.send({'event': 'error', 'error': 'token invalido'})
+                return
+            with self._lock:
+                self.clients.add(conn)
+            for msg in messages:
+                try:
+                    reply = self.handler(conn, msg)
+                except Exception as e:
+                    print(f"IPC error: {msg.get('cmd')}: {e}")
+                    reply = {'event': 'error', 'error': str(e)}
+                if reply is not None:
+                    conn.send(reply)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self.clients.discard(conn)
+            conn.close()
+
+    def broadcast(self, event):
+        with self._lock:
+            clients = list(self.clients)
+        for conn in clients:
+            try:
+                conn.send(event)
+            except OSError:
+                with self._lock:
+                    self.clients.discard(conn)
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+        with self._lock:
+            clients, self.clients = list(self.clients), set()
+        for conn in clients:
+            conn.close()
+
+
+# ============================================================
+# CLIENTE (app)
+# ============================================================
+
+class IpcClient:
+    """Conexao com o servico; cada evento recebido vai para on_event(msg)
+
+    Ao cair a conexao, on_event recebe {'event': 'disconnected'}.
+    """
+
+    def __init__(self, token_path, on_event, host=HOST, port=PORT):
+        self.token_path = token_path
+        self.on_event = on_event
+        self.host = host
+        self.port = port
+        self.conn = None
+
+    @property
+    def connected(self):
+        return self.conn is not None
+
+    def connect(self, timeout=CONNECT_TIMEOUT):
+        """Conecta, tentando ate `timeout` seg (o servico pode estar subindo)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                token = read_token(self.token_path)
+                sock = socket.create_connection((self.host, self.port), timeout=1.0)
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    print(f"IPC error: servico indisponivel: {e}")
+                    return False
+                time.sleep(0.1)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = Connection(sock)
+        conn.send({'cmd': 'hello', 'token': token})
+        self.conn = conn
+        threading.Thread(target=self._read, args=(conn,), name='ipc-client', daemon=True).start()
+        return True
+
+    def _read(self, conn):
+        try:
+            for msg in conn.messages():
+                self.on_event(msg)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.conn is conn:
+                self.conn = None
+                self.on_event({'event': 'disconnected'})
+
+    def send(self, msg):
+        """Manda um comando; False se nao ha conexao"""
+        conn = self.conn
+        if conn is None:
+            return False
+        try:
+            conn.send(msg)
+            return True
+        except OSError as e:
+            print(f"IPC error: {e}")
+            return False
+
+    def close(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+
+class RemoteRunner:
+    """Mesma interface do engine.MacroRunner, executando no servico
+
+    `lookup(id)` devolve o MacroData do app para cada evento; os
+    callbacks passam por `dispatch` (o app usa o Clock do Kivy), menos
+    on_log, chamado direto da thread de leitura.
+    """
+
+    def __init__(self, lookup, token_path, on_status=None, on_result=None, on_log=None,
+                 on_toast=None, dispatch=None, port=PORT):
+        self.lookup = lookup
+        self.on_status = on_status
+        self.on_result = on_result
+        self.on_log = on_log
+        self.on_toast = on_toast
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.running = set()
+        self.stats = {}
+        self._refs = itertools.count(1)
+        self._pending = {}
+        self.client = IpcClient(token_path, self._on_event, port=port)
+
+    def connect(self, timeout=CONNECT_TIMEOUT):
+        if not self.client.connect(timeout):
+            return False
+        # Macros que ja estavam rodando no servico (app reaberto)
+        self.client.send({'cmd': 'status'})
+        return True
+
+    @property
+    def connected(self):
+        return self.client.connected
+
+    # ---- COMANDOS ----
+
+    def start(self, macro):
+        """Manda o macro para o servico; ValueError se o agendamento for invalido"""
+        if not macro.script and not macro.actions:
+            return None
+        if macro.loop:
+            from scheduler import parse_schedule
+            parse_schedule(macro.schedule, macro.loop_delay)
+        macro.is_running = True
+        self.running.add(macro.id)
+        if not self.client.send({'cmd': 'start', 'macro': macro.to_dict()}):
+            self.running.discard(macro.id)
+            macro.is_running = False
+        return macro.is_running
+
+    def stop(self, macro):
+        macro.is_running = False
+        self.running.discard(macro.id)
+        self.client.send({'cmd': 'stop', 'id': macro.id})
+
+    def stop_all(self):
+        self.client.send({'cmd': 'stop_all'})
+
+    def run_code(self, code, callback=None, tags=None, name=''):
+        ref = next(self._refs)
+        if callback:
+            self._pending[ref] = callback
+        msg = {'cmd': 'run', 'ref': ref, 'code': code, 'tags': tags or {}, 'name': name}
+        if not self.client.send(msg):
+            self._pending.pop(ref, None)
+            if callback:
+                self.dispatch(lambda: callback({'ok': False, 'error': 'servico desconectado'}))
+        return ref
+
+    def loop_stats(self, macro_id):
+        """Ultimos atrasos recebidos do loop (e pede uma atualizacao)"""
+        self.client.send({'cmd': 'status'})
+        return self.stats.get(macro_id)
+
+    def warm(self, paths):
+        # O servico pre-processa as imagens ao iniciar o macro
+        pass
+
+    def shutdown(self):
+        """Desconecta; os macros continuam rodando no servico"""
+        self.client.close()
+
+    # ---- EVENTOS ----
+
+    def _on_event(self, msg):
+        event = msg.get('event')
+        if event == 'log':
+            if self.on_log:
+                self.on_log(msg.get('id'), msg.get('line', ''))
+        elif event == 'status':
+            if msg.get('stats'):
+                self.stats[msg['id']] = msg['stats']
+            self._set_running(msg.get('id'), msg.get('running'))
+        elif event == 'snapshot':
+            self.stats.update((int(k), v) for k, v in msg.get('stats', {}).items())
+            # So acrescenta: o fim de cada macro chega como evento `status`
+            # e um snapshot antigo nao pode desfazer um start mais recente
+            for macro_id in msg.get('running', []):
+                self._set_running(macro_id, True)
+        elif event == 'result':
+            self._result(msg)
+        elif event == 'toast':
+            if self.on_toast:
+                self.dispatch(lambda: self.on_toast(msg.get('text', '')))
+        elif event == 'disconnected':
+            for macro_id in list(self.running):
+                self._set_running(macro_id, False)
+            for ref in list(self._pending):
+                self._result({'ref': ref, 'result': {'ok': False, 'error': 'servico desconectado'}})
+        elif event == 'error':
+            print(f"Service error: {msg.get('error')}")
+
+    def _set_running(self, macro_id, running):
+        if bool(running) == (macro_id in self.running):
+            return
+        if running:
+            self.running.add(macro_id)
+        else:
+            self.running.discard(macro_id)
+            self.stats.pop(macro_id, None)
+        macro = self.lookup(macro_id)
+        if macro is None:
+            return
+
+        def apply():
+            macro.is_running = bool(running)
+            if self.on_status:
+                self.on_status(macro)
+
+        self.dispatch(apply)
+
+    def _result(self, msg):
+        result = msg.get('result') or {}
+        callback = self._pending.pop(msg['ref'], None) if 'ref' in msg else None
+        if callback:
+            self.dispatch(lambda: callback(result))
+            return
+        macro = self.lookup(msg.get('id'))
+        if macro is None:
+            return
+
+        def apply():
+            macro.tags.update(result.get('tags', {}))
+            if self.on_result:
+                self.on_result(macro, result)
+
+        self.dispatch(apply)
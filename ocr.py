@@ -0,0 +1,338 @@
+"""Leitura de texto na tela (digitos e fontes fixas)
+
+Binariza a regiao, separa linhas e caracteres pelas projecoes de tinta e
+compara cada caractere, normalizado para uma celula fixa, com glifos de
+referencia. Os glifos vem de uma pasta de imagens (um arquivo por
+caractere) ou, por padrao, sao desenhados com a fonte embutida do Pillow.
+"""
+
+import os
+import re
+import threading
+
+import numpy as np
+
+from vision import MatchMemo, crop, load_gray, region_digest, to_gray
+
+
+# Celula (altura x largura) onde cada caractere e comparado
+CELL_H = 16
+CELL_W = 12
+
+# Score minimo para aceitar um glifo (abaixo disso sai '?')
+MIN_SCORE = 0.5
+# Contraste minimo (0-255) para considerar que ha texto na regiao
+MIN_CONTRAST = 20
+# Espaco minimo entre caracteres (fracao da altura da linha) que vira ' ',
+# so quando o conjunto de glifos inclui o espaco (digitos estreitos como
+# '1' deixam vaos largos que nao sao espacos)
+SPACE_GAP = 0.37
+# Peso da diferenca de altura relativa (separa '.', '-' de '0', '8'...)
+HEIGHT_WEIGHT = 0.5
+
+DEFAULT_CHARS = '0123456789.,:/%-+'
+
+# Nomes de arquivo para caracteres que nao cabem num nome
+NAMES = {
+    'dot': '.', 'ponto': '.',
+    'comma': ',', 'virgula': ',',
+    'colon': ':', 'dois_pontos': ':',
+    'slash': '/', 'barra': '/',
+    'percent': '%', 'porcento': '%',
+    'minus': '-', 'menos': '-',
+    'plus': '+', 'mais': '+',
+    'space': ' ',
+}
+
+
+# ============================================================
+# SEGMENTACAO
+# ============================================================
+
+def otsu(gray):
+    """Limiar de Otsu de uma imagem em cinza (0-255)"""
+    hist = np.bincount(np.clip(gray, 0, 255).astype(np.uint8).ravel(), minlength=256)
+    hist = hist.astype(np.float64)
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    s0 = np.cumsum(hist * levels)
+    m0 = s0 / np.maximum(w0, 1)
+    m1 = (s0[-1] - s0) / np.maximum(w1, 1)
+    return int(np.argmax(w0 * w1 * (m0 - m1) ** 2))
+
+
+def binarize(gray):
+    """Mascara booleana da tinta (texto claro ou escuro)
+
+    O fundo e a classe que domina a borda da regiao. Regioes sem
+    contraste devolvem mascara vazia.
+    """
+    if gray.size == 0 or gray.max() - gray.min() < MIN_CONTRAST:
+        return np.zeros(gray.shape, dtype=bool)
+    mask = gray > otsu(gray)
+    border = np.concatenate((mask[0], mask[-1], mask[:, 0], mask[:, -1]))
+    if border.mean() > 0.5:
+        mask = ~mask
+    return mask
+
+
+def runs(profile):
+    """Trechos [inicio, fim) onde o perfil de tinta e positivo"""
+    on = np.concatenate(([False], profile > 0, [False]))
+    edges = np.flatnonzero(on[1:] != on[:-1])
+    return list(zip(edges[0::2], edges[1::2]))
+
+
+def text_lines(mask):
+    """Linhas de texto da mascara: lista de (y0, y1)"""
+    return runs(mask.sum(axis=1))
+
+
+def text_regions(gray):
+    """Caixas (x, y, w, h) das linhas de texto de uma imagem em cinza"""
+    mask = binarize(gray)
+    boxes = []
+    for y0, y1 in text_lines(mask):
+        cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+        boxes.append((int(cols[0]), int(y0), int(cols[-1] - cols[0] + 1), int(y1 - y0)))
+    return boxes
+
+
+def split_glyphs(line):
+    """Caixas justas (x0, y0, x1, y1) de cada caractere de uma linha"""
+    boxes = []
+    for x0, x1 in runs(line.sum(axis=0)):
+        rows = np.flatnonzero(line[:, x0:x1].any(axis=1))
+        boxes.append((x0, rows[0], x1, rows[-1] + 1))
+    return boxes
+
+
+# ============================================================
+# GLIFOS
+# ============================================================
+
+def resize_area(img, out_h, out_w):
+    """Redimensiona por media de area (tambem serve para ampliar)"""
+    h, w = img.shape
+    ii = np.zeros((h + 1, w + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(img, axis=0, dtype=np.float64), axis=1, out=ii[1:, 1:])
+    ys = np.arange(out_h + 1) * h / out_h
+    xs = np.arange(out_w + 1) * w / out_w
+    y0 = np.minimum(np.floor(ys[:-1]).astype(int), h - 1)
+    y1 = np.maximum(np.ceil(ys[1:]).astype(int), y0 + 1)
+    x0 = np.minimum(np.floor(xs[:-1]).astype(int), w - 1)
+    x1 = np.maximum(np.ceil(xs[1:]).astype(int), x0 + 1)
+    sums = ii[y1][:, x1] - ii[y0][:, x1] - ii[y1][:, x0] + ii[y0][:, x0]
+    return sums / ((y1 - y0)[:, None] * (x1 - x0)[None, :])
+
+
+def glyph_vector(box, ref_height):
+    """Caractere (mascara justa) como vetor normalizado da celula
+
+    A proporcao e mantida e o caractere e centralizado na celula. A escala
+    nunca passa a da altura da linha (`ref_height`): '.', ',' e '-'
+    continuam pequenos em vez de ocupar a celula toda.
+    """
+    h, w = box.shape
+    scale = min(CELL_H / h, CELL_W / w, CELL_H / ref_height)
+    gh = min(CELL_H, max(1, round(h * scale)))
+    gw = min(CELL_W, max(1, round(w * scale)))
+    cell = np.zeros((CELL_H, CELL_W), dtype=np.float64)
+    top, left = (CELL_H - gh) // 2, (CELL_W - gw) // 2
+    cell[top:top + gh, left:left + gw] = resize_area(box, gh, gw)
+
+    v = cell.ravel() - cell.mean()
+    norm = np.sqrt((v * v).sum())
+    return v / norm if norm > 0 else v
+
+
+class GlyphSet:
+    """Glifos de referencia prontos para comparacao (uma matriz so)
+
+    `samples` e uma lista de (caractere, mascara justa); varias amostras
+    do mesmo caractere sao permitidas. A altura de cada glifo e guardada
+    relativa a mediana do conjunto. Com `space`, vaos largos viram ' '.
+    """
+
+    def __init__(self, samples, key=None, space=False):
+        self.key = key
+        self.space = space
+        self.chars = [c for c, _ in samples]
+        heights = np.array([m.shape[0] for _, m in samples], dtype=np.float64)
+        self.ref_height = float(np.median(heights)) if len(samples) else 1.0
+        self.heights = np.log(heights / self.ref_height)
+        self.matrix = np.array([glyph_vector(m, self.ref_height) for _, m in samples])
+        self.matrix = self.matrix.reshape(len(samples), -1)
+
+    def classify(self, boxes, ref_height):
+        """Melhor caractere e score de cada mascara"""
+        if not boxes or not self.chars:
+            return [('?', 0.0)] * len(boxes)
+        vecs = np.array([glyph_vector(b, ref_height) for b in boxes])
+        heights = np.log(np.array([b.shape[0] for b in boxes], dtype=np.float64) / ref_height)
+        scores = vecs @ self.matrix.T
+        scores -= HEIGHT_WEIGHT * np.abs(heights[:, None] - self.heights[None, :])
+        best = scores.argmax(axis=1)
+        return [(self.chars[i], float(scores[k, i])) for k, i in enumerate(best)]
+
+    @classmethod
+    def from_dir(cls, path, key=None):
+        """Glifos de uma pasta: o nome do arquivo e o caractere
+
+        `7.png`, `7_2.png` (segunda amostra) ou nomes de NAMES para
+        simbolos (`slash.png`, `dois_pontos.png`...). Um `space.png`
+        (pode ser vazio) liga a separacao de palavras.
+        """
+        samples = []
+        space = False
+        for name in sorted(os.listdir(path)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in ('.png', '.jpg', '.jpeg', '.bmp'):
+                continue
+            base, _, n = stem.rpartition('_')
+            if base and n.isdigit():
+                stem = base
+            char = NAMES.get(stem.lower(), stem)
+            if len(char) != 1:
+                continue
+            if char == ' ':
+                space = True
+                continue
+            mask = binarize(load_gray(os.path.join(path, name)))
+            box = _tight(mask)
+            if box is not None:
+                samples.append((char, box))
+        return cls(samples, key, space)
+
+    @classmethod
+    def default(cls, chars=DEFAULT_CHARS, size=32):
+        """Glifos desenhados com a fonte embutida do Pillow"""
+        from PIL import Image, ImageDraw, ImageFont
+        try:
+            font = ImageFont.load_default(size=size)
+        except (TypeError, ImportError, OSError):
+            font = ImageFont.load_default()
+
+        samples = []
+        for char in chars:
+            img = Image.new('L', (size * 2, size * 2), 0)
+            ImageDraw.Draw(img).text((size // 2, size // 2), char, fill=255, font=font)
+            box = _tight(np.asarray(img) > 127)
+            if box is not None:
+                samples.append((char, box))
+        return cls(samples, ('default', chars), ' ' in chars)
+
+
+def _tight(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return None
+    return mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+class GlyphCache:
+    """Conjuntos de glifos por pasta, recarregados so quando mudam"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, path=None, chars=DEFAULT_CHARS):
+        """GlyphSet da pasta `path` (ou o padrao, se None)"""
+        if path is None:
+            key = ('default', chars)
+        else:
+            files = [os.path.join(path, f) for f in os.listdir(path)]
+            key = (path, max((os.stat(f).st_mtime_ns for f in files), default=0), len(files))
+
+        with self._lock:
+            glyphs = self._items.get(key)
+        if glyphs is not None:
+            return glyphs
+
+        glyphs = GlyphSet.default(chars) if path is None else GlyphSet.from_dir(path, key)
+        with self._lock:
+            for old in [k for k in self._items if k[0] == key[0]]:
+                del self._items[old]
+            self._items[key] = glyphs
+        return glyphs
+
+
+# Cache global de glifos e memo de leituras por regiao
+glyph_sets = GlyphCache()
+memo = MatchMemo()
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def recognize(gray, glyphs, min_score=MIN_SCORE):
+    """Texto de uma imagem em cinza (linhas separadas por '\\n')"""
+    mask = binarize(gray)
+    lines = []
+    for y0, y1 in text_lines(mask):
+        line = mask[y0:y1]
+        boxes = split_glyphs(line)
+        if not boxes:
+            continue
+        masks = [line[by0:by1, bx0:bx1] for bx0, by0, bx1, by1 in boxes]
+        ref = float(np.median([m.shape[0] for m in masks]))
+        gap = SPACE_GAP * ref
+
+        text = []
+        prev_x1 = None
+        for (bx0, _, bx1, _), (char, score) in zip(boxes, glyphs.classify(masks, ref)):
+            if glyphs.space and prev_x1 is not None and bx0 - prev_x1 > gap:
+                text.append(' ')
+            text.append(char if score >= min_score else '?')
+            prev_x1 = bx1
+        lines.append(''.join(text))
+    return '\n'.join(lines)
+
+
+def read_text(screen, region=None, glyphs=None, chars=DEFAULT_CHARS,
+              min_score=MIN_SCORE, use_memo=True):
+    """Le o texto de `region` (x, y, w, h) de um screenshot
+
+    `screen` aceita o mesmo que vision.find_image. `glyphs` e uma pasta
+    de glifos (None usa a fonte embutida com `chars`). Regioes iguais a
+    da leitura anterior devolvem o texto anterior sem reprocessar.
+    """
+    if region is not None:
+        region = tuple(int(v) for v in region)
+    if isinstance(screen, str):
+        pixels = load_gray(screen)
+    elif hasattr(screen, 'rgba'):
+        pixels = screen.rgba
+    else:
+        pixels = np.asarray(screen)
+    pixels, _, _ = crop(pixels, region)
+
+    glyph_set = glyph_sets.get(glyphs, chars)
+    if use_memo:
+        key = (region, glyph_set.key, min_score)
+        digest = region_digest(pixels)
+        hit, text = memo.get(key, digest)
+        if hit:
+            return text
+
+    text = recognize(to_gray(pixels), glyph_set, min_score)
+
+    if use_memo:
+        memo.put(key, digest, text)
+    return text
+
+
+NUMBER = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+
+def parse_number(text):
+    """Primeiro numero do texto (int ou float) ou None"""
+    m = NUMBER.search(text.replace(' ', ''))
+    if not m:
+        return None
+    s = m.group().replace(',', '.')
+    return float(s) if '.' in s else int(s)
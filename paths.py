@@ -0,0 +1,82 @@
+"""Simplificacao de trajetos gravados (arrastos com varios pontos)
+
+Um arrasto gravado tem centenas de amostras; para guardar e injetar
+basta a forma. Ramer-Douglas-Peucker remove os pontos que nao desviam
+mais que `epsilon` px da reta entre os vizinhos e a reamostragem de
+tempo tira pontos mais proximos que um quadro, mantendo o ritmo do gesto.
+
+Pontos sao (x, y, t) com t em ms desde o inicio do gesto.
+"""
+
+import numpy as np
+
+
+# Desvio maximo (px) aceito ao remover pontos
+EPSILON = 3.0
+# Intervalo minimo (ms) entre pontos consecutivos do trajeto
+MIN_STEP_MS = 16
+# Maximo de pontos por trajeto (cada ponto e um comando `input` injetado)
+MAX_POINTS = 16
+
+
+def simplify(points, epsilon=EPSILON):
+    """Ramer-Douglas-Peucker sobre (x, y); mantem o t de cada ponto"""
+    if len(points) < 3:
+        return list(points)
+    xy = np.asarray([p[:2] for p in points], dtype=np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    # Pilha em vez de recursao (trajetos longos)
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        seg = xy[first + 1:last]
+        a, b = xy[first], xy[last]
+        d = b - a
+        length = np.hypot(d[0], d[1])
+        if length == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (seg[:, 1] - a[1]) - d[1] * (seg[:, 0] - a[0])) / length
+        i = int(np.argmax(dist))
+        if dist[i] > epsilon:
+            mid = first + 1 + i
+            keep[mid] = True
+            stack.append((first, mid))
+            stack.append((mid, last))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def resample(points, min_step=MIN_STEP_MS):
+    """Tira pontos a menos de `min_step` ms do anterior (mantem o ultimo)
+
+    Tempos sao arredondados para ms inteiros.
+    """
+    if not points:
+        return []
+    out = [points[0]]
+    for p in points[1:-1]:
+        if p[2] - out[-1][2] >= min_step:
+            out.append(p)
+    if len(points) > 1:
+        last = points[-1]
+        if len(out) > 1 and last[2] - out[-1][2] < min_step:
+            out.pop()
+        out.append(last)
+    return [[int(round(x)), int(round(y)), int(round(t))] for x, y, t in out]
+
+
+def compress(points, epsilon=EPSILON, min_step=MIN_STEP_MS, max_points=MAX_POINTS):
+    """Trajeto pronto para guardar/injetar: simplify + resample
+
+    Se passar de `max_points`, a tolerancia cresce ate caber.
+    """
+    out = resample(simplify(points, epsilon), min_step)
+    while len(out) > max_points:
+        epsilon *= 1.5
+        out = resample(simplify(points, epsilon), min_step)
+    return out
@@ -0,0 +1,293 @@
+"""Gravacao de gestos: eventos de toque -> acoes do macro
+
+Le a saida do `getevent -lt` (ou um arquivo gravado, para reproduzir no
+PC) linha a linha e transforma cada toque em toque, arrasto, trajeto
+(arrasto com curvas) ou toque longo assim que o dedo sobe. O fluxo nunca
+e guardado inteiro: so os pontos do gesto em andamento ficam em memoria.
+
+As acoes saem como dicts no formato de MacroAction.to_dict(), com uma
+acao 'wait' entre gestos para manter o ritmo da gravacao.
+"""
+
+import time
+import threading
+import subprocess
+
+import paths
+
+
+# Tipos e codigos do kernel (saida numerica do getevent, sem -l)
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0x00
+BTN_TOUCH = 0x14a
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_MT_SLOT = 0x2f
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+
+CODES = {
+    'EV_SYN': EV_SYN,
+    'EV_KEY': EV_KEY,
+    'EV_ABS': EV_ABS,
+    'SYN_REPORT': SYN_REPORT,
+    'BTN_TOUCH': BTN_TOUCH,
+    'ABS_X': ABS_X,
+    'ABS_Y': ABS_Y,
+    'ABS_MT_SLOT': ABS_MT_SLOT,
+    'ABS_MT_POSITION_X': ABS_MT_POSITION_X,
+    'ABS_MT_POSITION_Y': ABS_MT_POSITION_Y,
+    'ABS_MT_TRACKING_ID': ABS_MT_TRACKING_ID,
+    'DOWN': 1,
+    'UP': 0,
+}
+
+# Deslocamento maximo (px) para ainda ser toque e nao arrasto
+TAP_SLOP = 20
+# Duracao (s) a partir da qual um toque parado vira toque longo
+LONG_PRESS = 0.5
+# Pausas menores que isso entre gestos nao viram acao 'wait'
+MIN_WAIT = 0.05
+
+
+def parse_line(line):
+    """(timestamp, tipo, codigo, valor) de uma linha do getevent
+
+    Aceita a saida com nomes (-l) ou numerica, com ou sem -t (sem -t o
+    timestamp e None). O timestamp vem como texto: so e convertido quando
+    fecha uma amostra. Linhas que nao sao eventos devolvem None.
+    """
+    ts = None
+    if line[:1] == '[':
+        end = line.find(']')
+        if end < 0:
+            return None
+        ts = line[1:end]
+        line = line[end + 1:]
+    parts = line.split()
+    if len(parts) < 3:
+        return None
+    etype, code, value = parts[-3:]
+    try:
+        etype = CODES[etype] if etype in CODES else int(etype, 16)
+        code = CODES[code] if code in CODES else int(code, 16)
+        value = CODES[value] if value in CODES else int(value, 16)
+    except ValueError:
+        return None
+    if value > 0x7fffffff:
+        value -= 1 << 32
+    return ts, etype, code, value
+
+
+class TouchParser:
+    """Estado do primeiro dedo; emite (t, x, y, down) a cada SYN_REPORT"""
+
+    def __init__(self, scale=(1.0, 1.0)):
+        self.scale_x, self.scale_y = scale
+        self.slot = 0
+        self.x = 0
+        self.y = 0
+        self.down = False
+        self._changed = False
+        self._t0 = None
+
+    def feed(self, line):
+        """Processa uma linha; retorna a amostra fechada por ela ou None"""
+        event = parse_line(line)
+        if event is None:
+            return None
+        ts, etype, code, value = event
+
+        if etype == EV_ABS:
+            if code == ABS_MT_SLOT:
+                self.slot = value
+            elif self.slot != 0:
+                return None
+            elif code in (ABS_MT_POSITION_X, ABS_X):
+                self.x = value
+                self._changed = True
+            elif code in (ABS_MT_POSITION_Y, ABS_Y):
+                self.y = value
+                self._changed = True
+            elif code == ABS_MT_TRACKING_ID:
+                self.down = value != -1
+                self._changed = True
+        elif etype == EV_KEY and code == BTN_TOUCH:
+            self.down = value == 1
+            self._changed = True
+        elif etype == EV_SYN and code == SYN_REPORT and self._changed:
+            self._changed = False
+            ts = time.monotonic() if ts is None else float(ts)
+            if self._t0 is None:
+                self._t0 = ts
+            return (
+                ts - self._t0,
+                int(round(self.x * self.scale_x)),
+                int(round(self.y * self.scale_y)),
+                self.down,
+            )
+        return None
+
+
+class GestureBuilder:
+    """Junta as amostras de cada toque e classifica ao soltar o dedo"""
+
+    def __init__(self):
+        self.points = []
+        self.last_end = None
+
+    def feed(self, sample):
+        """Processa uma amostra; retorna as acoes do gesto concluido"""
+        t, x, y, down = sample
+        if down:
+            if not self.points or (x, y) != self.points[-1][1:]:
+                self.points.append((t, x, y))
+            return []
+        if not self.points:
+            return []
+        points, self.points = self.points, []
+        return self._finish(points, t)
+
+    def _finish(self, points, end):
+        actions = []
+        start = points[0][0]
+        if self.last_end is not None and start - self.last_end >= MIN_WAIT:
+            actions.append({'type': 'wait', 'name': 'Esperar', 'wait_sec': round(start - self.last_end, 2)})
+        self.last_end = end
+        actions.append(classify(points, end))
+        return actions
+
+
+def classify(points, end):
+    """Acao (dict) de um toque: tap, long_press, swipe ou path
+
+    Arrastos sao simplificados (paths.compress); se sobrar mais que uma
+    reta, viram 'path' com os pontos [x, y, t_ms] restantes.
+    """
+    t0, x0, y0 = points[0]
+    _, x1, y1 = points[-1]
+    duration = max(end - t0, 0.0)
+    ms = int(round(duration * 1000))
+    moved = max(max(abs(x - x0), abs(y - y0)) for _, x, y in points)
+
+    if moved <= TAP_SLOP:
+        if duration >= LONG_PRESS:
+            return {'type': 'long_press', 'name': 'Segurar', 'x': x0, 'y': y0, 'duration': ms}
+        return {'type': 'tap', 'name': 'Toque', 'x': x0, 'y': y0}
+
+    path = paths.compress([(x, y, (t - t0) * 1000) for t, x, y in points])
+    if len(path) > 2:
+        return {
+            'type': 'path', 'name': 'Trajeto',
+            'x': x0, 'y': y0, 'x2': x1, 'y2': y1,
+            'duration': max(ms, path[-1][2], 1), 'points': path,
+        }
+    return {
+        'type': 'swipe', 'name': 'Arrastar',
+        'x': x0, 'y': y0, 'x2': x1, 'y2': y1,
+        'duration': max(ms, 1),
+    }
+
+
+def parse(lines, scale=(1.0, 1.0)):
+    """Gerador de acoes a partir de linhas do getevent (incremental)"""
+    touch = TouchParser(scale)
+    gestures = GestureBuilder()
+    for line in lines:
+        sample = touch.feed(line)
+        if sample is not None:
+            yield from gestures.feed(sample)
+
+
+def parse_axes(text):
+    """Maximo de X e Y do touchscreen a partir de `getevent -lp`"""
+    axes = {}
+    for line in text.splitlines():
+        for name in ('ABS_MT_POSITION_X', 'ABS_MT_POSITION_Y'):
+            if name in line and 'max' in line:
+                axes[name[-1]] = int(line.split('max')[1].split(',')[0])
+    return axes.get('X'), axes.get('Y')
+
+
+def touch_scale(width, height):
+    """Escala das coordenadas do touchscreen para pixels da tela"""
+    try:
+        out = subprocess.run(['getevent', '-lp'], capture_output=True, text=True, timeout=5).stdout
+        max_x, max_y = parse_axes(out)
+    except Exception as e:
+        print(f"getevent error: {e}")
+        return 1.0, 1.0
+    if not max_x or not max_y:
+        return 1.0, 1.0
+    return width / (max_x + 1), height / (max_y + 1)
+
+
+class Recorder:
+    """Grava gestos em segundo plano ate stop()
+
+    `source` e um iteravel de linhas (ex.: arquivo aberto, para reproduzir
+    uma gravacao no PC); sem ele, roda `getevent -lt` no dispositivo.
+    `on_action` recebe cada acao assim que o gesto termina.
+
+    Gravando do dispositivo, o ultimo toque e o do botao que para a
+    gravacao: stop() descarta tudo a partir do ultimo dedo na tela.
+    """
+
+    def __init__(self, source=None, scale=(1.0, 1.0), on_action=None):
+        self.source = source
+        self.scale = scale
+        self.on_action = on_action
+        self.actions = []
+        # Quantas acoes havia quando o dedo desceu pela ultima vez
+        self._last_down = 0
+        self._proc = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        lines = self.source
+        if lines is None:
+            self._proc = subprocess.Popen(
+                ['getevent', '-lt'], stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, bufsize=1
+            )
+            lines = self._proc.stdout
+        self._thread = threading.Thread(target=self._run, args=(lines,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, lines):
+        touch = TouchParser(self.scale)
+        gestures = GestureBuilder()
+        try:
+            for line in lines:
+                sample = touch.feed(line)
+                if sample is None:
+                    continue
+                if sample[3] and not gestures.points:
+                    self._last_down = len(self.actions)
+                for action in gestures.feed(sample):
+                    if self._stop.is_set():
+                        return
+                    self.actions.append(action)
+                    if self.on_action:
+                        self.on_action(action)
+        except Exception as e:
+            if not self._stop.is_set():
+                print(f"Recorder error: {e}")
+
+    def stop(self):
+        """Para a gravacao; retorna as acoes gravadas"""
+        self._stop.set()
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        if self.source is None:
+            # Toque no botao de parar (e a espera antes dele)
+            del self.actions[self._last_down:]
+        return self.actions
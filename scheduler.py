@@ -0,0 +1,274 @@
+"""Agendamento de loops por prazos absolutos (relogio monotonico)
+
+Cada iteracao tem um prazo absoluto calculado a partir do prazo anterior,
+e nao do fim da execucao: o tempo gasto rodando nao se acumula como
+deriva. Atrasos (iteracao que passou do proximo prazo) pulam os prazos
+perdidos em vez de disparar varias iteracoes seguidas.
+
+O relogio e injetavel: FakeClock permite testar os agendamentos sem
+esperar de verdade.
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+
+# ============================================================
+# RELOGIOS
+# ============================================================
+
+class MonotonicClock:
+    """Relogio real: time.monotonic para prazos, time.time para o cron"""
+
+    monotonic = staticmethod(time.monotonic)
+    time = staticmethod(time.time)
+
+    @staticmethod
+    def wait(event, timeout):
+        """Espera `timeout` seg ou ate o evento; True se o evento veio"""
+        if timeout <= 0:
+            return event.is_set()
+        return event.wait(timeout)
+
+
+class FakeClock:
+    """Relogio de teste: o tempo so anda em wait() e advance()"""
+
+    def __init__(self, start=0.0, wall=1700000000.0):
+        self.now = start
+        self.wall = wall - start
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall + self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        if timeout > 0:
+            self.now += timeout
+        return event.is_set()
+
+
+# ============================================================
+# AGENDAMENTOS
+# ============================================================
+
+class FixedDelay:
+    """Pausa fixa entre o fim de uma iteracao e o inicio da proxima"""
+
+    def __init__(self, delay):
+        self.delay = max(float(delay), 0.0)
+
+    def first(self, now, clock):
+        return now
+
+    def next(self, deadline, now, clock):
+        return now + self.delay, 0
+
+
+class FixedRate:
+    """Uma iteracao a cada `interval` seg, em prazos absolutos
+
+    Se a iteracao passar do proximo prazo, os prazos perdidos sao pulados
+    (e contados como atraso) e o ritmo continua alinhado ao primeiro.
+    """
+
+    def __init__(self, interval):
+        self.interval = max(float(interval), 0.001)
+
+    def first(self, now, clock):
+        return now
+
+    def next(self, deadline, now, clock):
+        deadline += self.interval
+        if deadline >= now:
+            return deadline, 0
+        missed = math.ceil((now - deadline) / self.interval)
+        return deadline + missed * self.interval, missed
+
+
+class Cron:
+    """Expressao estilo cron: [seg] min hora dia mes dia_semana
+
+    Cada campo aceita `*`, `*/n`, `a`, `a-b`, `a-b/n` e listas com `,`.
+    Dia da semana: 0 = domingo. Com 5 campos, roda no segundo 0.
+    """
+
+    RANGES = ((0, 59), (0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expr):
+        self.expr = expr
+        fields = expr.split()
+        if len(fields) == 5:
+            fields = ['0'] + fields
+        if len(fields) != 6:
+            raise ValueError(f'cron invalido: {expr!r}')
+        self.sets = [_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)]
+        # Como no cron: dia do mes e da semana restritos valem um OU outro
+        self.dom_any = fields[3] == '*'
+        self.dow_any = fields[5] == '*'
+
+    def first(self, now, clock):
+        return self._after(now, clock)
+
+    def next(self, deadline, now, clock):
+        nxt = self._after(max(deadline, now), clock)
+        # Prazos do cron que passaram durante a iteracao contam como atraso
+        missed = 0
+        probe = self._after(deadline, clock)
+        while probe < nxt and missed < 1000:
+            missed += 1
+            probe = self._after(probe, clock)
+        return nxt, missed
+
+    def _after(self, mono, clock):
+        """Prazo monotonico do proximo horario do cron depois de `mono`"""
+        wall = clock.time() + (mono - clock.monotonic())
+        t = datetime.fromtimestamp(math.floor(wall)) + timedelta(seconds=1)
+        t = self.match(t)
+        return mono + (t.timestamp() - wall)
+
+    def _day_ok(self, t):
+        dom = t.day in self.sets[3]
+        dow = (t.weekday() + 1) % 7 in self.sets[5]
+        if self.dom_any or self.dow_any:
+            return dom and dow
+        return dom or dow
+
+    def match(self, t):
+        """Primeiro horario >= t (datetime, sem microssegundos) que casa"""
+        secs, mins, hours, _, months, _ = self.sets
+        for _ in range(100000):
+            if t.month not in months:
+                t = (t.replace(day=1, hour=0, minute=0, second=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_ok(t):
+                t = t.replace(hour=0, minute=0, second=0) + timedelta(days=1)
+            elif t.hour not in hours:
+                t = t.replace(minute=0, second=0) + timedelta(hours=1)
+            elif t.minute not in mins:
+                t = t.replace(second=0) + timedelta(minutes=1)
+            elif t.second not in secs:
+                t += timedelta(seconds=1)
+            else:
+                return t
+        raise ValueError(f'cron sem horario valido: {self.expr!r}')
+
+
+def _cron_field(field, lo, hi):
+    values = set()
+    for part in field.split(','):
+        rng, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if rng == '*':
+            a, b = lo, hi
+        elif '-' in rng:
+            a, b = (int(v) for v in rng.split('-', 1))
+        else:
+            a = int(rng)
+            b = hi if step > 1 else a
+        if a < lo or b > hi or a > b or step < 1:
+            raise ValueError(f'campo de cron invalido: {field!r}')
+        values.update(range(a, b + 1, step))
+    return frozenset(values)
+
+
+def parse_schedule(spec, interval):
+    """Agendamento de um macro: 'delay' (padrao), 'rate' ou expressao cron"""
+    spec = (spec or '').strip()
+    if spec in ('', 'delay'):
+        return FixedDelay(interval)
+    if spec == 'rate':
+        return FixedRate(interval)
+    return Cron(spec)
+
+
+# ============================================================
+# LOOP
+# ============================================================
+
+class JitterStats:
+    """Atraso de cada iteracao em relacao ao prazo (ms)"""
+
+    def __init__(self, window=256):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.missed = 0
+        self.recent = deque(maxlen=window)
+
+    def record(self, late):
+        ms = late * 1000
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.recent.append(ms)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        return {
+            'runs': self.count,
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(recent[int(len(recent) * 0.95)], 3) if recent else 0.0,
+            'max_ms': round(self.max, 3),
+            'missed': self.missed,
+        }
+
+
+class Loop:
+    """Executa fn() nos prazos de `schedule` ate stop() ou `count` iteracoes"""
+
+    def __init__(self, fn, schedule, count=0, clock=None, name='loop'):
+        self.fn = fn
+        self.schedule = schedule
+        self.count = count
+        self.clock = clock or MonotonicClock()
+        self.name = name
+        self.stats = JitterStats()
+        self.iterations = 0
+        self.cancel = threading.Event()
+        self._thread = None
+
+    def run(self):
+        """Roda o loop na thread atual"""
+        clock = self.clock
+        deadline = self.schedule.first(clock.monotonic(), clock)
+        while not self.cancel.is_set():
+            if clock.wait(self.cancel, deadline - clock.monotonic()):
+                break
+            self.stats.record(max(clock.monotonic() - deadline, 0.0))
+            self.fn()
+            self.iterations += 1
+            if self.count and self.iterations >= self.count:
+                break
+            deadline, missed = self.schedule.next(deadline, clock.monotonic(), clock)
+            self.stats.missed += missed
+
+    def start(self, on_done=None):
+        """Roda o loop numa thread propria"""
+        def _run():
+            try:
+                self.run()
+            except Exception as e:
+                print(f"Loop error: {self.name}: {e}")
+            if on_done:
+                on_done(self)
+
+        self._thread = threading.Thread(target=_run, name=f'loop-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.cancel.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
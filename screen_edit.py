@@ -0,0 +1,265 @@
+"""Tela de edicao de uma acao do macro"""
+
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.spinner import Spinner
+from kivy.metrics import dp
+
+from widgets import make_button, make_input, make_label
+
+# ============================================================
+# TELA EDITAR ACAO
+# ============================================================
+
+class EditActionScreen(Screen):
+    def __init__(self, app, **kwargs):
+        super().__init__(name='edit_action', **kwargs)
+        self.app_ref = app
+        self.macro = None
+        self.action = None
+        self.is_new = False
+    
+    def set_data(self, macro, action, is_new=False):
+        self.macro = macro
+        self.action = action
+        self.is_new = is_new
+        self._build()
+    
+    def _build(self):
+        self.clear_widgets()
+        
+        root = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(8))
+        
+        from kivy.graphics import Color, Rectangle
+        with root.canvas.before:
+            Color(0.04, 0.04, 0.08, 1)
+            root._bg = Rectangle(pos=root.pos, size=root.size)
+        root.bind(pos=lambda *a: setattr(root._bg, 'pos', root.pos),
+                  size=lambda *a: setattr(root._bg, 'size', root.size))
+        
+        # Header
+        title = 'Nova Acao' if self.is_new else 'Editar Acao'
+        header = BoxLayout(size_hint_y=None, height=dp(45))
+        header.add_widget(make_button(
+            'Voltar', (0.2, 0.2, 0.3, 1),
+            lambda: self.app_ref.go_macro(self.macro),
+            height=40, font_size=13
+        ))
+        header.add_widget(make_label(title, size=18, bold=True, height=40))
+        root.add_widget(header)
+        
+        # Content
+        scroll = ScrollView()
+        content = GridLayout(cols=1, size_hint_y=None, spacing=dp(10), padding=dp(5))
+        content.bind(minimum_height=content.setter('height'))
+        
+        # Nome
+        content.add_widget(make_label('Nome:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+        self.name_input = make_input(text=self.action.name, hint='Nome da acao')
+        content.add_widget(self.name_input)
+        
+        # Tipo
+        content.add_widget(make_label('Tipo:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+        self.type_spinner = Spinner(
+            text=self.action.type,
+            values=['tap', 'swipe', 'long_press', 'wait', 'script', 'key', 'text', 'app']
+                   + (['path'] if self.action.points else []),
+            size_hint_y=None,
+            height=dp(45),
+            background_color=(0.12, 0.12, 0.2, 1),
+            color=(1, 1, 1, 1)
+        )
+        self.type_spinner.bind(text=lambda *a: self._build())
+        content.add_widget(self.type_spinner)
+        
+        # Opcoes baseadas no tipo
+        t = self.type_spinner.text
+        
+        if t in ['tap', 'long_press']:
+            content.add_widget(make_label('Coordenadas:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+            
+            coord = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+            coord.add_widget(make_label('X:', height=40))
+            self.x_input = make_input(text=str(self.action.x), input_filter='int')
+            coord.add_widget(self.x_input)
+            coord.add_widget(make_label('Y:', height=40))
+            self.y_input = make_input(text=str(self.action.y), input_filter='int')
+            coord.add_widget(self.y_input)
+            content.add_widget(coord)
+            
+            if t == 'long_press':
+                content.add_widget(make_label('Duracao (ms):', size=12, height=22))
+                self.dur_input = make_input(text=str(self.action.duration), input_filter='int')
+                content.add_widget(self.dur_input)
+        
+        elif t == 'swipe':
+            content.add_widget(make_label('De:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+            coord1 = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+            coord1.add_widget(make_label('X:', height=40))
+            self.x_input = make_input(text=str(self.action.x), input_filter='int')
+            coord1.add_widget(self.x_input)
+            coord1.add_widget(make_label('Y:', height=40))
+            self.y_input = make_input(text=str(self.action.y), input_filter='int')
+            coord1.add_widget(self.y_input)
+            content.add_widget(coord1)
+            
+            content.add_widget(make_label('Para:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+            coord2 = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+            coord2.add_widget(make_label('X:', height=40))
+            self.x2_input = make_input(text=str(self.action.x2), input_filter='int')
+            coord2.add_widget(self.x2_input)
+            coord2.add_widget(make_label('Y:', height=40))
+            self.y2_input = make_input(text=str(self.action.y2), input_filter='int')
+            coord2.add_widget(self.y2_input)
+            content.add_widget(coord2)
+            
+            content.add_widget(make_label('Duracao (ms):', size=12, height=22))
+            self.dur_input = make_input(text=str(self.action.duration), input_filter='int')
+            content.add_widget(self.dur_input)
+        
+        elif t == 'path':
+            content.add_widget(make_label(
+                f'Trajeto gravado: {len(self.action.points)} pontos',
+                size=12, color=(0.5, 0.5, 0.6, 1), height=22
+            ))
+            content.add_widget(make_label('Duracao (ms):', size=12, height=22))
+            self.dur_input = make_input(text=str(self.action.duration), input_filter='int')
+            content.add_widget(self.dur_input)
+        
+        elif t == 'wait':
+            content.add_widget(make_label('Tempo (segundos):', size=12, height=22))
+            self.wait_input = make_input(text=str(self.action.wait_sec), input_filter='float')
+            content.add_widget(self.wait_input)
+        
+        elif t == 'script':
+            content.add_widget(make_label('Codigo Python:', size=12, height=22))
+            self.script_input = make_input(
+                text=self.action.script or 'tap(500, 800)',
+                multiline=True,
+                height=150
+            )
+            content.add_widget(self.script_input)
+        
+        elif t == 'key':
+            content.add_widget(make_label('Tecla:', size=12, height=22))
+            self.key_spinner = Spinner(
+                text=self.action.key_code,
+                values=[
+                    'KEYCODE_BACK', 'KEYCODE_HOME', 'KEYCODE_APP_SWITCH',
+                    'KEYCODE_VOLUME_UP', 'KEYCODE_VOLUME_DOWN',
+                    'KEYCODE_ENTER', 'KEYCODE_POWER', 'KEYCODE_CAMERA',
+                    'KEYCODE_MENU', 'KEYCODE_SEARCH'
+                ],
+                size_hint_y=None,
+                height=dp(45),
+                background_color=(0.12, 0.12, 0.2, 1),
+                color=(1, 1, 1, 1)
+            )
+            content.add_widget(self.key_spinner)
+        
+        elif t == 'text':
+            content.add_widget(make_label('Texto:', size=12, height=22))
+            self.text_input = make_input(text=self.action.text, multiline=True, height=80)
+            content.add_widget(self.text_input)
+        
+        elif t == 'app':
+            content.add_widget(make_label('Pacote do App:', size=12, height=22))
+            self.app_input = make_input(text=self.action.app_pkg, hint='com.example.app')
+            content.add_widget(self.app_input)
+        
+        # Repeticao
+        content.add_widget(make_label('Repetir:', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+        rep_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        self.repeat_input = make_input(text=str(self.action.repeats), input_filter='int')
+        rep_row.add_widget(self.repeat_input)
+        rep_row.add_widget(make_label('vezes', height=40))
+        content.add_widget(rep_row)
+        
+        scroll.add_widget(content)
+        root.add_widget(scroll)
+        
+        # Salvar
+        footer = BoxLayout(size_hint_y=None, height=dp(55), spacing=dp(10))
+        footer.add_widget(make_button(
+            'Cancelar', (0.2, 0.2, 0.3, 1),
+            lambda: self.app_ref.go_macro(self.macro),
+            font_size=14
+        ))
+        footer.add_widget(make_button(
+            'Salvar', (0.06, 0.72, 0.5, 1),
+            self._save,
+            font_size=14
+        ))
+        root.add_widget(footer)
+        
+        self.add_widget(root)
+    
+    def _save(self):
+        self.action.name = self.name_input.text.strip() or 'Acao'
+        self.action.type = self.type_spinner.text
+        
+        try:
+            self.action.repeats = int(self.repeat_input.text)
+        except:
+            pass
+        
+        t = self.action.type
+        
+        if t in ['tap', 'long_press']:
+            try:
+                self.action.x = int(self.x_input.text)
+                self.action.y = int(self.y_input.text)
+            except:
+                pass
+            if t == 'long_press':
+                try:
+                    self.action.duration = int(self.dur_input.text)
+                except:
+                    pass
+        
+        elif t == 'swipe':
+            try:
+                self.action.x = int(self.x_input.text)
+                self.action.y = int(self.y_input.text)
+                self.action.x2 = int(self.x2_input.text)
+                self.action.y2 = int(self.y2_input.text)
+                self.action.duration = int(self.dur_input.text)
+            except:
+                pass
+        
+        elif t == 'path':
+            try:
+                ms = max(int(self.dur_input.text), 1)
+                if self.action.duration and ms != self.action.duration:
+                    f = ms / self.action.duration
+                    self.action.points = [[x, y, int(round(t * f))] for x, y, t in self.action.points]
+                self.action.duration = ms
+            except:
+                pass
+        
+        elif t == 'wait':
+            try:
+                self.action.wait_sec = float(self.wait_input.text)
+            except:
+                pass
+        
+        elif t == 'script':
+            self.action.script = self.script_input.text
+        
+        elif t == 'key':
+            self.action.key_code = self.key_spinner.text
+        
+        elif t == 'text':
+            self.action.text = self.text_input.text
+        
+        elif t == 'app':
+            self.action.app_pkg = self.app_input.text.strip()
+        
+        if self.is_new:
+            self.macro.actions.append(self.action)
+        self.macro.invalidate_plan()
+        
+        self.app_ref.save(self.macro)
+        self.app_ref.go_macro(self.macro)
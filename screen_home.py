@@ -0,0 +1,201 @@
+"""Tela principal: lista de macros e permissoes"""
+
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.metrics import dp
+
+from engine import Android, MacroData
+from widgets import make_button, make_input, make_label, show_popup
+
+# ============================================================
+# TELA PRINCIPAL
+# ============================================================
+
+class HomeScreen(Screen):
+    def __init__(self, app, **kwargs):
+        super().__init__(name='home', **kwargs)
+        self.app_ref = app
+        self._build()
+    
+    def _build(self):
+        self.clear_widgets()
+        
+        root = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        root.canvas.before.clear()
+        from kivy.graphics import Color, Rectangle
+        with root.canvas.before:
+            Color(0.04, 0.04, 0.08, 1)
+            self._bg = Rectangle(pos=root.pos, size=root.size)
+        root.bind(pos=lambda *a: setattr(self._bg, 'pos', root.pos),
+                  size=lambda *a: setattr(self._bg, 'size', root.size))
+        
+        # Titulo
+        root.add_widget(make_label('Macro Vision AI', size=26, bold=True,
+                                   color=(0, 0.9, 0.85, 1), height=50))
+        
+        running = sum(1 for m in self.app_ref.macros if m.is_running)
+        status = f'{running} em execucao' if running else 'Nenhum ativo'
+        root.add_widget(make_label(status, size=13, color=(0.5, 0.5, 0.6, 1), height=25))
+        
+        # Lista de macros
+        scroll = ScrollView()
+        self.macro_list = GridLayout(
+            cols=1,
+            size_hint_y=None,
+            spacing=dp(10),
+            padding=dp(5)
+        )
+        self.macro_list.bind(minimum_height=self.macro_list.setter('height'))
+        
+        if not self.app_ref.macros:
+            self.macro_list.add_widget(make_label(
+                'Nenhum macro criado\nToque em Novo Macro para comecar',
+                color=(0.4, 0.4, 0.5, 1),
+                height=80
+            ))
+        else:
+            for macro in self.app_ref.macros:
+                self.macro_list.add_widget(self._macro_card(macro))
+        
+        scroll.add_widget(self.macro_list)
+        root.add_widget(scroll)
+        
+        # Botoes
+        btns = BoxLayout(size_hint_y=None, height=dp(55), spacing=dp(10))
+        btns.add_widget(make_button(
+            'Novo Macro', (0.06, 0.72, 0.5, 1),
+            self._new_macro, font_size=15
+        ))
+        btns.add_widget(make_button(
+            'Parar Todos', (0.85, 0.2, 0.2, 1),
+            self._stop_all, font_size=15
+        ))
+        root.add_widget(btns)
+        
+        # Permissoes
+        perm_btns = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(8))
+        perm_btns.add_widget(make_button(
+            'Overlay', (0.45, 0.25, 0.85, 1),
+            Android.request_overlay, height=45, font_size=12
+        ))
+        perm_btns.add_widget(make_button(
+            'Acessibilidade', (0.45, 0.25, 0.85, 1),
+            Android.request_accessibility, height=45, font_size=12
+        ))
+        perm_btns.add_widget(make_button(
+            'Config Sistema', (0.45, 0.25, 0.85, 1),
+            Android.request_write_settings, height=45, font_size=12
+        ))
+        root.add_widget(perm_btns)
+        
+        self.add_widget(root)
+    
+    def _macro_card(self, macro):
+        card = BoxLayout(
+            size_hint_y=None,
+            height=dp(90),
+            spacing=dp(10),
+            padding=dp(10)
+        )
+        
+        from kivy.graphics import Color, RoundedRectangle
+        with card.canvas.before:
+            Color(0.08, 0.08, 0.14, 1)
+            card._rect = RoundedRectangle(pos=card.pos, size=card.size, radius=[dp(12)])
+        card.bind(
+            pos=lambda *a: setattr(card._rect, 'pos', card.pos),
+            size=lambda *a: setattr(card._rect, 'size', card.size)
+        )
+        
+        # Info
+        info = BoxLayout(orientation='vertical', size_hint_x=0.55)
+        info.add_widget(make_label(macro.name, size=16, bold=True, height=25))
+        
+        summary = macro.summary()
+        details = f"{summary['actions']} acoes"
+        if summary['images']:
+            details += f" | {summary['images']} imgs"
+        if summary['tags']:
+            details += f" | {summary['tags']} tags"
+        info.add_widget(make_label(details, size=11, color=(0.5, 0.5, 0.6, 1), height=20))
+        info.add_widget(make_label(
+            f"Execucoes: {summary['runs']}",
+            size=11, color=(0, 0.7, 0.7, 1), height=20
+        ))
+        card.add_widget(info)
+        
+        # Botoes
+        btns = BoxLayout(orientation='vertical', size_hint_x=0.45, spacing=dp(5))
+        
+        run_text = 'Parar' if macro.is_running else 'Executar'
+        run_color = (0.85, 0.2, 0.2, 1) if macro.is_running else (0.06, 0.72, 0.5, 1)
+        btns.add_widget(make_button(
+            run_text, run_color,
+            lambda m=macro: self._toggle_run(m),
+            height=35, font_size=12
+        ))
+        
+        row = BoxLayout(spacing=dp(5), size_hint_y=None, height=dp(35))
+        row.add_widget(make_button(
+            'Abrir', (0.4, 0.25, 0.85, 1),
+            lambda m=macro: self.app_ref.go_macro(m),
+            height=35, font_size=12
+        ))
+        row.add_widget(make_button(
+            'Excluir', (0.6, 0.1, 0.1, 1),
+            lambda m=macro: self._delete_macro(m),
+            height=35, font_size=12
+        ))
+        btns.add_widget(row)
+        
+        card.add_widget(btns)
+        return card
+    
+    def _new_macro(self):
+        content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(15))
+        content.add_widget(make_label('Nome do macro:', height=25))
+        name_input = make_input(hint='Meu Macro')
+        content.add_widget(name_input)
+        
+        btns = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        popup = show_popup('Novo Macro', content, (0.85, 0.35))
+        
+        def create():
+            name = name_input.text.strip() or f'Macro {len(self.app_ref.macros) + 1}'
+            macro = MacroData(name)
+            self.app_ref.macros.append(macro)
+            self.app_ref.save(macro)
+            popup.dismiss()
+            self.app_ref.go_macro(macro)
+        
+        btns.add_widget(make_button('Criar', (0.06, 0.72, 0.5, 1), create))
+        btns.add_widget(make_button('Cancelar', (0.4, 0.1, 0.1, 1), popup.dismiss))
+        content.add_widget(btns)
+    
+    def _toggle_run(self, macro):
+        if not macro.is_running:
+            self.app_ref.ensure_loaded(macro)
+            macro.is_running = True
+            macro.runs += 1
+            self.app_ref.run_macro(macro)
+        else:
+            self.app_ref.stop_macro(macro)
+        self.app_ref.save(macro)
+        self._build()
+    
+    def _delete_macro(self, macro):
+        self.app_ref.stop_macro(macro)
+        self.app_ref.macros.remove(macro)
+        self.app_ref.save()
+        self._build()
+    
+    def _stop_all(self):
+        self.app_ref.stop_all()
+        self.app_ref.save()
+        self._build()
+    
+    def on_pre_enter(self):
+        self._build()
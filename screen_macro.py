@@ -0,0 +1,676 @@
+"""Tela do macro: abas de acoes, script, imagens e configuracoes"""
+
+import os
+
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.label import Label
+from kivy.uix.image import Image
+from kivy.uix.switch import Switch
+from kivy.metrics import dp
+
+from engine import Android, MacroAction
+from widgets import make_button, make_input, make_label, show_message, show_popup
+
+# ============================================================
+# TELA DO MACRO (com abas)
+# ============================================================
+
+class MacroScreen(Screen):
+    def __init__(self, app, **kwargs):
+        super().__init__(name='macro', **kwargs)
+        self.app_ref = app
+        self.macro = None
+        self.current_tab = 'actions'
+    
+    def set_macro(self, macro):
+        self.macro = macro
+        self.current_tab = 'actions'
+        self._build()
+    
+    def _build(self):
+        self.clear_widgets()
+        if not self.macro:
+            return
+        
+        root = BoxLayout(orientation='vertical', padding=dp(8), spacing=dp(8))
+        
+        from kivy.graphics import Color, Rectangle
+        with root.canvas.before:
+            Color(0.04, 0.04, 0.08, 1)
+            root._bg = Rectangle(pos=root.pos, size=root.size)
+        root.bind(pos=lambda *a: setattr(root._bg, 'pos', root.pos),
+                  size=lambda *a: setattr(root._bg, 'size', root.size))
+        
+        # Header
+        header = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        header.add_widget(make_button(
+            'Voltar', (0.2, 0.2, 0.3, 1),
+            lambda: self.app_ref.go_home(),
+            height=45, font_size=13
+        ))
+        header.add_widget(make_label(self.macro.name, size=18, bold=True, height=45))
+        
+        run_text = 'Parar' if self.macro.is_running else 'Executar'
+        run_color = (0.85, 0.2, 0.2, 1) if self.macro.is_running else (0.06, 0.72, 0.5, 1)
+        header.add_widget(make_button(
+            run_text, run_color,
+            self._toggle_run,
+            height=45, font_size=13
+        ))
+        root.add_widget(header)
+        
+        # Abas
+        tabs = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(5))
+        
+        tab_data = [
+            ('Acoes', 'actions'),
+            ('Imagens', 'images'),
+            ('Codigo', 'code'),
+            ('Tags', 'tags'),
+            ('Config', 'config'),
+        ]
+        
+        for tab_text, tab_id in tab_data:
+            is_active = self.current_tab == tab_id
+            color = (0.4, 0.25, 0.85, 1) if is_active else (0.12, 0.12, 0.2, 1)
+            tabs.add_widget(make_button(
+                tab_text, color,
+                lambda t=tab_id: self._switch_tab(t),
+                height=45, font_size=12
+            ))
+        
+        root.add_widget(tabs)
+        
+        # Conteudo da aba
+        content = BoxLayout()
+        
+        if self.current_tab == 'actions':
+            content.add_widget(self._build_actions())
+        elif self.current_tab == 'images':
+            content.add_widget(self._build_images())
+        elif self.current_tab == 'code':
+            content.add_widget(self._build_code())
+        elif self.current_tab == 'tags':
+            content.add_widget(self._build_tags())
+        elif self.current_tab == 'config':
+            content.add_widget(self._build_config())
+        
+        root.add_widget(content)
+        self.add_widget(root)
+    
+    def _switch_tab(self, tab):
+        self.current_tab = tab
+        self._build()
+    
+    # ---- ABA ACOES ----
+    
+    def _build_actions(self):
+        layout = BoxLayout(orientation='vertical', spacing=dp(8))
+        
+        scroll = ScrollView()
+        lst = GridLayout(cols=1, size_hint_y=None, spacing=dp(8), padding=dp(5))
+        lst.bind(minimum_height=lst.setter('height'))
+        
+        if not self.macro.actions:
+            lst.add_widget(make_label(
+                'Nenhuma acao\nToque em Adicionar Acao',
+                color=(0.4, 0.4, 0.5, 1), height=60
+            ))
+        else:
+            for i, action in enumerate(self.macro.actions):
+                lst.add_widget(self._action_card(i, action))
+        
+        scroll.add_widget(lst)
+        layout.add_widget(scroll)
+        
+        btns = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(8))
+        btns.add_widget(make_button(
+            'Adicionar Acao', (0, 0.7, 0.75, 1),
+            self._add_action, height=50, font_size=14
+        ))
+        if self.app_ref.recorder:
+            btns.add_widget(make_button(
+                'Parar Gravacao', (0.85, 0.2, 0.2, 1),
+                self._toggle_recording, height=50, font_size=14
+            ))
+        else:
+            btns.add_widget(make_button(
+                'Gravar Gestos', (0.4, 0.25, 0.85, 1),
+                self._toggle_recording, height=50, font_size=14
+            ))
+        layout.add_widget(btns)
+        
+        return layout
+    
+    def _action_card(self, idx, action):
+        card = BoxLayout(size_hint_y=None, height=dp(65), spacing=dp(8), padding=dp(8))
+        
+        from kivy.graphics import Color, RoundedRectangle
+        with card.canvas.before:
+            Color(0.08, 0.08, 0.14, 1)
+            card._r = RoundedRectangle(pos=card.pos, size=card.size, radius=[dp(10)])
+        card.bind(
+            pos=lambda *a: setattr(card._r, 'pos', card.pos),
+            size=lambda *a: setattr(card._r, 'size', card.size)
+        )
+        
+        # Info
+        info = BoxLayout(orientation='vertical', size_hint_x=0.5)
+        color = (0.9, 0.9, 0.95, 1) if action.enabled else (0.4, 0.4, 0.5, 1)
+        info.add_widget(make_label(action.name, size=13, bold=True, color=color, height=20))
+        info.add_widget(make_label(action.type.upper(), size=11, color=(0.5, 0.5, 0.6, 1), height=18))
+        card.add_widget(info)
+        
+        # Botoes
+        btns = BoxLayout(size_hint_x=0.5, spacing=dp(5))
+        
+        toggle_text = 'ON' if action.enabled else 'OFF'
+        toggle_color = (0.06, 0.72, 0.5, 1) if action.enabled else (0.85, 0.2, 0.2, 1)
+        btns.add_widget(make_button(
+            toggle_text, toggle_color,
+            lambda a=action: self._toggle_action(a),
+            height=40, font_size=11
+        ))
+        btns.add_widget(make_button(
+            'Editar', (0.4, 0.25, 0.85, 1),
+            lambda a=action: self.app_ref.go_edit_action(self.macro, a),
+            height=40, font_size=11
+        ))
+        btns.add_widget(make_button(
+            'X', (0.6, 0.1, 0.1, 1),
+            lambda i=idx: self._delete_action(i),
+            height=40, font_size=11
+        ))
+        card.add_widget(btns)
+        
+        return card
+    
+    def _add_action(self):
+        action = MacroAction()
+        self.app_ref.go_edit_action(self.macro, action, is_new=True)
+    
+    def _toggle_recording(self):
+        if self.app_ref.recorder:
+            count = self.app_ref.stop_recording(self.macro)
+            Android.toast(f'{count} acoes gravadas')
+        else:
+            self.app_ref.start_recording()
+        self._build()
+    
+    def _toggle_action(self, action):
+        action.enabled = not action.enabled
+        self.macro.invalidate_plan()
+        self.app_ref.save(self.macro)
+        self._build()
+    
+    def _delete_action(self, idx):
+        if 0 <= idx < len(self.macro.actions):
+            self.macro.actions.pop(idx)
+            self.macro.invalidate_plan()
+            self.app_ref.save(self.macro)
+            self._build()
+    
+    # ---- ABA IMAGENS ----
+    
+    def _build_images(self):
+        layout = BoxLayout(orientation='vertical', spacing=dp(8))
+        
+        layout.add_widget(make_label(
+            'Imagens de referencia do macro',
+            size=13, color=(0.5, 0.5, 0.6, 1), height=25
+        ))
+        
+        scroll = ScrollView()
+        lst = GridLayout(cols=2, size_hint_y=None, spacing=dp(8), padding=dp(5))
+        lst.bind(minimum_height=lst.setter('height'))
+        
+        if not self.macro.images:
+            lst.add_widget(make_label(
+                'Nenhuma imagem\nToque em Adicionar Imagem',
+                color=(0.4, 0.4, 0.5, 1), height=60
+            ))
+        else:
+            for i, img_path in enumerate(self.macro.images):
+                card = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(140), padding=dp(5))
+                
+                from kivy.graphics import Color, RoundedRectangle
+                with card.canvas.before:
+                    Color(0.08, 0.08, 0.14, 1)
+                    card._r = RoundedRectangle(pos=card.pos, size=card.size, radius=[dp(10)])
+                card.bind(
+                    pos=lambda *a, c=card: setattr(c._r, 'pos', c.pos),
+                    size=lambda *a, c=card: setattr(c._r, 'size', c.size)
+                )
+                
+                if os.path.exists(img_path):
+                    card.add_widget(Image(source=img_path, size_hint_y=0.7))
+                else:
+                    card.add_widget(make_label('Arquivo nao encontrado', height=40))
+                
+                fname = os.path.basename(img_path)
+                card.add_widget(make_label(fname[:20], size=10, height=20))
+                
+                card.add_widget(make_button(
+                    'Remover', (0.6, 0.1, 0.1, 1),
+                    lambda idx=i: self._remove_image(idx),
+                    height=30, font_size=11
+                ))
+                
+                lst.add_widget(card)
+        
+        scroll.add_widget(lst)
+        layout.add_widget(scroll)
+        
+        # BOTAO DE ADICIONAR IMAGEM
+        layout.add_widget(make_button(
+            'Adicionar Imagem', (0, 0.7, 0.75, 1),
+            self._add_image, height=55, font_size=15
+        ))
+        
+        return layout
+    
+    def _add_image(self):
+        """Abre seletor de arquivo para imagem"""
+        # Import pesado (sistema de arquivos, varios widgets): so quando abre
+        from kivy.uix.filechooser import FileChooserListView
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(5))
+        
+        # Determinar caminho inicial
+        if os.path.exists('/storage/emulated/0'):
+            start_path = '/storage/emulated/0'
+        elif os.path.exists(os.path.expanduser('~/Pictures')):
+            start_path = os.path.expanduser('~/Pictures')
+        else:
+            start_path = os.path.expanduser('~')
+        
+        # File chooser SEM filtro para mostrar TODOS os arquivos
+        fc = FileChooserListView(
+            path=start_path,
+            size_hint_y=0.8
+        )
+        content.add_widget(fc)
+        
+        popup = show_popup('Selecionar Arquivo', content, (0.95, 0.9))
+        
+        btns = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        
+        def do_select():
+            if fc.selection:
+                path = fc.selection[0]
+                self.macro.images.append(path)
+                self.app_ref.save(self.macro)
+                self.app_ref.warm_templates([path])
+                popup.dismiss()
+                self._build()
+            else:
+                show_message('Aviso', 'Selecione um arquivo')
+        
+        btns.add_widget(make_button('Selecionar', (0.06, 0.72, 0.5, 1), do_select))
+        btns.add_widget(make_button('Cancelar', (0.5, 0.1, 0.1, 1), popup.dismiss))
+        content.add_widget(btns)
+    
+    def _remove_image(self, idx):
+        if 0 <= idx < len(self.macro.images):
+            self.macro.images.pop(idx)
+            self.app_ref.save(self.macro)
+            self._build()
+    
+    # ---- ABA CODIGO ----
+    
+    def _build_code(self):
+        layout = BoxLayout(orientation='vertical', spacing=dp(8), padding=dp(5))
+        
+        layout.add_widget(make_label(
+            'Codigo Python com funcoes de automacao',
+            size=12, color=(0.5, 0.5, 0.6, 1), height=22
+        ))
+        
+        default_code = '''# Funcoes: tap, swipe, esperar, digitar,
+# home, voltar, screenshot, abrir_app,
+# find_image, tap_image,
+# brilho, vibrar, bateria, toast, log,
+# tag, set_tag, aleatorio, ler_arquivo,
+# escrever_arquivo
+
+log("Iniciando...")
+esperar(1)
+tap(500, 800)
+log("Pronto!")
+'''
+        
+        self.code_input = make_input(
+            text=self.macro.script or default_code,
+            multiline=True,
+            height=250
+        )
+        self.code_input.size_hint_y = 0.5
+        layout.add_widget(self.code_input)
+        
+        layout.add_widget(make_label('Saida:', size=12, color=(0.5, 0.5, 0.6, 1), height=20))
+        
+        out_scroll = ScrollView(size_hint_y=0.25)
+        self.output_label = Label(
+            text='',
+            font_size=dp(11),
+            color=(0, 0.8, 0.8, 1),
+            halign='left',
+            valign='top',
+            size_hint_y=None,
+            markup=True
+        )
+        self.output_label.bind(texture_size=lambda i, s: setattr(i, 'height', s[1] + dp(10)))
+        self.output_label.bind(size=self.output_label.setter('text_size'))
+        out_scroll.add_widget(self.output_label)
+        layout.add_widget(out_scroll)
+        
+        btns = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(8))
+        btns.add_widget(make_button(
+            'Executar', (0.06, 0.72, 0.5, 1),
+            self._run_code, font_size=13
+        ))
+        btns.add_widget(make_button(
+            'Salvar', (0.4, 0.25, 0.85, 1),
+            self._save_code, font_size=13
+        ))
+        btns.add_widget(make_button(
+            'Ajuda', (0.2, 0.2, 0.3, 1),
+            self._show_help, font_size=13
+        ))
+        layout.add_widget(btns)
+        
+        return layout
+    
+    def _run_code(self):
+        code = self.code_input.text
+        self.output_label.text = 'Executando...'
+        
+        def on_done(result):
+            if result['ok']:
+                self.output_label.text = result.get('output') or 'Concluido!'
+                self.macro.tags.update(result['tags'])
+                self.app_ref.save(self.macro)
+            else:
+                self.output_label.text = f"ERRO: {result['error']}\n\n{result.get('trace', '')}"
+        
+        self.app_ref.run_code(code, on_done, self.macro)
+    
+    def _save_code(self):
+        self.macro.script = self.code_input.text
+        self.app_ref.save(self.macro)
+        show_message('Salvo', 'Codigo salvo com sucesso!')
+    
+    def _show_help(self):
+        help_text = '''FUNCOES PYTHON DISPONIVEIS
+
+TOQUES:
+  tap(x, y) - Toque
+  swipe(x1,y1,x2,y2) - Arrastar
+  path([(x, y, ms), ...]) - Arrastar por pontos
+  long_press(x, y) - Segurar
+  digitar("texto") - Digitar
+
+TEMPO:
+  esperar(segundos) - Aguardar (interrompivel)
+
+SISTEMA:
+  home() - Tela inicial
+  voltar() - Botao voltar
+  screenshot() - Captura tela
+  screenshot(region=(x, y, w, h)) - So a regiao
+
+IMAGENS:
+  find_image(caminho, 0.8) - Procura na tela
+    (retorna x, y, score ou None)
+  find_image(caminho, 0.8, region=(x, y, w, h))
+    - Procura so na regiao
+  tap_image(caminho, 0.8) - Procura e toca
+  find_images([caminhos], 0.8) - Varias numa passada
+    (sem caminhos usa as imagens do macro)
+  best_image() - (indice, match) de maior score
+
+CORES (quadro compartilhado, sem screenshot):
+  pixel(x, y) - (r, g, b)
+  pixels([(x, y), ...]) - Varios pontos de uma vez
+  color_in_region((x, y, w, h), (r, g, b), 10)
+    - Fracao da regiao com a cor (0 = nenhum)
+
+TEXTO:
+  read_text((x, y, w, h)) - Le digitos da regiao
+  read_text(regiao, glyphs="/sdcard/fonte")
+    - Fonte do app: uma imagem por caractere
+  read_number(regiao) - Numero lido ou None
+
+ESPERAS (retornam assim que a condicao vale):
+  wait_for_image(caminho, timeout=10)
+  wait_for_pixel(x, y, (r, g, b), tolerance=10)
+  wait_until_screen_stable(region=None, stable_for=0.5)
+  last_wait() - Tempos da ultima espera
+  abrir_app("com.app") - Abrir app
+
+DISPOSITIVO:
+  brilho(0-255) - Ajustar brilho
+  vibrar(ms) - Vibrar
+  bateria() - Nivel bateria
+
+TAGS:
+  set_tag("nome", valor)
+  tag("nome") - Obter valor
+  tags() - Todas as tags
+
+UTILIDADES:
+  log("msg") - Registrar
+  toast("msg") - Notificacao
+  aleatorio(min, max) - Aleatorio
+  ler_arquivo(caminho)
+  escrever_arquivo(caminho, texto)
+
+CONTROLE:
+  parar() - Para execucao
+  with exclusivo(): - Gestos sem intercalar
+    com outros macros
+'''
+        content = ScrollView()
+        lbl = Label(
+            text=help_text,
+            font_size=dp(12),
+            color=(0.9, 0.9, 0.95, 1),
+            halign='left',
+            valign='top',
+            size_hint_y=None
+        )
+        lbl.bind(texture_size=lambda i, s: setattr(i, 'height', s[1] + dp(20)))
+        lbl.bind(size=lbl.setter('text_size'))
+        content.add_widget(lbl)
+        show_popup('Ajuda Python', content, (0.9, 0.85))
+    
+    # ---- ABA TAGS ----
+    
+    def _build_tags(self):
+        layout = BoxLayout(orientation='vertical', spacing=dp(8), padding=dp(5))
+        
+        layout.add_widget(make_label(
+            'Tags: variaveis que voce usa nos scripts',
+            size=12, color=(0.5, 0.5, 0.6, 1), height=22
+        ))
+        
+        scroll = ScrollView()
+        lst = GridLayout(cols=1, size_hint_y=None, spacing=dp(5))
+        lst.bind(minimum_height=lst.setter('height'))
+        
+        if not self.macro.tags:
+            lst.add_widget(make_label('Nenhuma tag', color=(0.4, 0.4, 0.5, 1), height=40))
+        else:
+            for name, value in self.macro.tags.items():
+                row = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(8))
+                row.add_widget(make_label(f'{name}:', size=13, color=(0, 0.8, 0.8, 1), height=35))
+                row.add_widget(make_label(str(value), size=13, height=35))
+                row.add_widget(make_button(
+                    'X', (0.6, 0.1, 0.1, 1),
+                    lambda n=name: self._del_tag(n),
+                    height=35, font_size=11
+                ))
+                lst.add_widget(row)
+        
+        scroll.add_widget(lst)
+        layout.add_widget(scroll)
+        
+        # Nova tag
+        new_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(8))
+        self.tag_name = make_input(hint='Nome')
+        self.tag_value = make_input(hint='Valor')
+        new_row.add_widget(self.tag_name)
+        new_row.add_widget(self.tag_value)
+        new_row.add_widget(make_button(
+            'Add', (0.06, 0.72, 0.5, 1),
+            self._add_tag, height=45, font_size=12
+        ))
+        layout.add_widget(new_row)
+        
+        return layout
+    
+    def _add_tag(self):
+        name = self.tag_name.text.strip()
+        value = self.tag_value.text.strip()
+        if name:
+            try:
+                value = int(value)
+            except:
+                try:
+                    value = float(value)
+                except:
+                    pass
+            self.macro.tags[name] = value
+            self.app_ref.save(self.macro)
+            self._build()
+    
+    def _del_tag(self, name):
+        if name in self.macro.tags:
+            del self.macro.tags[name]
+            self.app_ref.save(self.macro)
+            self._build()
+    
+    # ---- ABA CONFIG ----
+    
+    def _build_config(self):
+        scroll = ScrollView()
+        layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(10), padding=dp(10))
+        layout.bind(minimum_height=layout.setter('height'))
+        
+        layout.add_widget(make_label('Nome do Macro', size=12, color=(0.5, 0.5, 0.6, 1), height=22))
+        self.cfg_name = make_input(text=self.macro.name)
+        layout.add_widget(self.cfg_name)
+        
+        # Loop
+        loop_row = BoxLayout(size_hint_y=None, height=dp(45))
+        loop_row.add_widget(make_label('Repetir em loop', height=40))
+        self.loop_switch = Switch(active=self.macro.loop, size_hint_x=0.3)
+        loop_row.add_widget(self.loop_switch)
+        layout.add_widget(loop_row)
+        
+        count_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        count_row.add_widget(make_label('Repeticoes (0=infinito):', size=12, height=40))
+        self.cfg_count = make_input(text=str(self.macro.loop_count), input_filter='int')
+        count_row.add_widget(self.cfg_count)
+        layout.add_widget(count_row)
+        
+        delay_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        delay_row.add_widget(make_label('Intervalo (seg):', size=12, height=40))
+        self.cfg_delay = make_input(text=str(self.macro.loop_delay), input_filter='float')
+        delay_row.add_widget(self.cfg_delay)
+        layout.add_widget(delay_row)
+        
+        sched_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        sched_row.add_widget(make_label('Agendamento:', size=12, height=40))
+        self.cfg_schedule = make_input(text=self.macro.schedule, hint='delay, rate ou cron')
+        sched_row.add_widget(self.cfg_schedule)
+        layout.add_widget(sched_row)
+        layout.add_widget(make_label(
+            'delay = pausa entre execucoes, rate = a cada intervalo,\n'
+            'cron = "*/5 * * * *" (ou com segundos: "*/10 * * * * *")',
+            size=10, color=(0.4, 0.4, 0.5, 1), height=30
+        ))
+        
+        prio_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        prio_row.add_widget(make_label('Prioridade (menor = primeiro):', size=12, height=40))
+        self.cfg_priority = make_input(text=str(self.macro.priority), input_filter='int')
+        prio_row.add_widget(self.cfg_priority)
+        layout.add_widget(prio_row)
+        
+        timeout_row = BoxLayout(size_hint_y=None, height=dp(45), spacing=dp(10))
+        timeout_row.add_widget(make_label('Tempo limite (seg, 0=sem):', size=12, height=40))
+        self.cfg_timeout = make_input(text=str(self.macro.timeout), input_filter='float')
+        timeout_row.add_widget(self.cfg_timeout)
+        layout.add_widget(timeout_row)
+        
+        layout.add_widget(make_button(
+            'Salvar Configuracoes', (0.06, 0.72, 0.5, 1),
+            self._save_config, height=50, font_size=14
+        ))
+        
+        layout.add_widget(make_label(
+            f'Execucoes: {self.macro.runs}',
+            size=12, color=(0, 0.7, 0.7, 1), height=30
+        ))
+        
+        st = self.app_ref.runner.loop_stats(self.macro.id)
+        if st:
+            layout.add_widget(make_label(
+                f"Atraso: media {st['avg_ms']:.1f} ms, max {st['max_ms']:.1f} ms, "
+                f"{st['missed']} perdidas",
+                size=11, color=(0.5, 0.5, 0.6, 1), height=25
+            ))
+        
+        logs = self.app_ref.logs.get(self.macro.id)
+        if logs:
+            layout.add_widget(make_label(
+                '\n'.join(list(logs)[-5:]),
+                size=10, color=(0.5, 0.5, 0.6, 1), height=80
+            ))
+        
+        scroll.add_widget(layout)
+        return scroll
+    
+    def _save_config(self):
+        self.macro.name = self.cfg_name.text.strip() or 'Macro'
+        self.macro.loop = self.loop_switch.active
+        try:
+            self.macro.loop_count = int(self.cfg_count.text)
+        except:
+            pass
+        try:
+            self.macro.loop_delay = float(self.cfg_delay.text)
+        except:
+            pass
+        try:
+            self.macro.timeout = float(self.cfg_timeout.text)
+        except:
+            pass
+        try:
+            self.macro.priority = int(self.cfg_priority.text)
+        except:
+            pass
+        schedule = self.cfg_schedule.text.strip()
+        if schedule not in ('', 'delay', 'rate'):
+            from scheduler import Cron
+            try:
+                Cron(schedule)
+            except ValueError as e:
+                show_message('Agendamento', str(e))
+                return
+        self.macro.schedule = schedule
+        self.app_ref.save(self.macro)
+        show_message('Salvo', 'Configuracoes salvas!')
+    
+    def _toggle_run(self):
+        if not self.macro.is_running:
+            self.macro.is_running = True
+            self.macro.runs += 1
+            self.app_ref.run_macro(self.macro)
+        else:
+            self.app_ref.stop_macro(self.macro)
+        self.app_ref.save(self.macro)
+        self._build()
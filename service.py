@@ -1,18 +1,146 @@
+"""Servico de execucao: roda os macros fora do processo da interface
 
-import os
-import time
-import json
-from jnius import autoclass
+No Android e o servico em segundo plano (`services` no buildozer.spec),
+livre do on_pause e do loop do Kivy. No PC roda como processo comum:
 
-PythonService = autoclass('org.kivy.android.PythonService')
-Context = autoclass('android.content.Context')
-Intent = autoclass('android.content.Intent')
+    python service.py [--port N]
 
-service = PythonService.mService
+O app (ou um cliente de teste) conversa com ele pelo ipc.py.
+"""
+
+import sys
+import argparse
+import threading
+
+import ipc
+from engine import IS_ANDROID, IPC_TOKEN_FILE, Android, MacroData, MacroRunner, ScriptEngine
+
+
+class MacroService:
+    """Comandos do app -> MacroRunner; status, resultados e logs -> eventos"""
+
+    def __init__(self, port=ipc.PORT, token_path=IPC_TOKEN_FILE):
+        self.engine = ScriptEngine()
+        self.runner = MacroRunner(self.engine, self._on_status, self._on_result, self._on_log)
+        self.macros = {}
+        self.server = ipc.IpcServer(self.handle, ipc.write_token(token_path), port=port)
+        self.done = threading.Event()
+        # Sem Activity neste processo: os toasts sao mostrados pelo app
+        Android.toast_hook = lambda text: self.server.broadcast({'event': 'toast', 'text': text})
+
+    def start(self):
+        self.server.start()
+        print(f"[Service] ouvindo em {self.server.host}:{self.server.port}")
+        return self
+
+    # ---- COMANDOS ----
+
+    def handle(self, conn, msg):
+        """Executa um comando; o dict retornado vai so para quem pediu"""
+        cmd = msg.get('cmd')
+        if cmd == 'start':
+            return self._start(MacroData.from_dict(msg['macro']))
+        if cmd == 'stop':
+            macro = self.macros.get(msg.get('id'))
+            if macro is not None:
+                self.runner.stop(macro)
+                self._broadcast_status(macro)
+            return None
+        if cmd == 'stop_all':
+            running = [m for m in self.macros.values() if m.is_running]
+            for macro in running:
+                macro.is_running = False
+            self.runner.stop_all()
+            for macro in running:
+                self._broadcast_status(macro)
+            return None
+        if cmd == 'run':
+            self._run_code(conn, msg)
+            return None
+        if cmd == 'status':
+            return self.snapshot()
+        if cmd == 'ping':
+            return {'event': 'pong'}
+        if cmd == 'shutdown':
+            self.done.set()
+            return None
+        return {'event': 'error', 'error': f'comando desconhecido: {cmd}'}
+
+    def _start(self, macro):
+        old = self.macros.get(macro.id)
+        if old is not None and old.is_running:
+            self.runner.stop(old)
+        self.macros[macro.id] = macro
+        try:
+            self.runner.start(macro)
+        except ValueError as e:
+            return {'event': 'error', 'id': macro.id, 'error': str(e)}
+        # Macro vazio nao chega a rodar: o status ja sai como parado
+        self._broadcast_status(macro)
+        return None
+
+    def _run_code(self, conn, msg):
+        ref = msg.get('ref')
+
+        def on_done(result):
+            try:
+                conn.send({'event': 'result', 'ref': ref, 'result': result})
+            except OSError:
+                pass
+
+        self.runner.run_code(msg.get('code', ''), on_done, msg.get('tags'), msg.get('name', ''))
+
+    def snapshot(self):
+        running = [m.id for m in self.macros.values() if m.is_running]
+        stats = {}
+        for macro_id in running:
+            st = self.runner.loop_stats(macro_id)
+            if st:
+                stats[macro_id] = st
+        return {'event': 'snapshot', 'running': running, 'stats': stats}
+
+    # ---- EVENTOS ----
+
+    def _broadcast_status(self, macro):
+        self.server.broadcast({
+            'event': 'status',
+            'id': macro.id,
+            'running': macro.is_running,
+            'stats': self.runner.loop_stats(macro.id),
+        })
+
+    def _on_status(self, macro):
+        self._broadcast_status(macro)
+
+    def _on_result(self, macro, result):
+        self.server.broadcast({'event': 'result', 'id': macro.id, 'result': result})
+
+    def _on_log(self, macro_id, line):
+        self.server.broadcast({'event': 'log', 'id': macro_id, 'line': line})
+
+    def run(self):
+        """Atende ate receber `shutdown` (ou Ctrl+C no PC)"""
+        try:
+            while not self.done.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.runner.shutdown()
+        self.server.stop()
+
+
+def run_service(port=ipc.PORT):
+    MacroService(port).start().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servico de execucao do Macro Vision')
+    parser.add_argument('--port', type=int, default=ipc.PORT)
+    args = parser.parse_args(argv)
+    run_service(args.port)
+    return 0
 
-def run_service():
-    while True:
-        time.sleep(1)
 
 if __name__ == '__main__':
-    run_service()
\ No newline at end of file
+    # No servico Android o argv nao e nosso
+    sys.exit(main([] if IS_ANDROID else None))
@@ -0,0 +1,190 @@
+"""Persistencia dos macros
+
+Cada macro fica no seu proprio arquivo (macros/<id>.json) e um indice
+pequeno (index.json) guarda so o necessario para listar os macros na
+tela inicial. O corpo de cada macro e carregado sob demanda.
+
+Varias chamadas de save() viram uma unica escrita em segundo plano, so
+os macros alterados sao regravados e toda escrita e atomica (arquivo
+temporario + rename).
+"""
+
+import os
+import json
+import time
+import threading
+
+
+def write_atomic(path, data):
+    """Grava `data` em `path` sem nunca deixar o arquivo pela metade"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MacroStore:
+    """Indice + um arquivo por macro, gravados com debounce"""
+
+    # Segundos sem alteracoes antes de gravar
+    DEBOUNCE = 1.0
+    # Espera maxima com alteracoes pendentes (loops que salvam sem parar)
+    MAX_WAIT = 5.0
+    # Espera maxima entre tentativas depois de erros seguidos ao gravar
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, index_path, macros_dir, legacy_path=None, debounce=None):
+        self.index_path = index_path
+        self.macros_dir = macros_dir
+        self.legacy_path = legacy_path
+        self.debounce = self.DEBOUNCE if debounce is None else debounce
+        self._macros = []
+        self._dirty = set()
+        self._written_ids = set()
+        self._pending = False
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._retry_at = 0.0
+        self._failures = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+        # Estatisticas
+        self.writes = 0
+        self.shards_written = 0
+
+        os.makedirs(self.macros_dir, exist_ok=True)
+
+    def _shard_path(self, macro_id):
+        return os.path.join(self.macros_dir, f'{macro_id}.json')
+
+    # ---- LEITURA ----
+
+    def load_index(self):
+        """Retorna os resumos dos macros (migra o save.json antigo)"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                entries = json.load(f).get('macros', [])
+            self._written_ids = {e['id'] for e in entries}
+            return entries
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            return self._migrate()
+        return []
+
+    def load_macro(self, macro_id):
+        """Le o corpo completo de um macro"""
+        with open(self._shard_path(macro_id), 'r') as f:
+            return json.load(f)
+
+    def _migrate(self):
+        with open(self.legacy_path, 'r') as f:
+            macros = json.load(f).get('macros', [])
+        entries = []
+        for d in macros:
+            write_atomic(self._shard_path(d['id']), json.dumps(d))
+            entries.append(summarize(d))
+        write_atomic(self.index_path, json.dumps({'macros': entries}))
+        self._written_ids = {e['id'] for e in entries}
+        print(f"[MacroStore] {len(entries)} macros migrados de {self.legacy_path}")
+        return entries
+
+    # ---- ESCRITA ----
+
+    def save(self, macros, changed=()):
+        """Agenda a gravacao
+
+        `macros` e a lista atual (define ordem e exclusoes) e `changed`
+        os macros cujo arquivo precisa ser regravado.
+        """
+        with self._cond:
+            self._macros = list(macros)
+            for m in changed:
+                self._dirty.add(m.id)
+            now = time.monotonic()
+            if not self._pending:
+                self._first_change = now
+            self._pending = True
+            self._last_change = now
+            self._start()
+            self._cond.notify()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, daemon=True)
+            self._thread.start()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while self._pending:
+                    now = time.monotonic()
+                    due = min(self._last_change + self.debounce, self._first_change + self.MAX_WAIT)
+                    due = max(due, self._retry_at)
+                    if now >= due:
+                        break
+                    self._cond.wait(due - now)
+            self.flush()
+
+    def flush(self):
+        """Grava agora (chamado tambem no on_pause/on_stop)"""
+        with self._write_lock:
+            with self._cond:
+                if not self._pending:
+                    return
+                macros = self._macros
+                dirty = self._dirty
+                self._dirty = set()
+                self._pending = False
+
+            try:
+                self._write(macros, dirty)
+            except Exception as e:
+                print(f"Save error: {e}")
+                with self._cond:
+                    self._dirty |= dirty
+                    self._pending = True
+                    # Tenta de novo mais tarde, dobrando a espera a cada erro
+                    now = time.monotonic()
+                    self._first_change = self._last_change = now
+                    self._retry_at = now + min(self.debounce * 2 ** self._failures, self.MAX_BACKOFF)
+                    self._failures += 1
+                return
+            with self._cond:
+                self._failures = 0
+                self._retry_at = 0.0
+
+    def _write(self, macros, dirty):
+        ids = set()
+        for m in macros:
+            ids.add(m.id)
+            if m.loaded and (m.id in dirty or m.id not in self._written_ids):
+                # Tags aceitam qualquer valor dos scripts: o que nao e JSON vira texto
+                write_atomic(self._shard_path(m.id), json.dumps(m.to_dict(), default=str))
+                self.shards_written += 1
+
+        write_atomic(self.index_path, json.dumps({'macros': [m.summary() for m in macros]}))
+        self.writes += 1
+
+        for macro_id in self._written_ids - ids:
+            try:
+                os.remove(self._shard_path(macro_id))
+            except OSError:
+                pass
+        self._written_ids = ids
+
+
+def summarize(d):
+    """Resumo de um macro salvo (o que vai para o indice)"""
+    return {
+        'id': d['id'],
+        'name': d.get('name', 'Macro'),
+        'actions': len(d.get('actions', [])),
+        'images': len(d.get('images', [])),
+        'tags': len(d.get('tags', {})),
+        'runs': d.get('runs', 0),
+    }
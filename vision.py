@@ -0,0 +1,574 @@
+"""Busca de imagens na tela (template matching)
+
+Correlacao cruzada normalizada (NCC) sobre piramides em tons de cinza:
+busca completa (via FFT) no nivel mais reduzido e refinamento local nos
+niveis seguintes. Requer numpy; PNG/JPG sao lidos com Pillow.
+"""
+
+import os
+import zlib
+import threading
+from collections import namedtuple, OrderedDict
+
+import numpy as np
+
+
+# Centro (x, y) na tela, score NCC (-1..1) e retangulo encontrado
+Match = namedtuple('Match', 'x y score left top width height')
+
+# Lado minimo do template no nivel mais reduzido da piramide
+MIN_SIDE = 8
+MAX_LEVELS = 4
+
+# Candidatos levados do nivel grosso para o refinamento
+CANDIDATES = 12
+# Folga do score no nivel grosso (a reducao borra o template)
+COARSE_SLACK = 0.3
+# Raio (px) da busca local em cada nivel de refinamento
+REFINE_RADIUS = 2
+
+
+# ============================================================
+# IMAGENS
+# ============================================================
+
+def load_gray(path):
+    """Le um PNG/JPG como matriz float32 em tons de cinza"""
+    from PIL import Image
+    with Image.open(path) as img:
+        return np.asarray(img.convert('L'), dtype=np.float32)
+
+
+def crop(img, region):
+    """Recorta (x, y, w, h) sem copiar; retorna (view, x0, y0)
+
+    A regiao e limitada as bordas da imagem; None devolve a imagem toda.
+    """
+    if region is None:
+        return img, 0, 0
+    x, y, w, h = (int(v) for v in region)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, img.shape[1]), min(y + h, img.shape[0])
+    return img[y0:max(y1, y0), x0:max(x1, x0)], x0, y0
+
+
+def region_digest(img):
+    """Hash rapido dos pixels de uma regiao (para detectar mudancas)"""
+    return (img.shape, zlib.crc32(np.ascontiguousarray(img)))
+
+
+def to_gray(rgb):
+    """Converte matriz HxWx3 (ou x4) uint8 para cinza float32"""
+    rgb = np.asarray(rgb)
+    if rgb.ndim == 2:
+        return rgb.astype(np.float32, copy=False)
+    r = rgb[..., 0].astype(np.float32)
+    g = rgb[..., 1].astype(np.float32)
+    b = rgb[..., 2].astype(np.float32)
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+
+def downsample(img):
+    """Reduz pela metade com media 2x2"""
+    h = img.shape[0] // 2 * 2
+    w = img.shape[1] // 2 * 2
+    img = img[:h, :w]
+    return (img[0::2, 0::2] + img[1::2, 0::2] + img[0::2, 1::2] + img[1::2, 1::2]) * 0.25
+
+
+def build_pyramid(img, levels):
+    """Lista [original, 1/2, 1/4, ...] com `levels` niveis"""
+    pyr = [img]
+    for _ in range(levels - 1):
+        pyr.append(downsample(pyr[-1]))
+    return pyr
+
+
+def pyramid_levels(tpl_shape, max_levels=MAX_LEVELS, min_side=MIN_SIDE):
+    """Quantos niveis cabem sem o template ficar menor que min_side"""
+    side = min(tpl_shape)
+    levels = 1
+    while levels < max_levels and side // 2 >= min_side:
+        side //= 2
+        levels += 1
+    return levels
+
+
+def integral(img):
+    """Imagem integral com borda de zeros (float64)"""
+    ii = np.zeros((img.shape[0] + 1, img.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(img, axis=0, dtype=np.float64), axis=1, out=ii[1:, 1:])
+    return ii
+
+
+def box_sums(ii, h, w):
+    """Soma de cada janela h x w a partir da imagem integral"""
+    return ii[h:, w:] - ii[:-h, w:] - ii[h:, :-w] + ii[:-h, :-w]
+
+
+# ============================================================
+# CORES
+# ============================================================
+
+def sample(img, points):
+    """Cores RGB dos pontos [(x, y), ...] numa unica indexacao
+
+    Retorna matriz N x 3 (uint8). Pontos fora da imagem levantam
+    IndexError.
+    """
+    pts = np.asarray(points, dtype=np.intp).reshape(-1, 2)
+    # Indices negativos do numpy contariam a partir do fim da imagem
+    h, w = img.shape[:2]
+    outside = (pts[:, 0] < 0) | (pts[:, 0] >= w) | (pts[:, 1] < 0) | (pts[:, 1] >= h)
+    if outside.any():
+        x, y = pts[outside.argmax()]
+        raise IndexError(f'ponto ({x}, {y}) fora da imagem {w}x{h}')
+    if img.ndim == 2:
+        return np.repeat(img[pts[:, 1], pts[:, 0], None], 3, axis=1)
+    return img[pts[:, 1], pts[:, 0], :3]
+
+
+def color_mask(img, rgb, tolerance=10):
+    """Mascara dos pixels com cada canal a no maximo `tolerance` de rgb
+
+    Compara canal a canal direto em uint8, sem converter a regiao.
+    """
+    rgb = np.asarray(rgb[:3], dtype=np.int32)
+    lo = np.clip(rgb - tolerance, 0, 255).astype(np.uint8)
+    hi = np.clip(rgb + tolerance, 0, 255).astype(np.uint8)
+    mask = np.ones(img.shape[:-1], dtype=bool)
+    for c in range(3):
+        channel = img[..., c]
+        mask &= channel >= lo[c]
+        mask &= channel <= hi[c]
+    return mask
+
+
+def color_ratio(img, rgb, tolerance=10, region=None):
+    """Fracao (0..1) dos pixels da regiao com a cor rgb (+- tolerance)"""
+    pixels, _, _ = crop(img, region)
+    if pixels.size == 0:
+        return 0.0
+    return float(color_mask(pixels, rgb, tolerance).mean())
+
+
+# ============================================================
+# TEMPLATES
+# ============================================================
+
+class Template:
+    """Template pre-processado: piramide e estatisticas da correlacao"""
+
+    # FFTs guardadas por template (tamanhos de tela/regiao mais recentes)
+    FFT_CACHE = 4
+
+    def __init__(self, gray, path=None, mtime=None):
+        self.path = path
+        self.mtime = mtime
+        self.shape = gray.shape
+        self.levels = pyramid_levels(gray.shape)
+        self.pyramid = build_pyramid(gray.astype(np.float32), self.levels)
+
+        # Template com media zero e norma de cada nivel
+        self.zero_mean = []
+        self.norms = []
+        for level in self.pyramid:
+            t = level.astype(np.float64) - level.mean()
+            self.zero_mean.append(t)
+            self.norms.append(float(np.sqrt((t * t).sum())))
+
+        # FFT por (nivel, tamanho da tela); cada regiao (ROI) tem o seu
+        self._fft = OrderedDict()
+        self._lock = threading.Lock()
+        # TemplateCache que contabiliza este template (ou None)
+        self.cache = None
+        self.nbytes = sum(p.nbytes for p in self.pyramid) + sum(t.nbytes for t in self.zero_mean)
+
+    def fft(self, level, shape):
+        """rfft2 do template (media zero) no tamanho da tela
+
+        Guarda as FFT_CACHE mais recentes; o crescimento entra na conta
+        de memoria do TemplateCache.
+        """
+        key = (level, shape)
+        with self._lock:
+            f = self._fft.get(key)
+            if f is not None:
+                self._fft.move_to_end(key)
+                return f
+
+        f = np.conj(np.fft.rfft2(self.zero_mean[level], s=shape))
+        delta = 0
+        with self._lock:
+            if key not in self._fft:
+                self._fft[key] = f
+                delta = f.nbytes
+                while len(self._fft) > self.FFT_CACHE:
+                    delta -= self._fft.popitem(last=False)[1].nbytes
+        if delta:
+            if self.cache is not None:
+                self.cache.resized(self, delta)
+            else:
+                self.nbytes += delta
+        return f
+
+
+class TemplateCache:
+    """Templates decodificados por (caminho, mtime) com limite de memoria
+
+    Evita reler e decodificar o PNG/JPG a cada iteracao de um loop.
+    """
+
+    def __init__(self, budget=32 * 1024 * 1024):
+        self.budget = budget
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path):
+        """Template pronto para a busca (le o arquivo so se mudou)"""
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, mtime)
+        with self._lock:
+            tpl = self._items.get(key)
+            if tpl is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return tpl
+
+        tpl = Template(load_gray(path), path, mtime)
+        with self._lock:
+            self.misses += 1
+            # Versao antiga do mesmo arquivo sai do cache
+            for old in [k for k in self._items if k[0] == path]:
+                self.bytes -= self._items.pop(old).nbytes
+            self._items[key] = tpl
+            tpl.cache = self
+            self.bytes += tpl.nbytes
+            self._evict()
+        return tpl
+
+    def resized(self, tpl, delta):
+        """Template mudou de tamanho (FFTs novas); pode descartar outros"""
+        with self._lock:
+            tpl.nbytes += delta
+            if self._items.get((tpl.path, tpl.mtime)) is tpl:
+                self.bytes += delta
+                self._evict()
+
+    def _evict(self):
+        while self.bytes > self.budget and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self.bytes -= old.nbytes
+            self.evictions += 1
+
+    def warm(self, paths):
+        """Pre-carrega templates (ex.: ao adicionar imagem ou iniciar macro)"""
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception as e:
+                print(f"Template error: {path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Cache global usado por find_image
+templates = TemplateCache()
+
+
+# ============================================================
+# NCC
+# ============================================================
+
+class PreparedScreen:
+    """Tela pre-processada uma vez e compartilhada entre varios templates
+
+    Guarda a piramide e, por nivel, as imagens integrais (soma e soma dos
+    quadrados) e a FFT, todas calculadas sob demanda.
+    """
+
+    def __init__(self, gray, levels=MAX_LEVELS):
+        self.pyramid = build_pyramid(gray, levels)
+        self._integrals = {}
+        self._fft = {}
+
+    def level(self, level):
+        return self.pyramid[level]
+
+    def integrals(self, level):
+        ii = self._integrals.get(level)
+        if ii is None:
+            img = self.pyramid[level]
+            ii = (integral(img), integral(np.square(img, dtype=np.float64)))
+            self._integrals[level] = ii
+        return ii
+
+    def fft(self, level):
+        f = self._fft.get(level)
+        if f is None:
+            f = np.fft.rfft2(self.pyramid[level])
+            self._fft[level] = f
+        return f
+
+
+def ncc_map(img, tpl, level=0, prepared=None):
+    """Score NCC de todas as posicoes validas do template na imagem
+
+    Com `prepared` (PreparedScreen), `img` e ignorada e a FFT e as
+    integrais do nivel sao reaproveitadas.
+    """
+    if not isinstance(tpl, Template):
+        tpl = Template(tpl)
+    if prepared is not None:
+        img = prepared.level(level)
+    H, W = img.shape
+    th, tw = tpl.pyramid[level].shape
+    if th > H or tw > W:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    tnorm = tpl.norms[level]
+    if tnorm == 0:
+        return np.zeros((H - th + 1, W - tw + 1), dtype=np.float32)
+
+    if prepared is not None:
+        img_fft = prepared.fft(level)
+        ii, ii2 = prepared.integrals(level)
+    else:
+        img_fft = np.fft.rfft2(img)
+        ii, ii2 = integral(img), integral(np.square(img, dtype=np.float64))
+
+    # Correlacao via FFT (posicoes validas nao sofrem o efeito circular)
+    num = np.fft.irfft2(img_fft * tpl.fft(level, (H, W)), s=(H, W))[:H - th + 1, :W - tw + 1]
+
+    n = th * tw
+    s1 = box_sums(ii, th, tw)
+    s2 = box_sums(ii2, th, tw)
+    var = np.maximum(s2 - s1 * s1 / n, 0)
+    denom = np.sqrt(var) * tnorm
+
+    out = np.zeros_like(num)
+    np.divide(num, denom, out=out, where=denom > 1e-6 * tnorm)
+    return out.astype(np.float32)
+
+
+def ncc_window(img, tpl, level, x0, y0, x1, y1):
+    """Score NCC direto para posicoes x0..x1, y0..y1 (busca local)"""
+    t = tpl.zero_mean[level]
+    tnorm = tpl.norms[level]
+    th, tw = t.shape
+    H, W = img.shape
+    x0, y0 = max(x0, 0), max(y0, 0)
+    x1, y1 = min(x1, W - tw), min(y1, H - th)
+    if x1 < x0 or y1 < y0:
+        return None, x0, y0
+
+    region = img[y0:y1 + th, x0:x1 + tw].astype(np.float64)
+    win = np.lib.stride_tricks.sliding_window_view(region, (th, tw))
+
+    num = np.einsum('ijkl,kl->ij', win, t)
+    n = th * tw
+    s1 = win.sum(axis=(2, 3))
+    s2 = np.einsum('ijkl,ijkl->ij', win, win)
+    denom = np.sqrt(np.maximum(s2 - s1 * s1 / n, 0)) * tnorm
+
+    out = np.zeros_like(num)
+    np.divide(num, denom, out=out, where=denom > 1e-6 * max(tnorm, 1e-12))
+    return out, x0, y0
+
+
+def top_peaks(scores, k, min_score, radius):
+    """Ate k maiores picos, suprimindo vizinhos dentro de `radius`"""
+    scores = scores.copy()
+    peaks = []
+    for _ in range(k):
+        idx = int(np.argmax(scores))
+        y, x = divmod(idx, scores.shape[1])
+        s = float(scores[y, x])
+        if s < min_score:
+            break
+        peaks.append((x, y, s))
+        scores[max(0, y - radius):y + radius + 1, max(0, x - radius):x + radius + 1] = -np.inf
+    return peaks
+
+
+# ============================================================
+# BUSCA
+# ============================================================
+
+def match_template(screen, tpl, threshold=0.8, prepared=None):
+    """Procura o template na tela (em cinza); retorna Match ou None
+
+    `tpl` pode ser uma matriz ou um Template ja processado e `prepared`
+    (PreparedScreen) reaproveita o pre-processamento da tela.
+    """
+    if not isinstance(tpl, Template):
+        tpl = Template(tpl)
+    if prepared is None:
+        prepared = PreparedScreen(screen, tpl.levels)
+    screen = prepared.level(0)
+    th, tw = tpl.shape
+    if th > screen.shape[0] or tw > screen.shape[1]:
+        return None
+
+    # Nivel grosso: busca completa
+    top = min(tpl.levels, len(prepared.pyramid)) - 1
+    scores = ncc_map(None, tpl, top, prepared)
+    if scores.size == 0:
+        return None
+    radius = max(1, min(tpl.pyramid[top].shape) // 2)
+    candidates = top_peaks(scores, CANDIDATES, threshold - COARSE_SLACK, radius)
+
+    # Niveis finos: refinamento em volta de cada candidato
+    for level in range(top - 1, -1, -1):
+        refined = []
+        for x, y, _ in candidates:
+            cx, cy = x * 2, y * 2
+            out, ox, oy = ncc_window(
+                prepared.level(level), tpl, level,
+                cx - REFINE_RADIUS, cy - REFINE_RADIUS,
+                cx + REFINE_RADIUS, cy + REFINE_RADIUS
+            )
+            if out is None:
+                continue
+            idx = int(np.argmax(out))
+            dy, dx = divmod(idx, out.shape[1])
+            refined.append((ox + dx, oy + dy, float(out[dy, dx])))
+        candidates = refined
+
+    if not candidates:
+        return None
+    x, y, score = max(candidates, key=lambda c: c[2])
+    if score < threshold:
+        return None
+    return Match(x + tw // 2, y + th // 2, score, x, y, tw, th)
+
+
+def match_many(screen, tpls, threshold=0.8, stop_at=None):
+    """Procura varios templates na mesma tela numa passada so
+
+    A piramide, as integrais e a FFT da tela sao calculadas uma vez.
+    Retorna a lista (mesma ordem) com o melhor Match de cada template ou
+    None. Com `stop_at`, para no primeiro template com score >= stop_at
+    e os restantes ficam None.
+    """
+    tpls = [t if isinstance(t, Template) else Template(t) for t in tpls]
+    levels = max((t.levels for t in tpls), default=1)
+    prepared = PreparedScreen(screen, levels)
+
+    results = [None] * len(tpls)
+    for i, tpl in enumerate(tpls):
+        results[i] = match_template(None, tpl, threshold, prepared)
+        if stop_at is not None and results[i] is not None and results[i].score >= stop_at:
+            break
+    return results
+
+
+class MatchMemo:
+    """Ultimo resultado por (template, regiao, threshold) e hash dos pixels
+
+    Se a regiao nao mudou desde a ultima busca, devolve o mesmo
+    resultado sem refazer a correlacao.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, digest):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == digest:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True, item[1]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, digest, result):
+        with self._lock:
+            self._items[key] = (digest, result)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+# Memo global usado por find_image
+memo = MatchMemo()
+
+
+def find_image(template_path, threshold=0.8, screen=None, region=None, use_memo=True):
+    """Procura a imagem `template_path` num screenshot
+
+    `screen` pode ser o caminho de um screenshot, um Frame da captura
+    em memoria ou uma matriz RGB/cinza. O template vem do cache global
+    (decodificado uma vez por versao).
+
+    `region` (x, y, w, h) limita a busca e o recorte acontece antes da
+    conversao para cinza. Com `use_memo`, regioes iguais a da busca
+    anterior devolvem o resultado anterior.
+    """
+    if region is not None:
+        region = tuple(int(v) for v in region)
+    if isinstance(screen, str):
+        pixels = load_gray(screen)
+    elif hasattr(screen, 'rgba'):
+        pixels = screen.rgba
+    else:
+        pixels = np.asarray(screen)
+    pixels, x0, y0 = crop(pixels, region)
+
+    tpl = templates.get(template_path)
+    if use_memo:
+        key = (template_path, tpl.mtime, region, threshold)
+        digest = region_digest(pixels)
+        hit, result = memo.get(key, digest)
+        if hit:
+            return result
+
+    m = match_template(to_gray(pixels), tpl, threshold)
+    m = _offset(m, x0, y0)
+
+    if use_memo:
+        memo.put(key, digest, m)
+    return m
+
+
+def find_images(template_paths, threshold=0.8, screen=None, region=None, stop_at=None):
+    """Versao em lote de find_image: uma lista de Match/None por template
+
+    A tela (ou regiao) e convertida e pre-processada uma unica vez.
+    """
+    if region is not None:
+        region = tuple(int(v) for v in region)
+    if isinstance(screen, str):
+        pixels = load_gray(screen)
+    elif hasattr(screen, 'rgba'):
+        pixels = screen.rgba
+    else:
+        pixels = np.asarray(screen)
+    pixels, x0, y0 = crop(pixels, region)
+
+    tpls = [templates.get(p) for p in template_paths]
+    results = match_many(to_gray(pixels), tpls, threshold, stop_at)
+    return [_offset(m, x0, y0) for m in results]
+
+
+def _offset(m, x0, y0):
+    if m is None or not (x0 or y0):
+        return m
+    return m._replace(x=m.x + x0, y=m.y + y0, left=m.left + x0, top=m.top + y0)
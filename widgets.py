@@ -0,0 +1,116 @@
+"""Widgets e dialogos padronizados usados por todas as telas"""
+
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.textinput import TextInput
+from kivy.uix.popup import Popup
+from kivy.clock import Clock
+from kivy.metrics import dp
+
+# ============================================================
+# INTERFACE KV - Limpa e funcional
+# ============================================================
+
+KV = '''
+#:import dp kivy.metrics.dp
+
+<RoundButton@Button>:
+    background_normal: ''
+    background_down: ''
+    background_color: 0, 0, 0, 0
+    color: 1, 1, 1, 1
+    bold: True
+    canvas.before:
+        Color:
+            rgba: self.bg_color if hasattr(self, 'bg_color') else (0.3, 0.2, 0.8, 1)
+        RoundedRectangle:
+            pos: self.pos
+            size: self.size
+            radius: [dp(12)]
+
+<CardBox@BoxLayout>:
+    canvas.before:
+        Color:
+            rgba: 0.08, 0.08, 0.14, 1
+        RoundedRectangle:
+            pos: self.pos
+            size: self.size
+            radius: [dp(14)]
+
+ScreenManager:
+    id: sm
+'''
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def make_button(text, color, callback, height=50, font_size=14):
+    """Cria botao padronizado"""
+    btn = Button(
+        text=text,
+        size_hint_y=None,
+        height=dp(height),
+        font_size=dp(font_size),
+        bold=True,
+        background_normal='',
+        background_color=color,
+        color=(1, 1, 1, 1)
+    )
+    btn.bind(on_release=lambda x: callback())
+    return btn
+
+
+def make_label(text, size=14, color=(0.9, 0.9, 0.95, 1), height=30, bold=False):
+    """Cria label padronizado"""
+    return Label(
+        text=text,
+        font_size=dp(size),
+        color=color,
+        size_hint_y=None,
+        height=dp(height),
+        bold=bold,
+        halign='left'
+    )
+
+
+def make_input(text='', hint='', multiline=False, height=45, input_filter=None):
+    """Cria input padronizado"""
+    return TextInput(
+        text=text,
+        hint_text=hint,
+        multiline=multiline,
+        size_hint_y=None,
+        height=dp(height),
+        font_size=dp(14),
+        background_color=(0.08, 0.08, 0.14, 1),
+        foreground_color=(0.9, 0.9, 0.95, 1),
+        cursor_color=(0, 0.8, 0.8, 1),
+        hint_text_color=(0.4, 0.4, 0.5, 1),
+        padding=[dp(12), dp(10)],
+        input_filter=input_filter,
+    )
+
+
+def show_popup(title, content, size=(0.85, 0.4)):
+    """Mostra popup"""
+    p = Popup(
+        title=title,
+        content=content,
+        size_hint=size,
+        title_color=(1, 1, 1, 1),
+        separator_color=(0.3, 0.2, 0.8, 1),
+    )
+    p.open()
+    return p
+
+
+def on_ui(fn):
+    """Chama fn() na thread da interface (callbacks do engine/servico)"""
+    Clock.schedule_once(lambda dt: fn())
+
+
+def show_message(title, msg, duration=2):
+    """Mostra mensagem temporaria"""
+    p = show_popup(title, Label(text=msg, color=(1, 1, 1, 1)), (0.7, 0.25))
+    Clock.schedule_once(lambda dt: p.dismiss(), duration)
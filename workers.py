@@ -0,0 +1,108 @@
+"""Pool de threads reutilizaveis com fila de prioridade
+
+Evita criar uma threading.Thread nova para cada execucao de script ou
+iteracao de loop.
+"""
+
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+
+
+class WorkerPool:
+    """Executor limitado: reaproveita threads e ordena por prioridade
+
+    Prioridade menor roda primeiro; empates seguem a ordem de chegada.
+    Com max_workers=None nao ha limite: toda tarefa comeca na hora e as
+    threads ociosas por `idle_timeout` seg sao encerradas.
+    """
+
+    def __init__(self, max_workers=8, name='macro', idle_timeout=None):
+        self.max_workers = max_workers
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self._heap = []
+        self._seq = itertools.count()
+        self._names = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._idle = 0
+        self._shutdown = False
+
+        # Estatisticas
+        self.submitted = 0
+        self.completed = 0
+
+    def submit(self, fn, *args, priority=0, **kwargs):
+        """Agenda fn(*args, **kwargs); retorna Future com `timing`"""
+        future = Future()
+        future.timing = {'queued': time.perf_counter()}
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError('pool encerrado')
+            heapq.heappush(self._heap, (priority, next(self._seq), future, fn, args, kwargs))
+            self.submitted += 1
+            full = self.max_workers is not None and len(self._workers) >= self.max_workers
+            if len(self._heap) > self._idle and not full:
+                t = threading.Thread(
+                    target=self._worker,
+                    name=f'{self.name}-{next(self._names)}',
+                    daemon=True,
+                )
+                self._workers.append(t)
+                t.start()
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._idle += 1
+                    woke = self._cond.wait(self.idle_timeout)
+                    self._idle -= 1
+                    if not woke and not self._heap:
+                        self._workers.remove(threading.current_thread())
+                        return
+                if not self._heap:
+                    return
+                _, _, future, fn, args, kwargs = heapq.heappop(self._heap)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            timing = future.timing
+            timing['started'] = time.perf_counter()
+            timing['wait_ms'] = (timing['started'] - timing['queued']) * 1000
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                timing['run_ms'] = (time.perf_counter() - timing['started']) * 1000
+                future.set_exception(e)
+            else:
+                timing['run_ms'] = (time.perf_counter() - timing['started']) * 1000
+                future.set_result(result)
+            self.completed += 1
+
+    def stats(self):
+        """Threads, fila e contadores"""
+        with self._cond:
+            return {
+                'workers': len(self._workers),
+                'idle': self._idle,
+                'queued': len(self._heap),
+                'submitted': self.submitted,
+                'completed': self.completed,
+            }
+
+    def shutdown(self, wait=False):
+        """Para de aceitar tarefas; as ja enfileiradas ainda rodam"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._workers:
+                t.join()